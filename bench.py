@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import struct
+import tempfile
+import time
+
+import httpx
+
+from core.archiver import SovereignArchiver
+from core.pump_events import CREATE_EVENT_DISCRIMINATOR
+from core.replay import SegmentRecorder, ReplayServer, iter_frames, record
+from core.sniffer import PumpSniffer
+
+# ============================================================
+# أداة التسجيل وإعادة التشغيل وقياس أداء خط الاستقبال -> الأرشفة
+#   python bench.py record --wss wss://... --out ./archive/frames --duration 600
+#   python bench.py synth  --out ./archive/frames --frames 50000
+#   python bench.py bench  --segments ./archive/frames --speed 0 --workers 8
+# ============================================================
+
+# سجلات كل حدث تشوه القياس؛ core.sniffer يهيئ INFO عند الاستيراد لذا نخفض المستوى صراحة
+logging.getLogger().setLevel(logging.WARNING)
+logger = logging.getLogger("Sovereign_Bench")
+
+
+def _borsh_str(value: str) -> bytes:
+    raw = value.encode()
+    return struct.pack("<I", len(raw)) + raw
+
+
+def synth_frames(out_dir: str, frames: int, create_ratio: float = 0.05, rate: float = 500.0) -> int:
+    """توليد مقطع اصطناعي: نسبة صغيرة من Create والباقي ضجيج تداول عادي"""
+    recorder = SegmentRecorder(out_dir)
+    rnd = random.Random(7)
+    base = time.monotonic()
+    at = 0.0
+    for i in range(frames):
+        at += rnd.expovariate(rate)
+        sig = base64.b32encode(rnd.randbytes(40)).decode().rstrip("=")
+        if rnd.random() < create_ratio:
+            payload = (CREATE_EVENT_DISCRIMINATOR + _borsh_str(f"Token{i}") + _borsh_str(f"T{i % 1000}")
+                       + _borsh_str("https://ipfs.io/ipfs/x") + rnd.randbytes(32 * 4))
+            logs = ["Program 6EF8rrecthR5DkZJbdz4P8hHKXY6yizQ2EtJhEqNpump invoke [1]",
+                    "Program log: Instruction: Create",
+                    "Program data: " + base64.b64encode(payload).decode()]
+        else:
+            logs = ["Program 6EF8rrecthR5DkZJbdz4P8hHKXY6yizQ2EtJhEqNpump invoke [1]",
+                    "Program log: Instruction: Buy",
+                    "Program data: " + base64.b64encode(rnd.randbytes(120)).decode()]
+        frame = json.dumps({"jsonrpc": "2.0", "method": "logsNotification", "params": {
+            "result": {"context": {"slot": 300000000 + i // 4},
+                       "value": {"signature": sig, "err": None, "logs": logs}},
+            "subscription": 1}})
+        recorder.write(frame, at=base + at)
+    recorder.close()
+    return frames
+
+
+def _percentile(sorted_vals, pct: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, int(round(pct / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+async def run_bench(segments: str, speed: float, workers: int, queue_size: int,
+                    api_latency_ms: float, db_path: str) -> dict:
+    frames = list(iter_frames(segments))
+    server = await ReplayServer(frames, speed=speed).start()
+
+    async def coins_stub(request: httpx.Request) -> httpx.Response:
+        # بديل محلي لـ frontend-api.pump.fun: كل العملات تجتاز الفلتر
+        if api_latency_ms:
+            await asyncio.sleep(api_latency_ms / 1000.0)
+        mint = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"mint": mint, "usd_market_cap": 25000, "holder_count": 120,
+                                         "image_url": None})
+
+    archiver = SovereignArchiver(db_path, http_client=httpx.AsyncClient(transport=httpx.MockTransport(coins_stub)))
+    await archiver.boot_system()
+    sniffer = PumpSniffer(wss_url=server.url, archiver=archiver, worker_count=workers, queue_size=queue_size)
+
+    # ختم وقت الاستقبال لكل حدث ثم مطابقته مع وقت الـ Commit
+    received_at = {}
+    latencies = []
+    original_enqueue = sniffer._enqueue
+
+    def stamped_enqueue(ev):
+        # نفس مفتاح wallet_id الذي يكتبه العامل (المُنشئ أولاً)
+        received_at[PumpSniffer.wallet_of(ev)] = time.perf_counter()
+        original_enqueue(ev)
+
+    def on_commit(batch):
+        now = time.perf_counter()
+        for row in batch:
+            t0 = received_at.pop(row[0], None)
+            if t0 is not None:
+                latencies.append((now - t0) * 1000)
+
+    sniffer._enqueue = stamped_enqueue
+    archiver.writer.on_commit = on_commit
+
+    started = time.perf_counter()
+    sniff_task = asyncio.create_task(sniffer.start_sniffing())
+    await server.finished.wait()
+    # انتظار وصول كل الإطارات (+ تأكيد الاشتراك) ثم تفريغ الطابور والكاتب
+    while sniffer.stats["frames"] <= server.sent:
+        await asyncio.sleep(0.005)
+    await sniffer._queue.join()
+    await archiver.writer.flush()
+    elapsed = time.perf_counter() - started
+
+    sniffer.stop()
+    sniff_task.cancel()
+    await asyncio.gather(sniff_task, return_exceptions=True)
+    await archiver.close()
+    await server.close()
+
+    latencies.sort()
+    return {
+        "frames": server.sent,
+        "elapsed_s": round(elapsed, 3),
+        "frames_per_s": round(server.sent / elapsed, 1),
+        "events": sniffer.stats["received"],
+        "committed": archiver.writer.stats["rows_written"],
+        "events_per_s": round(archiver.writer.stats["rows_written"] / elapsed, 1),
+        "dropped": sniffer.stats["dropped"],
+        "queue_high_water": sniffer.stats["queue_high_water"],
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "db_batches": archiver.writer.stats["batches"],
+        "max_commit_ms": round(archiver.writer.stats["max_commit_ms"], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sovereign ingest -> archive record/replay benchmark")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_rec = sub.add_parser("record", help="تسجيل إطارات logsSubscribe الخام من نقطة حية")
+    p_rec.add_argument("--wss", default=os.getenv("WSS_URL_PRIMARY"))
+    p_rec.add_argument("--out", default="./archive/frames")
+    p_rec.add_argument("--duration", type=float, default=0.0)
+
+    p_syn = sub.add_parser("synth", help="توليد مقطع اصطناعي للاختبار")
+    p_syn.add_argument("--out", default="./archive/frames")
+    p_syn.add_argument("--frames", type=int, default=20000)
+    p_syn.add_argument("--create-ratio", type=float, default=0.05)
+
+    p_b = sub.add_parser("bench", help="إعادة تشغيل المقاطع عبر PumpSniffer + SovereignArchiver")
+    p_b.add_argument("--segments", default="./archive/frames")
+    p_b.add_argument("--speed", type=float, default=0.0, help="1 = الزمن الحقيقي، N = أسرع N مرة، 0 = أقصى سرعة")
+    p_b.add_argument("--workers", type=int, default=5)
+    p_b.add_argument("--queue-size", type=int, default=1000)
+    p_b.add_argument("--api-latency-ms", type=float, default=0.0)
+
+    args = parser.parse_args()
+    if args.cmd == "record":
+        if not args.wss:
+            parser.error("--wss or WSS_URL_PRIMARY is required")
+        asyncio.run(record(args.wss, PumpSniffer.PROGRAM_ID, args.out, duration=args.duration))
+    elif args.cmd == "synth":
+        print(f"generated {synth_frames(args.out, args.frames, args.create_ratio)} frames in {args.out}")
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(run_bench(args.segments, args.speed, args.workers, args.queue_size,
+                                           args.api_latency_ms, os.path.join(tmp, "bench.sqlite")))
+        for key, value in result.items():
+            print(f"{key:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
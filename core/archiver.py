@@ -1,87 +1,291 @@
 import asyncio
-import aiosqlite
 import json
 import datetime
 import logging
+import time
 import httpx
+from collections import OrderedDict
+from typing import Optional, Dict, List, Callable
+from core.writer import ArchiveWriter
+from core.metrics import METRICS
+from core.rechecker import RecheckScheduler
 
 logger = logging.getLogger("SovereignArchiver")
 
+
+class _FetchAbandoned(Exception):
+    """صاحب الطلب المشترك أُلغي قبل الرد: المنتظرون يعيدون الطلب بأنفسهم بدلاً من وراثة الإلغاء"""
+
 class SovereignArchiver:
-    def __init__(self, db_path: str):
+    COINS_API_URL = "https://frontend-api.pump.fun/coins/{mint}"
+    # [تحديث] إعدادات ذاكرة التخزين المؤقت لبيانات العملات (TTL + LRU)
+    CACHE_TTL_S = 5.0
+    CACHE_MAX_ENTRIES = 2048
+
+    def __init__(self, db_path: str, http_client: Optional[httpx.AsyncClient] = None,
+                 recheck_settings: Optional[dict] = None, curve_tracker=None, wash_detector=None):
         self.db_path = db_path
-        self._cache = {}
+        # mint -> (expires_at, payload) مرتبة حسب آخر استخدام
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        # طلبات قيد التنفيذ: كل الأحداث المتزامنة لنفس الـ mint تنتظر نفس الطلب
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client = http_client
+        # [تحديث] كاتب خلفي باتصال واحد دائم بدلاً من اتصال + fsync لكل حدث
+        self.writer = ArchiveWriter(db_path)
+        # مستمعون لكل هدف محفوظ (خادم الدفع للأندرويد مثلاً) — يجب أن يكونوا سريعين وبلا I/O
+        self.on_archived: List[Callable[[dict], None]] = []
+        self.http_stats = {"requests": 0, "cache_hits": 0, "coalesced": 0}
         # [تحديث] رفع الحد الأدنى للقيمة السوقية إلى 11,000 دولار
         self.MIN_MARKET_CAP_USD = 11000 
         # [تحديث] إضافة شرط عدد الهولدرز
         self.MIN_HOLDERS = 70
+        # [تحديث] حالة منحنيات الربط المحلية (BondingCurveTracker): فلاتر بدون HTTP
+        self.curves = curve_tracker
+        # [تحديث] تقييم التداول الوهمي يغذي threat_level / behavior_pattern / trust_score
+        self.wash = wash_detector
+        # [تحديث] العملات المرفوضة تُعاد فحصها لاحقاً (late bloomers)
+        recheck = dict(recheck_settings or {})
+        self.rechecker: Optional[RecheckScheduler] = (
+            RecheckScheduler(self, **recheck) if recheck.pop("enabled", True) else None
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """عميل HTTP واحد طويل العمر (Keep-Alive) بدلاً من مصافحة TLS لكل حدث"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=4.0,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            )
+        return self._client
+
+    async def boot_system(self):
+        """تهيئة قاعدة البيانات وتشغيل الكاتب الخلفي"""
+        await self.writer.start()
+
+    async def close(self):
+        """تفريغ الكاتب الخلفي ثم إغلاق العميل المشترك والذاكرة المؤقتة"""
+        if self.rechecker:
+            await self.rechecker.close()
+        await self.writer.close()
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._cache.clear()
+
+    def _cache_get(self, mint: str) -> Optional[dict]:
+        entry = self._cache.get(mint)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at < time.monotonic():
+            del self._cache[mint]
+            return None
+        self._cache.move_to_end(mint)
+        return payload
+
+    def _cache_put(self, mint: str, payload: dict):
+        self._cache[mint] = (time.monotonic() + self.CACHE_TTL_S, payload)
+        self._cache.move_to_end(mint)
+        while len(self._cache) > self.CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    async def _fetch_coin(self, mint: str) -> dict:
+        """جلب بيانات العملة مع ذاكرة مؤقتة ودمج الطلبات المتزامنة (Single-Flight)"""
+        while True:
+            cached = self._cache_get(mint)
+            if cached is not None:
+                self.http_stats["cache_hits"] += 1
+                return cached
+
+            pending = self._inflight.get(mint)
+            if pending is None:
+                break
+            self.http_stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending)
+            except _FetchAbandoned:
+                continue
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[mint] = fut
+        try:
+            self.http_stats["requests"] += 1
+            resp = await self._get_client().get(self.COINS_API_URL.format(mint=mint))
+            data = resp.json() if resp.status_code == 200 else {}
+            # لا نخزن الردود الفاشلة حتى يُعاد المحاولة في الحدث التالي
+            if data:
+                self._cache_put(mint, data)
+            fut.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            # fut.cancel() كان سيرمي CancelledError داخل مهام المنتظرين (العمال) وكأنها أُلغيت هي
+            fut.set_exception(_FetchAbandoned(mint))
+            fut.exception()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # منع تحذير "Future exception was never retrieved" عند عدم وجود منتظرين
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(mint, None)
+
+    async def fetch_coins_batch(self, mints: List[str], concurrency: int = 16) -> Dict[str, dict]:
+        """
+        جلب مجموعة عملات دفعة واحدة عبر نفس العميل المشترك (اتصالات Keep-Alive محدودة)
+        مع إعادة استخدام الذاكرة المؤقتة والطلبات الجارية. الأخطاء تعطي {} للعملة المعنية فقط.
+        """
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(mint: str):
+            async with sem:
+                try:
+                    return mint, await self._fetch_coin(mint)
+                except Exception as e:
+                    METRICS.inc("http_errors_total", stage="recheck")
+                    logger.debug(f"Recheck fetch error {mint[:8]}: {e}")
+                    return mint, {}
+
+        with METRICS.timer("recheck_http"):
+            return dict(await asyncio.gather(*(one(m) for m in dict.fromkeys(mints))))
+
+    def _is_viable(self, data: dict) -> bool:
+        market_cap = data.get("usd_market_cap", 0) or 0
+        # ملاحظة: في Pump.fun، يتم تتبع عدد المتداولين/الملاك
+        # سنستخدم "reply_count" أو بيانات الـ holders إذا توفرت في الـ API
+        # غالباً الـ API يوفر معلومات عن مدى اكتمال المنحنى (Bonding Curve)
+        holders_count = data.get("holder_count", 0) or 0
+        
+        # التحقق من الشرطين معاً
+        is_viable = market_cap >= self.MIN_MARKET_CAP_USD and holders_count > self.MIN_HOLDERS
+        
+        if is_viable:
+            logger.info(f"✅ [MATCH] Cap: ${market_cap:,.0f} | Holders: {holders_count}")
+        return is_viable
+
+    def _local_reject(self, mint: str) -> bool:
+        """
+        رفض فوري من الحالة المحلية للمنحنى (سيولة، نسبة المطور) قبل أي HTTP.
+        القيمة السوقية المحلية بالدولار مبنية على sol_price_usd ثابت فهي استرشادية فقط:
+        تُحتسب كمقياس ولا ترفض؛ قرار الـ 11k يبقى لرد الـ API.
+        """
+        if self.curves is None:
+            return False
+        if self.curves.passes_filters(mint) is False:
+            METRICS.inc("viability_local_rejects_total", reason="filters")
+            return True
+        cap = self.curves.market_cap_usd(mint)
+        if cap is not None and cap < self.MIN_MARKET_CAP_USD:
+            METRICS.inc("viability_local_cap_below_total")
+        return False
 
     async def _check_viability(self, mint: str) -> bool:
         """فحص دقيق للقيمة السوقية وعدد الهولدرز لاصطياد كبار المحترفين"""
         if mint == "Scanning..." or not mint: return False
+        # عدد الهولدرز غير موجود على المنحنى، لذا HTTP فقط لمن يجتاز الفلاتر المحلية
+        if self._local_reject(mint): return False
         try:
-            async with httpx.AsyncClient(timeout=4.0) as client:
-                url = f"https://frontend-api.pump.fun/coins/{mint}"
-                resp = await client.get(url)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    
-                    market_cap = data.get("usd_market_cap", 0)
-                    # ملاحظة: في Pump.fun، يتم تتبع عدد المتداولين/الملاك
-                    # سنستخدم "reply_count" أو بيانات الـ holders إذا توفرت في الـ API
-                    # غالباً الـ API يوفر معلومات عن مدى اكتمال المنحنى (Bonding Curve)
-                    holders_count = data.get("holder_count", 0) 
-                    
-                    # التحقق من الشرطين معاً
-                    is_viable = market_cap >= self.MIN_MARKET_CAP_USD and holders_count > self.MIN_HOLDERS
-                    
-                    if is_viable:
-                        logger.info(f"✅ [MATCH] Cap: ${market_cap:,.0f} | Holders: {holders_count}")
-                    return is_viable
+            with METRICS.timer("viability_http"):
+                data = await self._fetch_coin(mint)
+            if data:
+                return self._is_viable(data)
         except Exception as e:
+            METRICS.inc("http_errors_total", stage="viability")
             logger.debug(f"Viability Check Error: {e}")
             return False # في حال الخطأ، نفضل عدم التخزين لتوفير الموارد
         return False
 
+    def _notify(self, wallet: str, record: dict, behavior_tag: str):
+        if not self.on_archived:
+            return
+        event = {
+            "wallet": wallet, "mint": record["mint"], "sig": record["sig"],
+            "name": record["api"]["name"], "symbol": record["api"]["symbol"],
+            "image": record["api"]["image_url"], "cap": record["stats"]["cap"],
+            "holders": record["stats"]["holders"], "tag": behavior_tag, "ts": round(time.time(), 3),
+        }
+        for listener in self.on_archived:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.debug(f"Archive listener error: {e}")
+
     async def analyze_and_archive(self, wallet: str, raw_data: dict, behavior_tag: str):
         mint = raw_data.get("mint")
         
         # 1. تطبيق الفلتر الجديد (11k Cap + 70 Holders)
         if not await self._check_viability(mint):
+            if self.rechecker:
+                self.rechecker.schedule(mint, wallet, raw_data, behavior_tag)
             return 
 
+        # [تحديث] إعادة استخدام نتيجة فحص الجدوى من الذاكرة المؤقتة بدلاً من طلب ثانٍ
+        try:
+            with METRICS.timer("enrichment_http"):
+                api_info = await self._fetch_coin(mint)
+        except Exception as e:
+            METRICS.inc("http_errors_total", stage="enrichment")
+            logger.debug(f"Enrichment Error: {e}")
+            api_info = {}
+        await self._archive_viable(wallet, raw_data, behavior_tag, api_info)
+
+    def needs_remote_check(self, mint: str) -> bool:
+        """لإعادة الفحص: False إذا رفضت حالة المنحنى المحلية العملة فلا داعي لإدخالها في دفعة HTTP"""
+        return not self._local_reject(mint)
+
+    async def archive_if_viable(self, wallet: str, raw_data: dict, behavior_tag: str, api_info: dict) -> bool:
+        """أرشفة رد API جاهز (من دفعة إعادة الفحص) إن اجتاز الفلتر؛ True فقط بعد الحفظ فعلاً"""
+        if not api_info or not self._is_viable(api_info):
+            return False
+        return await self._archive_viable(wallet, raw_data, behavior_tag, api_info)
+
+    async def _archive_viable(self, wallet: str, raw_data: dict, behavior_tag: str, api_info: dict) -> bool:
+        """إثراء وحفظ عملة اجتازت الفلتر (من المسار المباشر أو من إعادة الفحص)"""
+        mint = raw_data.get("mint")
         now = datetime.datetime.utcnow().isoformat()
-        # محاولة جلب البيانات مباشرة من الـ API بدلاً من الانتظار
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"https://frontend-api.pump.fun/coins/{mint}")
-            api_info = resp.json() if resp.status_code == 200 else {}
 
         token_image = api_info.get("image_url") or api_info.get("logo")
-        token_name = api_info.get("name", "Active Token")
-        token_symbol = api_info.get("symbol", "-")
+        # الاسم والرمز مفكوكان من السجلات عادةً؛ الـ API احتياطي فقط
+        token_name = raw_data.get("name") or api_info.get("name", "Active Token")
+        token_symbol = raw_data.get("symbol") or api_info.get("symbol", "-")
 
         # تنظيف وحفظ
         clean_raw_data = {
             "sig": raw_data.get("sig"),
             "mint": mint,
+            "creator": raw_data.get("creator"),
+            "bonding_curve": raw_data.get("bonding_curve"),
+            "uri": raw_data.get("uri") or api_info.get("metadata_uri"),
             "api": {"image_url": token_image, "name": token_name, "symbol": token_symbol},
             "stats": {"cap": api_info.get("usd_market_cap"), "holders": api_info.get("holder_count")}
         }
         
+        threat_level, pattern, trust_score = 50, behavior_tag, 50
+        verdict = self.wash.assess(mint) if self.wash is not None else None
+        if verdict is not None:
+            threat_level, trust_score = verdict.threat_level, verdict.trust_score
+            clean_raw_data["stats"]["wash_score"] = verdict.score
+            if verdict.flagged:
+                pattern = verdict.behavior_pattern
+                self.wash.note_flagged(verdict)
+
         metadata_json = json.dumps(clean_raw_data)
 
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute("PRAGMA journal_mode=WAL")
-                await db.execute("""
-                    INSERT INTO mm_intel (wallet_id, threat_level, behavior_pattern, trust_score, total_raids, historical_data_json, last_seen_at)
-                    VALUES (?, ?, ?, ?, 1, ?, ?)
-                    ON CONFLICT(wallet_id) DO UPDATE SET
-                        total_raids = total_raids + 1,
-                        historical_data_json = excluded.historical_data_json,
-                        last_seen_at = excluded.last_seen_at
-                """, (wallet, 50, behavior_tag, 50, metadata_json, now))
-                await db.commit()
-                logger.info(f"💾 [ELITE_TARGET_SAVED] {token_name} (Cap: ${api_info.get('usd_market_cap',0):,.0f})")
+            if not self.writer.is_running:
+                await self.writer.start()
+            await self.writer.upsert(wallet, threat_level, pattern, trust_score, metadata_json, now)
+            # [تحديث] سجل تاريخي إلحاقي: كل غارة تُحفظ بدلاً من الكتابة فوق السابقة فقط
+            await self.writer.record_event(
+                wallet, mint, raw_data.get("sig"),
+                api_info.get("usd_market_cap"), api_info.get("holder_count"),
+                behavior_tag, int(time.time() * 1000)
+            )
+            self._notify(wallet, clean_raw_data, behavior_tag)
+            # usd_market_cap قد يصل null من الـ API (أو غائباً عند فشل الإثراء)
+            logger.info(f"💾 [ELITE_TARGET_SAVED] {token_name} (Cap: ${api_info.get('usd_market_cap') or 0:,.0f})")
+            return True
         except Exception as e:
+            METRICS.inc("db_errors_total")
             logger.error(f"❌ DB Error: {e}")
+            return False
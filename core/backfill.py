@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+import httpx
+
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignBackfill")
+
+
+class GapBackfiller:
+    """
+    [تحديث] سد فجوة الانقطاع: بعد إعادة الاتصال نجلب توقيعات البرنامج بين آخر نقطة تفتيش
+    وأول إطار حي (getSignaturesForAddress مع before/until)، ثم المعاملات نفسها (getTransaction)
+    كطلبات JSON-RPC مجمعة (مصفوفة طلبات في POST واحد) عبر عميل HTTP واحد بمجمع اتصالات.
+    """
+    def __init__(self, rpc_url: str, program_id: str, page_limit: int = 1000, batch_size: int = 50,
+                 concurrency: int = 4, max_signatures: int = 5000, commitment: str = "confirmed",
+                 timeout_s: float = 10.0, max_retries: int = 3, client: Optional[httpx.AsyncClient] = None):
+        self.rpc_url = rpc_url
+        self.program_id = program_id
+        self.page_limit = min(max(1, page_limit), 1000)
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_signatures = max_signatures
+        self.commitment = commitment
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self._client = client
+        self._next_id = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_s,
+                limits=httpx.Limits(max_connections=self.concurrency * 2, max_keepalive_connections=self.concurrency),
+            )
+        return self._client
+
+    async def _call(self, requests: List[dict]) -> List[dict]:
+        """POST واحد لمصفوفة طلبات؛ الردود مرتبة حسب id (المزود غير ملزم بالترتيب)"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = await self._get_client().post(self.rpc_url, json=requests)
+                if resp.status_code == 429 and attempt < self.max_retries:
+                    METRICS.inc("backfill_rate_limited_total")
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+                    continue
+                resp.raise_for_status()
+                replies = resp.json()
+                if isinstance(replies, dict):
+                    # بعض المزودين يردون بخطأ واحد على الدفعة كاملة
+                    replies = [replies]
+                by_id = {r.get("id"): r for r in replies if isinstance(r, dict)}
+                return [by_id.get(req["id"], {}) for req in requests]
+            except (httpx.HTTPError, ValueError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.debug(f"Backfill RPC retry {attempt + 1}: {e}")
+                await asyncio.sleep(0.5 * (2 ** attempt))
+        return []
+
+    def _request(self, method: str, params: list) -> dict:
+        self._next_id += 1
+        return {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}
+
+    async def current_slot(self) -> Optional[int]:
+        """رأس السلسلة (processed) لحظة إعادة الاتصال: حد أعلى للفجوة إن لم يصل إطار حي"""
+        try:
+            reply = (await self._call([self._request("getSlot", [{"commitment": "processed"}])]))[0]
+        except (httpx.HTTPError, ValueError) as e:
+            logger.debug(f"Backfill getSlot failed: {e}")
+            return None
+        slot = reply.get("result")
+        return slot if isinstance(slot, int) else None
+
+    async def signatures_between(self, until: Optional[str], before: Optional[str] = None,
+                                 min_slot: int = 0, max_slot: Optional[int] = None) -> Tuple[List[Tuple[str, int]], bool]:
+        """
+        (التوقيع، الـ slot) الناجحة في الفجوة، الأقدم أولاً، + هل قُطعت القائمة عند max_signatures.
+        الصفحات من الأحدث للأقدم حتى until (نقطة التفتيش) أو min_slot؛ ما بعد max_slot يُتجاوز.
+        """
+        found: List[Tuple[str, int]] = []
+        cursor = before
+        while len(found) < self.max_signatures:
+            opts = {"limit": self.page_limit, "commitment": self.commitment}
+            if until:
+                opts["until"] = until
+            if cursor:
+                opts["before"] = cursor
+            reply = (await self._call([self._request("getSignaturesForAddress", [self.program_id, opts])]))[0]
+            page = reply.get("result") or []
+            for item in page:
+                if item.get("slot", 0) < min_slot:
+                    page = []
+                    break
+                if max_slot is not None and item.get("slot", 0) > max_slot:
+                    continue
+                if item.get("err") is None:
+                    found.append((item["signature"], item.get("slot", 0)))
+            if len(page) < self.page_limit:
+                break
+            cursor = page[-1]["signature"]
+        truncated = len(found) >= self.max_signatures
+        found = found[:self.max_signatures]
+        found.reverse()
+        return found, truncated
+
+    async def fetch_transactions(self, signatures: List[str]) -> Tuple[List[Tuple[str, int, List[str]]], int]:
+        """(التوقيع، الـ slot، السجلات) لكل معاملة مسترجعة بنفس الترتيب + عدد الإخفاقات"""
+        sem = asyncio.Semaphore(self.concurrency)
+        opts = {"encoding": "json", "maxSupportedTransactionVersion": 0, "commitment": self.commitment}
+
+        async def one_batch(chunk: List[str]):
+            async with sem:
+                try:
+                    return chunk, await self._call([self._request("getTransaction", [sig, opts]) for sig in chunk])
+                except (httpx.HTTPError, ValueError) as e:
+                    METRICS.inc("backfill_errors_total")
+                    logger.debug(f"Backfill batch failed ({len(chunk)} txs): {e}")
+                    return chunk, [{}] * len(chunk)
+
+        chunks = [signatures[i:i + self.batch_size] for i in range(0, len(signatures), self.batch_size)]
+        results, failed = [], 0
+        for chunk, replies in await asyncio.gather(*(one_batch(c) for c in chunks)):
+            for sig, reply in zip(chunk, replies):
+                tx = reply.get("result")
+                logs = ((tx or {}).get("meta") or {}).get("logMessages")
+                if not logs:
+                    failed += 1
+                    continue
+                results.append((sig, tx.get("slot", 0), logs))
+        return results, failed
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
@@ -0,0 +1,129 @@
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignBundles")
+
+# عناوين Jito Tip الرسمية (قابلة للاستبدال من scanner.bundles.jito_tip_accounts)
+DEFAULT_JITO_TIP_ACCOUNTS = (
+    "96gYZGLnJYVFmbjzopPSU6QiEV5fGqZNyN9nmNhvrZU5",
+    "HFqU5x63VTqvQss8hp11i4wVV8bD44PvwucfZ2bU7gRe",
+    "Cw8CFyM9FkoMi7K7Crf6HNQqf4uEMzpKw6QNghXLvLkY",
+    "ADaUMid9yfUytqMBgopwjb2DTLSokTSzL1zt6iGPaS49",
+    "DfXygSm4jCyNCybVYYK6DwvWqjKee8pbDmJGcLWNDXjh",
+    "ADuUkR4vqLUMWXxW9gh6D6L8pMSawimctcNZ5pGwDcEt",
+    "DttWaMuVvTiduZRnguLF7jNxTgiMBZ1hyAumKUiL2KRL",
+    "3AVi9Tg9Uo68tJfuvoKvqKNWKkC5wPdSSdeBnizKZ6jT",
+)
+
+
+class TipMatcher:
+    """مطابقة كل عناوين Tip بمسح واحد لكل سطر (نمط بديل مُجمّع) بدلاً من str(logs) لكل عنوان"""
+    def __init__(self, accounts: Iterable[str] = DEFAULT_JITO_TIP_ACCOUNTS):
+        self.accounts = frozenset(a for a in accounts if a)
+        self._pattern = re.compile("|".join(map(re.escape, sorted(self.accounts)))) if self.accounts else None
+
+    def matches(self, logs: List[str]) -> bool:
+        if self._pattern is None:
+            return False
+        search = self._pattern.search
+        return any(search(line) for line in logs)
+
+
+@dataclass
+class LaunchWindow:
+    mint: str
+    create_slot: int
+    creator: Optional[str] = None
+    # المشترون لكل slot داخل النافذة + مجموعة المحافظ المميزة
+    buyers: Dict[int, Set[str]] = field(default_factory=dict)
+    wallets: Set[str] = field(default_factory=set)
+    tipped: int = 0
+    flagged: bool = False
+    # سياق حر من المستدعي (حدث الإطلاق الأصلي مثلاً) يُعاد مع التنبيه
+    context: Any = None
+
+    @property
+    def same_slot_wallets(self) -> int:
+        return len(self.buyers.get(self.create_slot, ()))
+
+
+class BundleDetector:
+    """
+    [تحديث] كشف الشراء المجمع: تجميع عمليات الشراء حسب (mint, slot) في نافذة منزلقة محدودة.
+    الإطلاق يُعلَّم عندما يشتري عدد من المحافظ المميزة في slot الإنشاء أو الـ slots القليلة التالية.
+    كل حدث O(1): بحث في قاموس + إخلاء النوافذ المنتهية من المقدمة فقط.
+    """
+    def __init__(self, window_slots: int = 2, min_wallets: int = 3, max_windows: int = 5000,
+                 max_wallets_per_launch: int = 64, tip_accounts: Optional[Iterable[str]] = None,
+                 on_bundle: Optional[Callable[[LaunchWindow], None]] = None):
+        self.window_slots = window_slots
+        self.min_wallets = min_wallets
+        self.max_windows = max_windows
+        self.max_wallets_per_launch = max_wallets_per_launch
+        self.tips = TipMatcher(tip_accounts if tip_accounts is not None else DEFAULT_JITO_TIP_ACCOUNTS)
+        self.on_bundle = on_bundle
+        # mint -> LaunchWindow بترتيب الوصول (تقريباً ترتيب slot الإنشاء)
+        self._windows: "OrderedDict[str, LaunchWindow]" = OrderedDict()
+        self._head_slot = 0
+        self.stats = {"watched": 0, "buys_seen": 0, "buys_in_window": 0, "flagged": 0, "evicted": 0}
+        self.register_gauges()
+
+    def register_gauges(self):
+        METRICS.gauge("bundle_windows", lambda: len(self._windows), owner=self)
+
+    def watch(self, mint: str, slot: int, creator: Optional[str] = None, context: Any = None):
+        """فتح نافذة مراقبة لإطلاق جديد"""
+        if not mint or mint in self._windows:
+            return
+        self._advance(slot)
+        self._windows[mint] = LaunchWindow(mint, slot, creator, context=context)
+        self.stats["watched"] += 1
+        while len(self._windows) > self.max_windows:
+            self._windows.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def _advance(self, slot: int):
+        """تقدم رأس السلسلة وإخلاء النوافذ التي تجاوزت آخر slot مسموح"""
+        if slot <= self._head_slot:
+            return
+        self._head_slot = slot
+        horizon = slot - self.window_slots
+        while self._windows:
+            oldest = next(iter(self._windows.values()))
+            if oldest.create_slot >= horizon:
+                break
+            self._windows.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def observe_buy(self, mint: str, slot: int, wallet: str, tipped: bool = False) -> Optional[LaunchWindow]:
+        """تسجيل عملية شراء؛ يعيد النافذة مرة واحدة فقط عند تجاوزها عتبة المحافظ"""
+        self.stats["buys_seen"] += 1
+        self._advance(slot)
+        window = self._windows.get(mint)
+        if window is None or not window.create_slot <= slot <= window.create_slot + self.window_slots:
+            return None
+        self.stats["buys_in_window"] += 1
+        if tipped:
+            window.tipped += 1
+        if wallet in window.wallets or len(window.wallets) >= self.max_wallets_per_launch:
+            return None
+        window.wallets.add(wallet)
+        window.buyers.setdefault(slot, set()).add(wallet)
+        if window.flagged or len(window.wallets) < self.min_wallets:
+            return None
+        window.flagged = True
+        self.stats["flagged"] += 1
+        METRICS.inc("bundles_detected_total")
+        logger.info(f"📦 [BUNDLE] {mint[:8]}... {len(window.wallets)} wallets within "
+                    f"{self.window_slots} slots (same-slot {window.same_slot_wallets}, tipped {window.tipped})")
+        if self.on_bundle:
+            try:
+                self.on_bundle(window)
+            except Exception as e:
+                logger.debug(f"Bundle listener error: {e}")
+        return window
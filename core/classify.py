@@ -0,0 +1,179 @@
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# [تحديث] تصنيف الردود حسب بصمتها البنيوية (مفاتيح المستوى الأول + مسار الرابط الموحّد)
+# بدلاً من str(data).lower() ومسح نصي كامل لكل رد. النتيجة تُحفظ في LRU لكل بصمة.
+
+CATEGORY_KEYWORDS = (
+    ("MARKET_STATS", ("price", "liquidity", "marketcap")),
+    ("TRADES_LOG", ("signature", "tx", "hash")),
+    ("WALLET_INFO", ("wallet", "address", "balance")),
+)
+
+# أجزاء المسار المتغيرة: أرقام، UUID، hex، عناوين base58 (Solana) → :id
+_ID_SEGMENT = re.compile(
+    r"^(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    r"|(?:0x)?[0-9a-fA-F]{16,}|[1-9A-HJ-NP-Za-km-z]{32,44})$"
+)
+
+
+@dataclass
+class MarketStatsRecord:
+    price: Optional[float] = None
+    liquidity: Optional[float] = None
+    market_cap: Optional[float] = None
+    mint: Optional[str] = None
+
+
+@dataclass
+class TradeRecord:
+    signature: Optional[str] = None
+    wallet: Optional[str] = None
+    mint: Optional[str] = None
+    amount: Optional[float] = None
+    price: Optional[float] = None
+
+
+@dataclass
+class WalletRecord:
+    address: Optional[str] = None
+    balance: Optional[float] = None
+
+
+# الحقل -> أسماء المفاتيح المقبولة (بعد توحيد الحالة وحذف _ و -)
+RECORD_FIELDS = {
+    "MARKET_STATS": (MarketStatsRecord, {
+        "price": ("price", "priceusd", "pricesol", "usdprice"),
+        "liquidity": ("liquidity", "liquiditysol", "liquidityusd"),
+        "market_cap": ("marketcap", "mcap", "usdmarketcap", "marketcapsol"),
+        "mint": ("mint", "tokenaddress", "pairaddress", "address"),
+    }),
+    "TRADES_LOG": (TradeRecord, {
+        "signature": ("signature", "sig", "txhash", "tx", "hash"),
+        "wallet": ("wallet", "maker", "user", "trader", "owner"),
+        "mint": ("mint", "tokenaddress", "token"),
+        "amount": ("amount", "tokenamount", "solamount", "size"),
+        "price": ("price", "priceusd", "pricesol"),
+    }),
+    "WALLET_INFO": (WalletRecord, {
+        "address": ("address", "wallet", "walletaddress", "owner"),
+        "balance": ("balance", "solbalance", "lamports"),
+    }),
+}
+
+_NUMERIC_FIELDS = {"price", "liquidity", "market_cap", "amount", "balance"}
+
+Fingerprint = Tuple[str, FrozenSet[str]]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def normalise_path(url: str) -> str:
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    segments = [":id" if _ID_SEGMENT.match(seg) else seg for seg in parts.path.split("/")]
+    return parts.netloc + "/".join(segments)
+
+
+def _norm_key(key: str) -> str:
+    return key.lower().replace("_", "").replace("-", "")
+
+
+def _top_keys(data: Any) -> FrozenSet[str]:
+    """مفاتيح المستوى الأول؛ للقوائم: مفاتيح أول عنصر (مُعلَّمة بـ []) لأنها بنية السجل"""
+    if isinstance(data, dict):
+        return frozenset(data)
+    if isinstance(data, list):
+        first = data[0] if data else None
+        return frozenset("[]" + k for k in first) if isinstance(first, dict) else frozenset(("[]",))
+    return frozenset((type(data).__name__,))
+
+
+def fingerprint(data: Any, url: str = "") -> Fingerprint:
+    return normalise_path(url), _top_keys(data)
+
+
+def _classify_keys(keys: FrozenSet[str]) -> Optional[str]:
+    normalised = [_norm_key(k.lstrip("[]")) for k in keys]
+    for category, words in CATEGORY_KEYWORDS:
+        if any(word in key for key in normalised for word in words):
+            return category
+    return None
+
+
+def _classify_text(data: Any) -> str:
+    """المسح النصي القديم: يُستخدم مرة واحدة فقط لكل بصمة لم تكشفها المفاتيح"""
+    text_data = str(data).lower()
+    for category, words in CATEGORY_KEYWORDS:
+        if any(x in text_data for x in words):
+            return category
+    return "GENERAL_DATA"
+
+
+class PayloadClassifier:
+    """LRU: بصمة -> (التصنيف، خريطة الحقول). الردود المتكررة من نفس الـ endpoint تُصنف بـ O(المفاتيح)"""
+    def __init__(self, max_entries: int = 4096, extract: bool = True):
+        self.max_entries = max_entries
+        self.extract = extract
+        self._cache: "OrderedDict[Fingerprint, Tuple[str, Optional[Dict[str, str]]]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "text_scans": 0}
+
+    def _resolve(self, fp: Fingerprint, data: Any) -> Tuple[str, Optional[Dict[str, str]]]:
+        entry = self._cache.get(fp)
+        if entry is not None:
+            self._cache.move_to_end(fp)
+            self.stats["hits"] += 1
+            return entry
+        self.stats["misses"] += 1
+        category = _classify_keys(fp[1])
+        if category is None:
+            self.stats["text_scans"] += 1
+            category = _classify_text(data)
+        entry = (category, self._field_map(category, fp[1]) if self.extract else None)
+        self._cache[fp] = entry
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _field_map(category: str, keys: FrozenSet[str]) -> Optional[Dict[str, str]]:
+        """ربط حقول السجل المُنمَّط بالمفاتيح الفعلية لهذه البصمة (مرة واحدة لكل بصمة)"""
+        spec = RECORD_FIELDS.get(category)
+        if spec is None:
+            return None
+        by_norm = {_norm_key(k.lstrip("[]")): k.lstrip("[]") for k in keys}
+        mapping = {}
+        for field_name, aliases in spec[1].items():
+            for alias in aliases:
+                if alias in by_norm:
+                    mapping[field_name] = by_norm[alias]
+                    break
+        return mapping or None
+
+    def classify(self, data: Any, url: str = "") -> str:
+        return self._resolve(fingerprint(data, url), data)[0]
+
+    def classify_and_extract(self, data: Any, url: str = "") -> Tuple[str, List[dict]]:
+        """التصنيف + سجلات مُنمَّطة (قائمة فارغة إذا لم تتطابق أي حقول)"""
+        category, mapping = self._resolve(fingerprint(data, url), data)
+        if not mapping:
+            return category, []
+        record_cls = RECORD_FIELDS[category][0]
+        items = data if isinstance(data, list) else [data]
+        records = []
+        for item in items:
+            if isinstance(item, dict):
+                fields = {f: item.get(k) for f, k in mapping.items()}
+                for f in _NUMERIC_FIELDS.intersection(fields):
+                    fields[f] = _to_float(fields[f])
+                records.append(asdict(record_cls(**fields)))
+        return category, records
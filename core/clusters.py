@@ -0,0 +1,131 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignClusters")
+
+
+class WalletClusterIndex:
+    """
+    [تحديث] فهرس تجميع المحافظ (wallet_clustering) بهيكل Union-Find تزايدي.
+    كل محفظة تشير مباشرة إلى جذر مجموعتها، والدمج ينقل أعضاء المجموعة الأصغر فقط
+    (small-to-large)، فلا يُعاد حساب المجموعات أبداً مهما تراكمت الروابط.
+    المحافظ المنفردة لا تُخزن؛ فقط من ارتبط بمحفظة أخرى.
+    """
+    def __init__(self, co_buy_window_s: float = 5.0, min_co_buys: int = 3, max_buyers_per_mint: int = 32,
+                 max_recent_mints: int = 5000, max_pairs: int = 200000):
+        self.co_buy_window_s = co_buy_window_s
+        self.min_co_buys = min_co_buys
+        self.max_buyers_per_mint = max_buyers_per_mint
+        self.max_recent_mints = max_recent_mints
+        self.max_pairs = max_pairs
+        # wallet -> جذر المجموعة (الجذر يشير لنفسه)
+        self._root: Dict[str, str] = {}
+        self._members: Dict[str, List[str]] = {}
+        # mint -> آخر المشترين (ts, wallet) ضمن النافذة، LRU على مستوى الـ mint
+        self._recent: "OrderedDict[str, deque]" = OrderedDict()
+        # (wallet_a, wallet_b) -> العملات المختلفة المشتراة معاً (لا تتجاوز min_co_buys ثم يُدمج الزوج)
+        self._pairs: "OrderedDict[Tuple[str, str], Set[str]]" = OrderedDict()
+        # يُستدعى بالصفوف المتغيرة [(cluster_id, wallet_id, reason)] بعد كل دمج
+        self.on_change: Optional[Callable[[List[tuple]], None]] = None
+        self.stats = {"unions": 0, "edges": 0, "co_buy_pairs": 0}
+        self.register_gauges()
+
+    def register_gauges(self):
+        METRICS.gauge("wallet_clusters", lambda: len(self._members), owner=self)
+
+    # ---------- Union-Find ----------
+    def find(self, wallet: str) -> str:
+        return self._root.get(wallet, wallet)
+
+    def cluster_of(self, wallet: str) -> Optional[str]:
+        """معرف المجموعة أو None للمحفظة المنفردة"""
+        return self._root.get(wallet)
+
+    def cluster_size(self, wallet: str) -> int:
+        root = self._root.get(wallet)
+        return len(self._members[root]) if root else 1
+
+    def union(self, a: str, b: str, reason: str) -> bool:
+        self.stats["edges"] += 1
+        if not a or not b or a == b:
+            return False
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        members_a = self._members.get(ra) or [ra]
+        members_b = self._members.get(rb) or [rb]
+        if len(members_a) < len(members_b):
+            ra, rb, members_a, members_b = rb, ra, members_b, members_a
+        # المتغير: كل أعضاء المجموعة الأصغر + الجذر نفسه إن كان منفرداً قبل الدمج
+        changed = list(members_b) if ra in self._members else members_b + [ra]
+        for wallet in members_b:
+            self._root[wallet] = ra
+        self._root[ra] = ra
+        members_a.extend(members_b)
+        self._members[ra] = members_a
+        self._members.pop(rb, None)
+        self.stats["unions"] += 1
+        METRICS.inc("wallet_unions_total", reason=reason)
+        if self.on_change:
+            self.on_change([(ra, w, reason) for w in changed])
+        return True
+
+    def load(self, rows: Iterable[Tuple[str, str]]):
+        """استعادة الفهرس من (wallet_id, cluster_id) المحفوظة دون إعادة حساب"""
+        for wallet, cluster in rows:
+            self._root[wallet] = cluster
+            self._root.setdefault(cluster, cluster)
+            self._members.setdefault(cluster, [])
+            self._members[cluster].append(wallet)
+        for cluster, members in self._members.items():
+            if cluster not in members:
+                members.append(cluster)
+        if self._members:
+            logger.info(f"🕸️ Wallet clusters restored: {len(self._members)} clusters / {len(self._root)} wallets")
+
+    # ---------- مصادر الروابط ----------
+    def link_cosigners(self, wallets: Iterable[str]):
+        """محافظ وقّعت نفس المعاملة (مُنشئ ودافع، أو عدة مشترين في معاملة واحدة)"""
+        wallets = [w for w in dict.fromkeys(wallets) if w]
+        for other in wallets[1:]:
+            self.union(wallets[0], other, "co_sign")
+
+    def observe_buy(self, mint: str, wallet: str, ts: Optional[float] = None):
+        """
+        شراء نفس العملة خلال ثوانٍ: يُعد زوجاً مرة واحدة لكل mint،
+        والزوج يُربط بعد min_co_buys عملات مختلفة. التكلفة محدودة بـ max_buyers_per_mint.
+        """
+        ts = time.time() if ts is None else ts
+        recent = self._recent.get(mint)
+        if recent is None:
+            recent = self._recent[mint] = deque(maxlen=self.max_buyers_per_mint)
+            if len(self._recent) > self.max_recent_mints:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(mint)
+        while recent and ts - recent[0][0] > self.co_buy_window_s:
+            recent.popleft()
+        for _, other in recent:
+            if other != wallet:
+                self._count_pair(wallet, other, mint)
+        recent.append((ts, wallet))
+
+    def _count_pair(self, a: str, b: str, mint: str):
+        key = (a, b) if a < b else (b, a)
+        mints = self._pairs.get(key)
+        if mints is None:
+            self._pairs[key] = {mint}
+            self.stats["co_buy_pairs"] += 1
+            if len(self._pairs) > self.max_pairs:
+                self._pairs.popitem(last=False)
+            mints = self._pairs.get(key, ())
+        else:
+            self._pairs.move_to_end(key)
+            mints.add(mint)
+        if len(mints) >= self.min_co_buys and self.union(a, b, "co_buy"):
+            # الزوج صار في مجموعة واحدة: لا حاجة لعداده بعد الآن
+            self._pairs.pop(key, None)
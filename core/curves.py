@@ -0,0 +1,243 @@
+import asyncio
+import base64
+import json
+import logging
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+from core.frames import decode_json
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignCurves")
+
+# [تحديث] حالة منحنيات الربط (Bonding Curve) محلياً عبر accountSubscribe على نفس اتصال WSS.
+# تخطيط الحساب: 8 بايت بصمة Anchor ثم خمسة u64 ثم bool
+_CURVE_LAYOUT = struct.Struct("<QQQQQ?")
+LAMPORTS_PER_SOL = 1_000_000_000
+TOKEN_DECIMALS = 1_000_000
+
+
+@dataclass
+class CurveState:
+    virtual_token_reserves: int
+    virtual_sol_reserves: int
+    real_token_reserves: int
+    real_sol_reserves: int
+    token_total_supply: int
+    complete: bool = False
+
+    @property
+    def price_sol(self) -> float:
+        if not self.virtual_token_reserves:
+            return 0.0
+        return (self.virtual_sol_reserves / LAMPORTS_PER_SOL) / (self.virtual_token_reserves / TOKEN_DECIMALS)
+
+    @property
+    def market_cap_sol(self) -> float:
+        return self.price_sol * (self.token_total_supply / TOKEN_DECIMALS)
+
+    @property
+    def liquidity_sol(self) -> float:
+        return self.real_sol_reserves / LAMPORTS_PER_SOL
+
+
+def decode_bonding_curve(data: bytes) -> Optional[CurveState]:
+    if len(data) < 8 + _CURVE_LAYOUT.size:
+        return None
+    return CurveState(*_CURVE_LAYOUT.unpack_from(data, 8))
+
+
+@dataclass
+class TrackedCurve:
+    mint: str
+    bonding_curve: str
+    creator: Optional[str]
+    dev_tokens: int = 0
+    # المُنشئ + موقّع معاملة الإطلاق: شراؤهما وبيعهما اللاحق يحدّث dev_tokens
+    dev_wallets: Tuple[str, ...] = ()
+    state: Optional[CurveState] = None
+    slot: int = 0
+    tracked_at: float = field(default_factory=time.monotonic)
+    updated_at: float = 0.0
+
+    @property
+    def dev_holding_pct(self) -> float:
+        if not self.state or not self.state.token_total_supply:
+            return 0.0
+        return 100.0 * self.dev_tokens / self.state.token_total_supply
+
+
+class _Connection:
+    """اشتراكات نقطة واحدة: أرقام الاشتراك خاصة بكل اتصال"""
+    __slots__ = ("ws", "req_to_curve", "sub_to_curve", "curve_to_sub")
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.req_to_curve: Dict[int, str] = {}
+        self.sub_to_curve: Dict[int, str] = {}
+        self.curve_to_sub: Dict[str, int] = {}
+
+
+class BondingCurveTracker:
+    """
+    جدول حالة محلي لكل عملة متتبعة: القيمة السوقية والسيولة ونسبة المطور
+    تُحسب من الاحتياطيات المفكوكة داخل العملية، فتُقيَّم الفلاتر في ميكروثوانٍ بدون HTTP.
+    """
+    def __init__(self, min_liquidity_sol: float = 0.0, max_dev_holding_pct: float = 100.0,
+                 sol_price_usd: float = 150.0, max_tracked: int = 2000, ttl_s: float = 1800.0):
+        self.min_liquidity_sol = min_liquidity_sol
+        self.max_dev_holding_pct = max_dev_holding_pct
+        self.sol_price_usd = sol_price_usd
+        self.max_tracked = max_tracked
+        self.ttl_s = ttl_s
+        # bonding_curve -> TrackedCurve مرتبة حسب وقت التتبع (الأقدم أولاً للإخلاء)
+        self._curves: "OrderedDict[str, TrackedCurve]" = OrderedDict()
+        self._by_mint: Dict[str, str] = {}
+        self._conns: Dict[str, _Connection] = {}
+        self._next_id = 1000
+        # مستمع اختياري لكل تحديث سعر (mint, price_sol) — دفتر المراكز مثلاً
+        self.on_price: Optional[Callable[[str, float], None]] = None
+        self.stats = {"tracked": 0, "updates": 0, "evicted": 0}
+        self.register_gauges()
+
+    def register_gauges(self):
+        METRICS.gauge("curves_tracked", lambda: len(self._curves), owner=self)
+
+    # ---------- التتبع ----------
+    def track(self, mint: str, bonding_curve: str, creator: Optional[str] = None,
+              dev_tokens: int = 0, seed: Optional[Tuple[int, int]] = None, dev_wallets: Tuple[str, ...] = ()):
+        """بدء تتبع منحنى عملة جديدة والاشتراك فيه على كل الاتصالات المفتوحة"""
+        if not mint or not bonding_curve or bonding_curve in self._curves:
+            return
+        wallets = tuple(dict.fromkeys(w for w in (creator, *dev_wallets) if w))
+        tracked = TrackedCurve(mint, bonding_curve, creator, dev_tokens, wallets)
+        if seed:
+            # احتياطيات افتراضية من TradeEvent في نفس معاملة الإطلاق (قبل أول إشعار حساب)
+            virtual_sol, virtual_token = seed
+            tracked.state = CurveState(virtual_token, virtual_sol, 0, 0, 1_000_000_000 * TOKEN_DECIMALS)
+        self._curves[bonding_curve] = tracked
+        self._by_mint[mint] = bonding_curve
+        self.stats["tracked"] += 1
+        self._expire()
+        for endpoint, conn in self._conns.items():
+            self._subscribe(conn, bonding_curve)
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._curves:
+            curve, oldest = next(iter(self._curves.items()))
+            if len(self._curves) <= self.max_tracked and now - oldest.tracked_at < self.ttl_s:
+                break
+            self._curves.popitem(last=False)
+            self._by_mint.pop(oldest.mint, None)
+            self.stats["evicted"] += 1
+            for conn in self._conns.values():
+                self._unsubscribe(conn, curve)
+
+    def get(self, mint: str) -> Optional[TrackedCurve]:
+        curve = self._by_mint.get(mint)
+        return self._curves.get(curve) if curve else None
+
+    def observe_trade(self, trade):
+        """شراء/بيع المطور بعد الإطلاق: رفض محلي على نسبة المطور لا يبقى نهائياً بعد أن يبيع"""
+        tracked = self.get(trade.mint)
+        if tracked is None or trade.user not in tracked.dev_wallets:
+            return
+        if trade.is_buy:
+            tracked.dev_tokens += trade.token_amount
+        else:
+            tracked.dev_tokens = max(tracked.dev_tokens - trade.token_amount, 0)
+        METRICS.inc("curve_dev_trades_total", side="buy" if trade.is_buy else "sell")
+
+    def market_cap_usd(self, mint: str) -> Optional[float]:
+        """تقدير استرشادي فقط: sol_price_usd ثابت من الإعدادات ولا يتبع سعر SOL الحقيقي"""
+        tracked = self.get(mint)
+        if not tracked or not tracked.state:
+            return None
+        return tracked.state.market_cap_sol * self.sol_price_usd
+
+    def passes_filters(self, mint: str) -> Optional[bool]:
+        """None = لا توجد حالة محلية بعد؛ وإلا نتيجة فلاتر السيولة ونسبة المطور"""
+        tracked = self.get(mint)
+        if not tracked or not tracked.state:
+            return None
+        state = tracked.state
+        if tracked.updated_at and state.liquidity_sol < self.min_liquidity_sol:
+            return False
+        return tracked.dev_holding_pct <= self.max_dev_holding_pct
+
+    # ---------- الاتصالات ----------
+    def _send(self, conn: _Connection, payload: dict):
+        task = asyncio.ensure_future(conn.ws.send(json.dumps(payload)))
+        # الاتصال قد يُغلق قبل الإرسال؛ إعادة الاتصال ستعيد الاشتراك عبر attach()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _subscribe(self, conn: _Connection, curve: str):
+        self._next_id += 1
+        conn.req_to_curve[self._next_id] = curve
+        self._send(conn, {"jsonrpc": "2.0", "id": self._next_id, "method": "accountSubscribe",
+                          "params": [curve, {"encoding": "base64", "commitment": "processed"}]})
+
+    def _unsubscribe(self, conn: _Connection, curve: str):
+        sub_id = conn.curve_to_sub.pop(curve, None)
+        if sub_id is None:
+            return
+        conn.sub_to_curve.pop(sub_id, None)
+        self._next_id += 1
+        self._send(conn, {"jsonrpc": "2.0", "id": self._next_id, "method": "accountUnsubscribe",
+                          "params": [sub_id]})
+
+    def attach(self, endpoint: str, ws):
+        """اتصال جديد (أو إعادة اتصال): إعادة الاشتراك في كل المنحنيات المتتبعة"""
+        conn = _Connection(ws)
+        self._conns[endpoint] = conn
+        for curve in self._curves:
+            self._subscribe(conn, curve)
+
+    def detach(self, endpoint: str):
+        self._conns.pop(endpoint, None)
+
+    def handle_frame(self, raw, endpoint: str):
+        conn = self._conns.get(endpoint)
+        if conn is None:
+            return
+        try:
+            msg = decode_json(raw)
+        except ValueError:
+            return
+        if "params" not in msg:
+            # رد على طلب اشتراك: ربط رقم الاشتراك بالمنحنى
+            curve = conn.req_to_curve.pop(msg.get("id"), None)
+            sub_id = msg.get("result")
+            if curve and isinstance(sub_id, int) and not isinstance(sub_id, bool):
+                if curve in self._curves:
+                    conn.sub_to_curve[sub_id] = curve
+                    conn.curve_to_sub[curve] = sub_id
+                else:
+                    conn.curve_to_sub[curve] = sub_id
+                    self._unsubscribe(conn, curve)
+            return
+        params = msg["params"]
+        curve = conn.sub_to_curve.get(params.get("subscription"))
+        tracked = self._curves.get(curve) if curve else None
+        if tracked is None:
+            return
+        result = params["result"]
+        slot = result.get("context", {}).get("slot", 0)
+        if slot < tracked.slot:
+            # إشعار متأخر من نقطة أبطأ
+            return
+        data = result["value"]["data"]
+        state = decode_bonding_curve(base64.b64decode(data[0]))
+        if state is None:
+            return
+        tracked.state = state
+        tracked.slot = slot
+        tracked.updated_at = time.monotonic()
+        self.stats["updates"] += 1
+        METRICS.inc("curve_updates_total")
+        if self.on_price is not None:
+            self.on_price(tracked.mint, state.price_sol)
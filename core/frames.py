@@ -0,0 +1,110 @@
+import json
+from typing import Optional, List, Tuple, Union
+
+# [تحديث] مسار سريع لإطارات logsSubscribe: رفض ما ليس Create قبل أي فك ترميز
+CREATE_MARKER = "Instruction: Create"
+_CREATE_MARKER_B = CREATE_MARKER.encode()
+# إطارات الشراء/البيع تُفك فقط عند تفعيل كاشف يحتاجها (مجمع، مجموعات، تداول وهمي)
+BUY_MARKER = "Instruction: Buy"
+_BUY_MARKER_B = BUY_MARKER.encode()
+SELL_MARKER = "Instruction: Sell"
+_SELL_MARKER_B = SELL_MARKER.encode()
+
+try:
+    import msgspec
+
+    class _Value(msgspec.Struct):
+        signature: Optional[str] = None
+        logs: Optional[List[str]] = None
+
+    class _Context(msgspec.Struct):
+        slot: int = 0
+
+    class _Result(msgspec.Struct):
+        context: Optional[_Context] = None
+        value: Optional[_Value] = None
+
+    class _Params(msgspec.Struct):
+        result: Optional[_Result] = None
+
+    class _Frame(msgspec.Struct):
+        params: Optional[_Params] = None
+
+    # يفك فقط الحقول المطلوبة ويتجاهل الباقي (err, context, ...)
+    _frame_decoder = msgspec.json.Decoder(_Frame)
+    DECODER_BACKEND = "msgspec"
+except ImportError:
+    msgspec = None
+    try:
+        import orjson
+        DECODER_BACKEND = "orjson"
+    except ImportError:
+        orjson = None
+        DECODER_BACKEND = "json"
+
+
+# إشعارات حالة الحسابات (accountSubscribe) تمر بمسار منفصل عن سجلات Create
+ACCOUNT_MARKER = "accountNotification"
+_ACCOUNT_MARKER_B = ACCOUNT_MARKER.encode()
+
+
+def is_account_frame(raw: Union[str, bytes]) -> bool:
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        return _ACCOUNT_MARKER_B in raw
+    return ACCOUNT_MARKER in raw
+
+
+def is_rpc_response(raw: Union[str, bytes]) -> bool:
+    """ردود الطلبات (نتيجة الاشتراك مثلاً) لا تحتوي params على عكس الإشعارات"""
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        return b'"params"' not in raw
+    return '"params"' not in raw
+
+
+def decode_json(raw: Union[str, bytes]):
+    """فك JSON كامل بأسرع مكتبة متاحة (للإطارات النادرة خارج المسار الساخن)"""
+    if msgspec is not None:
+        return msgspec.json.decode(raw)
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def is_create_candidate(raw: Union[str, bytes]) -> bool:
+    """فلتر نصي خام: معظم إطارات Pump.fun ليست Create فلا داعي لفكها"""
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        return _CREATE_MARKER_B in raw
+    return CREATE_MARKER in raw
+
+
+def is_buy_candidate(raw: Union[str, bytes]) -> bool:
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        return _BUY_MARKER_B in raw
+    return BUY_MARKER in raw
+
+
+def is_sell_candidate(raw: Union[str, bytes]) -> bool:
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        return _SELL_MARKER_B in raw
+    return SELL_MARKER in raw
+
+
+def decode_logs_frame(raw: Union[str, bytes]) -> Optional[Tuple[str, List[str], int]]:
+    """استخراج (signature, logs, slot) فقط من إطار إشعار، أو None لأي إطار آخر"""
+    if msgspec is not None:
+        frame = _frame_decoder.decode(raw)
+        result = frame.params.result if frame.params else None
+        value = result.value if result else None
+        if value is None:
+            return None
+        return value.signature, value.logs or [], result.context.slot if result.context else 0
+
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    params = data.get("params")
+    if not params:
+        return None
+    result = params["result"]
+    value = result["value"]
+    return value.get("signature"), value.get("logs") or [], (result.get("context") or {}).get("slot", 0)
+
+
+def has_create_instruction(logs: List[str]) -> bool:
+    return any(CREATE_MARKER in l for l in logs)
@@ -0,0 +1,281 @@
+import asyncio
+import fnmatch
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiosqlite
+
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignIngest")
+
+# [تحديث] جداول الاستيعاب: بصمة المحتوى مفتاح أساسي، فإعادة معالجة ملف (بعد انهيار) لا تكرر الصفوف
+# memory_trades: صفقات ماسح الذاكرة (scraper.py) | intercept_log: سجل المعترض الشبكي (radar.py)
+INGEST_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS memory_trades (
+        fp TEXT PRIMARY KEY,
+        sig TEXT,
+        price REAL,
+        amount REAL,
+        raw_json TEXT,
+        source_file TEXT,
+        ingested_at INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_memory_trades_ingested ON memory_trades(ingested_at)",
+    """
+    CREATE TABLE IF NOT EXISTS intercept_log (
+        fp TEXT PRIMARY KEY,
+        time TEXT,
+        category TEXT,
+        source TEXT,
+        tab TEXT,
+        url TEXT,
+        size INTEGER,
+        details_json TEXT,
+        records_json TEXT,
+        source_file TEXT,
+        ingested_at INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_intercept_log_category ON intercept_log(category, ingested_at)",
+)
+
+TRADES_INSERT_SQL = """
+    INSERT OR IGNORE INTO memory_trades (fp, sig, price, amount, raw_json, source_file, ingested_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+INTERCEPT_INSERT_SQL = """
+    INSERT OR IGNORE INTO intercept_log
+        (fp, time, category, source, tab, url, size, details_json, records_json, source_file, ingested_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# ملفات trades_*.json (الماسح) تُكتب ذرياً؛ مقاطع smart_archive (المعترض) تُستهلك فقط بعد التدوير والضغط (.gz)
+TRADES_PATTERN = "trades_*.json"
+INTERCEPT_PATTERN = "smart_archive_*.jsonl.gz"
+CLAIM_SUFFIX = ".claimed"
+BAD_SUFFIX = ".bad"
+
+
+def _fp(raw: str) -> str:
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _num(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_trades_file(path: str, source: str, now_ms: int) -> List[tuple]:
+    with open(path, "rb") as f:
+        trades = json.loads(f.read())
+    rows = []
+    for trade in trades if isinstance(trades, list) else [trades]:
+        if not isinstance(trade, dict):
+            continue
+        raw = json.dumps(trade, sort_keys=True, ensure_ascii=False)
+        qty = next((trade[k] for k in ("amount", "size", "qty", "quantity") if k in trade), None)
+        rows.append((_fp(raw), trade.get("sig") or trade.get("signature"), _num(trade.get("price")),
+                     _num(qty), raw, source, now_ms))
+    return rows
+
+
+def parse_intercept_segment(path: str, source: str, now_ms: int) -> List[tuple]:
+    rows = []
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            details = json.dumps(entry.get("details"), ensure_ascii=False)
+            records = entry.get("records")
+            rows.append((
+                _fp(line.decode("utf-8", errors="replace")), entry.get("time"), entry.get("category"),
+                entry.get("source"), entry.get("tab"), entry.get("url_snippet"), entry.get("size"),
+                details, json.dumps(records, ensure_ascii=False) if records else None, source, now_ms,
+            ))
+    return rows
+
+
+class SpoolIngestor:
+    """
+    [تحديث] "مصنع" الاستيعاب من README: مدير يراقب مجلدات الـ spool ويضع كل ملف جديد على
+    خط تجميع محدود، وعدد ثابت من العمال الدائمين يحجز الملف (rename ذري)، يفكه، يدرجه دفعة
+    واحدة (executemany) في قاعدة بيانات الأرشيف نفسها، ثم يحذفه بعد الـ Commit فقط (at-least-once).
+    """
+    def __init__(self, db_path: str, spool_dirs: Iterable[str], worker_count: int = 4,
+                 queue_size: int = 1000, poll_interval_s: float = 1.0, max_db_retries: int = 5,
+                 max_retry_backoff_s: float = 60.0):
+        self.db_path = db_path
+        self.spool_dirs = [d for d in spool_dirs if d]
+        self.worker_count = max(1, int(worker_count))
+        self.poll_interval_s = poll_interval_s
+        # فشل الإدراج: إعادة المحاولة بتراجع أسي لكل ملف، ثم العزل بعد max_db_retries
+        self.max_db_retries = max(1, int(max_db_retries))
+        self.max_retry_backoff_s = max_retry_backoff_s
+        # path -> (عدد الإخفاقات، لا يُعاد قبل هذا الوقت monotonic)
+        self._retries: Dict[str, Tuple[int, float]] = {}
+        self._queue: "asyncio.Queue[Tuple[str, str]]" = asyncio.Queue(maxsize=queue_size)
+        # ملفات على الخط أو قيد المعالجة: المدير لا يضعها مرتين
+        self._queued = set()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._started_at = 0.0
+        self.stats = {"files": 0, "rows": 0, "inserted": 0, "bytes": 0, "errors": 0, "quarantined": 0}
+
+    async def start(self) -> "SpoolIngestor":
+        self._db = await aiosqlite.connect(self.db_path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        # الكاتب الخلفي للأرشيف يشارك نفس الملف: ننتظر القفل بدلاً من الفشل
+        await self._db.execute("PRAGMA busy_timeout=5000")
+        for ddl in INGEST_SCHEMA:
+            await self._db.execute(ddl)
+        await self._db.commit()
+        for spool in self.spool_dirs:
+            os.makedirs(spool, exist_ok=True)
+            self._recover_claims(spool)
+        self._started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._watch())]
+        self._tasks += [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        METRICS.gauge("ingest_queue_depth", self._queue.qsize)
+        METRICS.gauge("ingest_files_per_s", self.files_per_second)
+        logger.info(f"🏭 Ingestion factory online: {self.worker_count} workers on {', '.join(self.spool_dirs)}")
+        return self
+
+    def _recover_claims(self, spool: str):
+        """ملفات محجوزة من تشغيل سابق انقطع قبل الحذف: تُعاد للخط (الإدراج idempotent)"""
+        for name in os.listdir(spool):
+            if name.endswith(CLAIM_SUFFIX):
+                os.replace(os.path.join(spool, name), os.path.join(spool, name[:-len(CLAIM_SUFFIX)]))
+
+    def files_per_second(self) -> float:
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        return self.stats["files"] / elapsed if elapsed > 0 else 0.0
+
+    # ---------- المدير ----------
+    def _scan(self, spool: str) -> List[Tuple[str, str]]:
+        found = []
+        with os.scandir(spool) as it:
+            for entry in it:
+                name = entry.name
+                if fnmatch.fnmatch(name, TRADES_PATTERN):
+                    kind = "trades"
+                elif fnmatch.fnmatch(name, INTERCEPT_PATTERN):
+                    kind = "intercept"
+                else:
+                    continue
+                found.append((entry.stat().st_mtime, entry.path, kind))
+        # الأقدم أولاً
+        return [(path, kind) for _, path, kind in sorted(found)]
+
+    async def _watch(self):
+        while True:
+            for spool in self.spool_dirs:
+                try:
+                    now = time.monotonic()
+                    for path, kind in self._scan(spool):
+                        if path in self._queued or self._retries.get(path, (0, 0.0))[1] > now:
+                            continue
+                        self._queued.add(path)
+                        # خط محدود: المدير ينتظر هنا بدلاً من تضخم الذاكرة
+                        await self._queue.put((path, kind))
+                except OSError as e:
+                    logger.debug(f"Spool scan error [{spool}]: {e}")
+            await asyncio.sleep(self.poll_interval_s)
+
+    # ---------- العمال ----------
+    async def _worker(self, worker_id: int):
+        while True:
+            path, kind = await self._queue.get()
+            try:
+                await self._process(path, kind)
+            except Exception as e:
+                self.stats["errors"] += 1
+                METRICS.inc("ingest_errors_total")
+                logger.error(f"❌ Ingest worker {worker_id} failed on {os.path.basename(path)}: {e}")
+            finally:
+                self._queued.discard(path)
+                self._queue.task_done()
+
+    async def _process(self, path: str, kind: str):
+        claimed = path + CLAIM_SUFFIX
+        try:
+            # الحجز: rename ذري؛ إن فشل فقد أخذه مستهلك آخر أو حُذف
+            os.replace(path, claimed)
+        except FileNotFoundError:
+            return
+        started = time.perf_counter()
+        size = os.path.getsize(claimed)
+        parser = parse_trades_file if kind == "trades" else parse_intercept_segment
+        try:
+            rows = await asyncio.to_thread(parser, claimed, os.path.basename(path), int(time.time() * 1000))
+        except (ValueError, OSError, EOFError) as e:
+            # ملف تالف: عزل بدلاً من إعادة المحاولة للأبد
+            os.replace(claimed, path + BAD_SUFFIX)
+            self.stats["quarantined"] += 1
+            METRICS.inc("ingest_quarantined_total")
+            logger.warning(f"⚠️ Quarantined {os.path.basename(path)}: {e}")
+            return
+
+        sql = TRADES_INSERT_SQL if kind == "trades" else INTERCEPT_INSERT_SQL
+        async with self._db_lock:
+            before = self._db.total_changes
+            try:
+                if rows:
+                    await self._db.executemany(sql, rows)
+                await self._db.commit()
+            except Exception:
+                await self._db.rollback()
+                self._db_failed(path, claimed)
+                raise
+            inserted = self._db.total_changes - before
+        os.remove(claimed)
+        self._retries.pop(path, None)
+
+        self.stats["files"] += 1
+        self.stats["rows"] += len(rows)
+        self.stats["inserted"] += inserted
+        self.stats["bytes"] += size
+        METRICS.inc("ingest_files_total", kind=kind)
+        METRICS.inc("ingest_rows_total", len(rows), kind=kind)
+        METRICS.observe("ingest_file", time.perf_counter() - started)
+
+    def _db_failed(self, path: str, claimed: str):
+        """إعادة الملف لمكانه مع تراجع أسي قبل أن يعيده المدير للخط؛ العزل بعد max_db_retries"""
+        failures = self._retries.get(path, (0, 0.0))[0] + 1
+        if failures >= self.max_db_retries:
+            self._retries.pop(path, None)
+            os.replace(claimed, path + BAD_SUFFIX)
+            self.stats["quarantined"] += 1
+            METRICS.inc("ingest_quarantined_total")
+            logger.warning(f"⚠️ Quarantined {os.path.basename(path)} after {failures} failed inserts")
+            return
+        delay = min(self.poll_interval_s * (2 ** failures), self.max_retry_backoff_s)
+        self._retries[path] = (failures, time.monotonic() + delay)
+        os.replace(claimed, path)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+        if self.stats["files"]:
+            logger.info(f"🏭 Ingested {self.stats['files']} files | {self.stats['inserted']} new rows "
+                        f"({self.stats['rows'] - self.stats['inserted']} duplicates) | "
+                        f"{self.files_per_second():.1f} files/s | {self.stats['quarantined']} quarantined")
@@ -0,0 +1,134 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import List, Optional
+
+logger = logging.getLogger("SovereignJsonl")
+
+_STOP = object()
+
+
+class RotatingJsonlWriter:
+    """
+    [تحديث] كاتب JSONL في خيط خلفي: المعترضات تضع السجل في طابور محدود وتعود فوراً،
+    والخيط يسلسل ويكتب دفعات على ملف مفتوح دائماً، ثم يدوّر المقطع ويضغطه (gzip) حسب الحجم أو الزمن.
+    عند امتلاء الطابور يُسقط السجل ويُحتسب بدلاً من حجب حلقة أحداث المتصفح.
+    """
+    def __init__(self, out_dir: str, prefix: str = "smart_archive", max_bytes: int = 64 * 1024 * 1024,
+                 max_seconds: float = 600.0, queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval_s: float = 0.5, compress: bool = True):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.compress = compress
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._fh = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._bytes = 0
+        self._reported_drops = 0
+        self.stats = {"written": 0, "dropped": 0, "bytes": 0, "batches": 0, "segments": 0}
+
+    def start(self) -> "RotatingJsonlWriter":
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="jsonl-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def write(self, entry: dict) -> bool:
+        """غير حاجب: False إذا سقط السجل بسبب الضغط"""
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+
+    # ---------- الخيط الخلفي ----------
+    def _run(self):
+        running = True
+        while running:
+            batch: List[dict] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval_s)
+                while True:
+                    if item is _STOP:
+                        running = False
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                if batch:
+                    self._write_batch(batch)
+                elif self._fh is not None and time.time() - self._opened_at >= self.max_seconds:
+                    self._rotate()
+            except OSError as e:
+                logger.error(f"❌ JSONL write error: {e}")
+            self._report_drops()
+        self._rotate()
+
+    def _write_batch(self, batch: List[dict]):
+        if self._fh is None:
+            self._open()
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch).encode("utf-8")
+        self._fh.write(data)
+        self._fh.flush()
+        self._bytes += len(data)
+        self.stats["written"] += len(batch)
+        self.stats["bytes"] += len(data)
+        self.stats["batches"] += 1
+        if self._bytes >= self.max_bytes or time.time() - self._opened_at >= self.max_seconds:
+            self._rotate()
+
+    def _open(self):
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        self._path = os.path.join(self.out_dir, f"{self.prefix}_{stamp}_{self.stats['segments']:04d}.jsonl")
+        self._fh = open(self._path, "ab")
+        self._opened_at = time.time()
+        self._bytes = 0
+
+    def _rotate(self):
+        """إغلاق المقطع الحالي وضغطه؛ المقطع التالي يُفتح مع أول دفعة"""
+        if self._fh is None:
+            return
+        self._fh.close()
+        self._fh = None
+        self.stats["segments"] += 1
+        if self.compress and self._bytes:
+            # ضغط إلى ملف مؤقت ثم rename ذري: مستهلك الـ spool لا يرى مقطعاً .gz نصف مكتوب
+            tmp = self._path + ".gz.tmp"
+            with open(self._path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp, self._path + ".gz")
+            os.remove(self._path)
+        elif not self._bytes:
+            os.remove(self._path)
+
+    def _report_drops(self):
+        dropped = self.stats["dropped"]
+        if dropped > self._reported_drops:
+            logger.warning(f"⚠️ JSONL backpressure: {dropped - self._reported_drops} entries dropped "
+                           f"({dropped} total, queue {self._queue.maxsize})")
+            self._reported_drops = dropped
+
+    def close(self, timeout: float = 10.0):
+        """تفريغ الطابور وإغلاق وضغط آخر مقطع"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
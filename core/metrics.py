@@ -0,0 +1,226 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("SovereignMetrics")
+
+# [تحديث] طبقة قياس خفيفة بدون اعتماديات: مدرجات زمنية لكل مرحلة + عدادات + مقاييس لحظية
+# تُعرض بصيغة Prometheus النصية على منفذ محلي
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """تقدير تقريبي من حدود الدلاء (الحد الأعلى للدلو الذي يحوي الكمية)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "sovereign"):
+        self.prefix = prefix
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        # اسم المقياس -> الكائن الذي يقرأ منه (لإلغاء مقاييس نسخة أُرسلت لعملية أخرى)
+        self._gauge_owners: Dict[str, object] = {}
+        # [تحديث] لقطات من عمليات أخرى (وضع خط الإنتاج): المصدر -> آخر لقطة مستلمة
+        self._remote: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        hist = self.stages.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(stage, Histogram())
+        hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, fn: Callable[[], float], owner: object = None):
+        """مقياس لحظي يُحسب عند القراءة فقط (عمق الطابور، الاستخدام...)"""
+        self.gauges[name] = fn
+        if owner is not None:
+            self._gauge_owners[name] = owner
+        else:
+            self._gauge_owners.pop(name, None)
+
+    def release(self, owner: object):
+        """إزالة مقاييس كائن لم يعد هذا السجل يملك حالته الحية (نسخة pickle في عملية مرحلة)"""
+        for name in [n for n, o in self._gauge_owners.items() if o is owner]:
+            self.gauges.pop(name, None)
+            del self._gauge_owners[name]
+
+    def snapshot(self) -> dict:
+        """لقطة قابلة للتسلسل (pickle) للعدادات والمدرجات وقيم المقاييس اللحظية المحلية"""
+        gauges = {}
+        for name, fn in list(self.gauges.items()):
+            try:
+                gauges[name] = float(fn())
+            except Exception:
+                continue
+        return {
+            "counters": dict(self.counters),
+            "stages": {k: (h.buckets, list(h.counts), h.total, h.count) for k, h in list(self.stages.items())},
+            "gauges": gauges,
+        }
+
+    def absorb(self, source: str, snapshot: dict):
+        """دمج لقطة عملية أخرى؛ العدادات تراكمية فتحل اللقطة الجديدة محل السابقة لنفس المصدر"""
+        self._remote[source] = snapshot
+
+    def _merged(self):
+        counters = dict(self.counters)
+        stages = {k: (h.buckets, list(h.counts), h.total, h.count) for k, h in self.stages.items()}
+        # (الاسم، الوسوم) -> القيمة: المقاييس اللحظية لا تُجمع بين العمليات (نسبة استخدام 180% مثلاً)
+        # بل تحمل وسم stage للعملية المصدر
+        gauges: Dict[Tuple[str, LabelKey], float] = {}
+        for name, fn in self.gauges.items():
+            try:
+                gauges[(name, ())] = float(fn())
+            except Exception:
+                continue
+        for source, snap in self._remote.items():
+            for key, value in snap["counters"].items():
+                counters[key] = counters.get(key, 0) + value
+            for stage, (buckets, counts, total, count) in snap["stages"].items():
+                mine = stages.get(stage)
+                if mine is None or mine[0] != buckets:
+                    stages[stage] = (buckets, list(counts), total, count)
+                else:
+                    stages[stage] = (buckets, [a + b for a, b in zip(mine[1], counts)], mine[2] + total, mine[3] + count)
+            for name, value in snap["gauges"].items():
+                gauges[(name, (("stage", source),))] = value
+        return counters, stages, gauges
+
+    @staticmethod
+    def _escape(value) -> str:
+        """قيم الوسوم حسب الصيغة النصية لـ Prometheus: هروب الشرطة المائلة وعلامة الاقتباس والسطر الجديد"""
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @classmethod
+    def _labels(cls, pairs) -> str:
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{cls._escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self) -> str:
+        p = self.prefix
+        counters, stages, gauges = self._merged()
+        lines = [f"# TYPE {p}_stage_latency_seconds histogram"]
+        for stage, (buckets, counts, total, count) in sorted(stages.items()):
+            stage = self._escape(stage)
+            cumulative = 0
+            for bound, c in zip(buckets, counts):
+                cumulative += c
+                lines.append(f'{p}_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{p}_stage_latency_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{p}_stage_latency_seconds_count{{stage="{stage}"}} {count}')
+
+        for name in sorted({n for n, _ in counters}):
+            lines.append(f"# TYPE {p}_{name} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{p}_{name}{self._labels(labels)} {value:g}")
+
+        for name in sorted({n for n, _ in gauges}):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            for (n, labels), value in sorted(gauges.items()):
+                if n == name:
+                    lines.append(f"{p}_{name}{self._labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def parse_prometheus_text(text: str) -> Dict[str, float]:
+    """قراءة بسيطة للصيغة النصية: اسم المقياس (مع الوسوم) -> القيمة"""
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        try:
+            values[name] = float(value)
+        except ValueError:
+            continue
+    return values
+
+
+class MetricsServer:
+    """خادم HTTP مصغر على asyncio يخدم GET /metrics"""
+    def __init__(self, registry: MetricsRegistry = METRICS, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"📈 Metrics endpoint on http://{self.host}:{self.port}/metrics")
+        return self
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode(errors="replace").split()
+            if len(parts) >= 2 and parts[1].split("?")[0] == "/metrics":
+                body, status = self.registry.render().encode(), "200 OK"
+            else:
+                body, status = b"not found\n", "404 Not Found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug(f"Metrics request error: {e}")
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
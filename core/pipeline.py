@@ -0,0 +1,437 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import aiosqlite
+
+from core.archiver import SovereignArchiver
+from core.metrics import METRICS
+from core.sniffer import PumpSniffer
+from core.writer import ArchiveWriter
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger("SovereignPipeline")
+
+# [تحديث] وضع خط الإنتاج متعدد العمليات: الاستقبال | الفك والإثراء | التخزين
+# كل مرحلة عملية مستقلة بحلقة أحداث خاصة (uvloop إن توفر)، والمراحل متصلة بطوابير أنابيب محدودة.
+STAGES = ("storage", "enrichment", "ingest")
+PUMP_BATCH = 256
+# مهلة تفريغ مرحلة الإثراء عند الإيقاف (أقل من مهلة join في المشرف)
+DRAIN_TIMEOUT_S = 8.0
+
+
+def _run(coro):
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(coro)
+
+
+def _pump(source, loop, handler, stop, drain: bool = False):
+    """
+    خيط قراءة من طابور العمليات إلى حلقة الأحداث: دفعات حتى PUMP_BATCH عنصر،
+    وانتظار معالجة الدفعة قبل قراءة التالية (الضغط العكسي يصل للمرحلة السابقة عبر سعة الطابور).
+    drain=True: بعد الإيقاف نستمر حتى يفرغ الطابور (مرحلة التخزين لا تفقد كتابات).
+    """
+    while True:
+        if stop.is_set() and not drain:
+            return
+        try:
+            batch = [source.get(timeout=0.2)]
+        except queue.Empty:
+            if stop.is_set():
+                return
+            continue
+        except (EOFError, OSError):
+            return
+        while len(batch) < PUMP_BATCH:
+            try:
+                batch.append(source.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            asyncio.run_coroutine_threadsafe(handler(batch), loop).result()
+        except RuntimeError:
+            # الحلقة أُغلقت أثناء الإيقاف
+            return
+        except Exception as e:
+            METRICS.inc("pipeline_handler_errors_total")
+            logger.debug(f"Pipeline handler error: {e}")
+
+
+def _start_pump(source, handler, stop, drain: bool = False) -> threading.Thread:
+    thread = threading.Thread(target=_pump, args=(source, asyncio.get_running_loop(), handler, stop, drain),
+                              name="pipeline-pump", daemon=True)
+    thread.start()
+    return thread
+
+
+def _emit(events, item):
+    """رسائل للمشرف (إحصاءات، أهداف محفوظة): لا نحجب المرحلة أبداً من أجلها"""
+    try:
+        events.put_nowait(item)
+    except queue.Full:
+        METRICS.inc("pipeline_events_dropped_total")
+
+
+async def _put(target, item):
+    """إدخال بضغط عكسي: الانتظار خارج الحلقة عند امتلاء الطابور بدلاً من الإسقاط"""
+    try:
+        target.put_nowait(item)
+    except queue.Full:
+        await asyncio.get_running_loop().run_in_executor(None, target.put, item)
+
+
+async def _report_until_stopped(name: str, events, stop, interval_s: float, stats_fn: Callable[[], dict]):
+    last = 0.0
+    while not stop.is_set():
+        await asyncio.sleep(0.2)
+        if time.monotonic() - last >= interval_s:
+            last = time.monotonic()
+            _emit(events, ("stats", name, {"stats": stats_fn(), "metrics": METRICS.snapshot()}))
+    _emit(events, ("stats", name, {"stats": stats_fn(), "metrics": METRICS.snapshot()}))
+
+
+# ---------- مرحلة الاستقبال ----------
+class _ConnectionLink:
+    """
+    بديل BondingCurveTracker داخل عملية الاستقبال: المتتبع وسد الفجوات يعيشان في مرحلة الإثراء،
+    فنبلغها بحالة الاتصالات ونرسل عبر المقبس الحقيقي ما يطلبه المتتبع من اشتراكات.
+    """
+    def __init__(self, frames):
+        self.frames = frames
+        self.sockets: Dict[str, object] = {}
+
+    def attach(self, endpoint: str, ws):
+        self.sockets[endpoint] = ws
+        self._control(("attach", endpoint, None))
+
+    def detach(self, endpoint: str):
+        self.sockets.pop(endpoint, None)
+        self._control(("detach", endpoint, None))
+
+    def _control(self, item):
+        """يُستدعى على حلقة الاستقبال: لا put حاجب هنا أبداً، الطابور الممتلئ يُنتظر في خيط جانبي"""
+        try:
+            self.frames.put_nowait(item)
+        except queue.Full:
+            # attach/detach لا تُسقط (بدء سد الفجوة يعتمد عليها)؛ ترتيبها بين الإطارات غير مهم
+            METRICS.inc("pipeline_control_deferred_total")
+            asyncio.get_running_loop().run_in_executor(None, self.frames.put, item)
+
+    async def handle_control(self, batch):
+        for op, endpoint, payload in batch:
+            if op == "send":
+                ws = self.sockets.get(endpoint)
+                if ws is not None:
+                    try:
+                        await ws.send(payload)
+                    except Exception:
+                        # إعادة الاتصال ستعيد الاشتراك عبر attach()
+                        pass
+            elif op == "resync":
+                # مرحلة الإثراء أُعيد تشغيلها: نعيد إعلان الاتصالات المفتوحة لتعيد الاشتراكات
+                for url in list(self.sockets):
+                    self._control(("attach", url, None))
+
+
+class FrameForwarder(PumpSniffer):
+    """حلقة الاستقبال نفسها (إعادة الاتصال، التراجع، إحصاءات النقاط) لكن كل إطار يُمرر خاماً للمرحلة التالية"""
+    def __init__(self, wss_url, frames, retry_strategy: Optional[dict] = None, link: Optional[_ConnectionLink] = None):
+        super().__init__(wss_url, archiver=None, retry_strategy=retry_strategy, curve_tracker=link)
+        self.frames = frames
+
+    def _start_workers(self):
+        # لا فك ولا عمال هنا: الاستقبال وحده في هذه العملية
+        pass
+
+    def _handle_frame(self, msg, endpoint: str):
+        self.stats["frames"] += 1
+        try:
+            self.frames.put_nowait(("frame", endpoint, msg))
+            self.stats["enqueued"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+            METRICS.inc("frames_dropped_total")
+
+
+async def _ingest_main(spec: dict, frames, control, events, stop):
+    link = _ConnectionLink(frames)
+    forwarder = FrameForwarder(spec["wss_urls"], frames, spec.get("retry_strategy"), link)
+    _start_pump(control, link.handle_control, stop)
+    receiver = asyncio.create_task(forwarder.start_sniffing())
+    await _report_until_stopped("ingest", events, stop, spec["stats_interval_s"], lambda: dict(forwarder.stats))
+    forwarder.stop()
+    receiver.cancel()
+    await asyncio.gather(receiver, return_exceptions=True)
+
+
+# ---------- مرحلة الفك والإثراء ----------
+class _RemoteSocket:
+    """مقبس وهمي للمتتبع: الإرسال يعود لعملية الاستقبال عبر طابور التحكم"""
+    def __init__(self, control, endpoint: str):
+        self.control = control
+        self.endpoint = endpoint
+
+    async def send(self, payload: str):
+        await _put(self.control, ("send", self.endpoint, payload))
+
+
+class _ForwardingWriter:
+    """بديل ArchiveWriter بنفس الواجهة: العمليات تُرسل لمرحلة التخزين بدلاً من SQLite محلي"""
+    def __init__(self, store):
+        self.store = store
+        self.is_running = True
+        self.stats = {"forwarded": 0}
+
+    async def start(self):
+        pass
+
+    async def upsert(self, *args):
+        self.stats["forwarded"] += 1
+        await _put(self.store, ("upsert", args))
+
+    async def record_event(self, *args):
+        self.stats["forwarded"] += 1
+        await _put(self.store, ("event", args))
+
+    def queue_clusters(self, rows: List[tuple]):
+        try:
+            self.store.put_nowait(("clusters", (list(rows),)))
+        except queue.Full:
+            # يُستدعى من مسار الفك المتزامن: لا ننتظر، نسقط ونحتسب
+            METRICS.inc("pipeline_cluster_rows_dropped_total", len(rows))
+
+    async def close(self):
+        pass
+
+
+async def _load_clusters(db_path: str) -> List[tuple]:
+    try:
+        async with aiosqlite.connect(db_path) as db:
+            return list(await db.execute_fetchall("SELECT wallet_id, cluster_id FROM wallet_clusters"))
+    except Exception:
+        return []
+
+
+async def _enrichment_main(spec: dict, frames, control, store, events, stop):
+    comp = spec["components"]
+    for component in comp.values():
+        if hasattr(component, "register_gauges"):
+            component.register_gauges()
+    curves, clusters, positions = comp.get("curves"), comp.get("clusters"), comp.get("positions")
+    archiver = SovereignArchiver(
+        db_path=spec["db_path"], recheck_settings=spec.get("recheck"),
+        curve_tracker=curves, wash_detector=comp.get("wash"),
+    )
+    archiver.writer = _ForwardingWriter(store)
+    archiver.on_archived.append(lambda event: _emit(events, ("archived", "enrichment", event)))
+    if clusters is not None:
+        clusters.load(await _load_clusters(spec["db_path"]))
+        clusters.on_change = archiver.writer.queue_clusters
+    if positions is not None and curves is not None:
+        positions.start()
+        curves.on_price = positions.queue_price
+
+        def open_position(event: dict):
+            tracked = curves.get(event["mint"])
+            if tracked and tracked.state and tracked.state.price_sol:
+                price = tracked.state.price_sol
+                positions.open(event["mint"], price, spec["position_size_sol"] / price)
+
+        archiver.on_archived.append(open_position)
+
+    sniffer = PumpSniffer(
+        wss_url=spec["wss_urls"], archiver=archiver, curve_tracker=curves,
+        bundle_detector=comp.get("bundles"), cluster_index=clusters, wash_detector=comp.get("wash"),
+        backfiller=comp.get("backfiller"), **spec["sniffer"],
+    )
+    sniffer.is_running = True
+    sniffer._start_workers()
+
+    async def dispatch(batch):
+        for op, endpoint, payload in batch:
+            if op == "frame":
+                sniffer._handle_frame(payload, endpoint)
+            elif op == "attach":
+                # نفس خطافات الاتصال في الوضع الأحادي: اشتراكات المنحنيات + بدء سد الفجوة
+                sniffer._on_connect(endpoint, _RemoteSocket(control, endpoint))
+            elif op == "detach":
+                sniffer._on_disconnect(endpoint)
+
+    pump = _start_pump(frames, dispatch, stop, drain=True)
+    # بعد إعادة تشغيل هذه المرحلة: اطلب إعادة إعلان الاتصالات المفتوحة
+    await _put(control, ("resync", None, None))
+
+    def stage_stats() -> dict:
+        stats = dict(sniffer.stats)
+        stats.update(http_requests=archiver.http_stats["requests"], forwarded=archiver.writer.stats["forwarded"])
+        return stats
+
+    await _report_until_stopped("enrichment", events, stop, spec["stats_interval_s"], stage_stats)
+    # الاستقبال متوقف بالفعل (المشرف يوقف المراحل بالترتيب): نفرغ الإطارات المتبقية ثم الأحداث
+    # المعلقة والجارية لدى العمال قبل أن يضبط المشرف إيقاف التخزين
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + DRAIN_TIMEOUT_S
+    await loop.run_in_executor(None, pump.join, DRAIN_TIMEOUT_S)
+    try:
+        await asyncio.wait_for(sniffer._queue.join(), timeout=max(deadline - loop.time(), 0.1))
+    except asyncio.TimeoutError:
+        METRICS.inc("pipeline_drain_timeouts_total", stage="enrichment")
+        logger.warning(f"⚠️ Enrichment drain timed out with {sniffer._queue.qsize()} events queued")
+    sniffer.stop()
+    if sniffer.backfiller is not None:
+        await sniffer.backfiller.close()
+    if positions is not None:
+        await positions.close()
+    await archiver.close()
+    # لقطة أخيرة بعد التفريغ (اللقطة السابقة أُرسلت لحظة الإيقاف)
+    _emit(events, ("stats", "enrichment", {"stats": stage_stats(), "metrics": METRICS.snapshot()}))
+
+
+# ---------- مرحلة التخزين ----------
+async def _storage_main(spec: dict, store, events, stop):
+    writer = ArchiveWriter(spec["db_path"])
+    await writer.start()
+
+    async def apply(batch):
+        for op, args in batch:
+            if op == "upsert":
+                await writer.upsert(*args)
+            elif op == "event":
+                await writer.record_event(*args)
+            elif op == "clusters":
+                writer.queue_clusters(*args)
+
+    pump = _start_pump(store, apply, stop, drain=True)
+    await _report_until_stopped("storage", events, stop, spec["stats_interval_s"], lambda: dict(writer.stats))
+    # انتظار تفريغ ما تبقى في الطابور قبل آخر Commit
+    await asyncio.get_running_loop().run_in_executor(None, pump.join)
+    await writer.close()
+
+
+def run_stage(name: str, spec: dict, queues: dict, stop):
+    """نقطة دخول كل عملية (قابلة للاستيراد من أجل spawn)"""
+    # الإيقاف يأتي من المشرف عبر stop؛ Ctrl+C في الطرفية لا يقطع المراحل في منتصف دفعة
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO)
+    if name == "ingest":
+        _run(_ingest_main(spec, queues["frames"], queues["control"], queues["events"], stop))
+    elif name == "enrichment":
+        _run(_enrichment_main(spec, queues["frames"], queues["control"], queues["store"], queues["events"], stop))
+    elif name == "storage":
+        _run(_storage_main(spec, queues["store"], queues["events"], stop))
+
+
+# ---------- المشرف ----------
+class PipelineSupervisor:
+    """
+    يشغل المراحل الثلاث كعمليات مستقلة، يعيد تشغيل أي مرحلة تنهار (بتراجع أسي)،
+    ويجمع إحصاءاتها ومقاييسها في سجل القياس الرئيسي (نقطة /metrics نفسها).
+    """
+    def __init__(self, spec: dict, frame_queue_size: int = 10000, store_queue_size: int = 10000,
+                 restart_backoff_s: float = 1.0, max_restart_backoff_s: float = 30.0):
+        self.spec = spec
+        self.restart_backoff_s = restart_backoff_s
+        self.max_restart_backoff_s = max_restart_backoff_s
+        # spawn: لا نرث حلقة الأحداث الجارية ولا الخيوط من العملية الأم
+        self._ctx = multiprocessing.get_context("spawn")
+        self.queues = {
+            "frames": self._ctx.Queue(maxsize=frame_queue_size),
+            "control": self._ctx.Queue(maxsize=1000),
+            "store": self._ctx.Queue(maxsize=store_queue_size),
+            "events": self._ctx.Queue(maxsize=10000),
+        }
+        self._stops = {name: self._ctx.Event() for name in STAGES}
+        self._procs: Dict[str, multiprocessing.process.BaseProcess] = {}
+        self._restarts = {name: 0 for name in STAGES}
+        self.restart_totals = {name: 0 for name in STAGES}
+        self._started_at = {name: 0.0 for name in STAGES}
+        self._running = False
+        self._events_stop = threading.Event()
+        self.on_archived: List[Callable[[dict], None]] = []
+        self.stage_stats: Dict[str, dict] = {}
+        # المكونات تُنسخ (pickle) إلى عملية الإثراء: مقاييسها هنا تقرأ نسخة الأم التي لا تتغير أبداً،
+        # فتُلغى وتُسجل من جديد داخل المرحلة وتصل عبر لقطات الإحصاء
+        for component in spec.get("components", {}).values():
+            if component is not None:
+                METRICS.release(component)
+
+    def _spawn(self, name: str):
+        proc = self._ctx.Process(target=run_stage, name=f"sovereign-{name}",
+                                 args=(name, self.spec, self.queues, self._stops[name]), daemon=True)
+        proc.start()
+        self._procs[name] = proc
+        self._started_at[name] = time.monotonic()
+        logger.info(f"🏭 Stage [{name}] online (pid {proc.pid})")
+
+    async def _on_events(self, batch):
+        for kind, source, payload in batch:
+            if kind == "stats":
+                self.stage_stats[source] = payload["stats"]
+                METRICS.absorb(source, payload["metrics"])
+            elif kind == "archived":
+                for listener in self.on_archived:
+                    try:
+                        listener(payload)
+                    except Exception as e:
+                        logger.debug(f"Archive listener error: {e}")
+
+    async def run(self):
+        """تشغيل المراحل (التخزين أولاً حتى لا تمتلئ الطوابير قبل وجود مستهلك) ثم المراقبة حتى close()"""
+        self._running = True
+        METRICS.gauge("pipeline_frames_queue_depth", self.queues["frames"].qsize)
+        METRICS.gauge("pipeline_store_queue_depth", self.queues["store"].qsize)
+        _start_pump(self.queues["events"], self._on_events, self._events_stop)
+        for name in STAGES:
+            self._spawn(name)
+        while self._running:
+            await asyncio.sleep(1.0)
+            for name in STAGES:
+                proc = self._procs.get(name)
+                if not self._running or proc is None or proc.is_alive():
+                    continue
+                # مرحلة مستقرة لأكثر من دقيقة تبدأ عدّاد التراجع من جديد
+                if time.monotonic() - self._started_at[name] > 60:
+                    self._restarts[name] = 0
+                wait = min(self.restart_backoff_s * (2 ** self._restarts[name]), self.max_restart_backoff_s)
+                self._restarts[name] += 1
+                self.restart_totals[name] += 1
+                METRICS.inc("pipeline_restarts_total", stage=name)
+                logger.error(f"💥 Stage [{name}] exited (code {proc.exitcode}). Restarting in {wait:.1f}s...")
+                self._procs[name] = None
+                asyncio.get_running_loop().call_later(wait, self._respawn, name)
+
+    def _respawn(self, name: str):
+        if self._running and self._procs.get(name) is None:
+            self._spawn(name)
+
+    async def close(self, timeout: float = 10.0):
+        """إيقاف مرتب: الاستقبال ← الإثراء ← التخزين (يفرغ طابوره قبل آخر Commit)"""
+        self._running = False
+        loop = asyncio.get_running_loop()
+        for name in reversed(STAGES):
+            self._stops[name].set()
+            proc = self._procs.get(name)
+            if proc is None:
+                continue
+            await loop.run_in_executor(None, proc.join, timeout)
+            if proc.is_alive():
+                logger.warning(f"⚠️ Stage [{name}] did not stop in {timeout:.0f}s. Terminating.")
+                proc.terminate()
+        # آخر لقطات الإحصاء قبل إيقاف خيط الأحداث
+        await asyncio.sleep(0.5)
+        self._events_stop.set()
+        for name in reversed(STAGES):
+            stats = self.stage_stats.get(name)
+            if stats:
+                summary = " | ".join(f"{k} {v:g}" for k, v in stats.items() if isinstance(v, (int, float)))
+                logger.info(f"📊 Stage [{name}] restarts {self.restart_totals[name]} | {summary}")
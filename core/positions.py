@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignPositions")
+
+
+@dataclass
+class SellIntent:
+    mint: str
+    amount: float       # كمية التوكن المطلوب بيعها
+    price: float        # السعر (SOL) لحظة الإطلاق
+    multiple: float     # السعر / سعر الدخول
+    reason: str         # stop_loss | tier_1 | tier_2 ...
+
+
+class DryRunExecutor:
+    """منفذ تجريبي: يسجل نوايا البيع بدون إرسال أي معاملة"""
+    def __init__(self):
+        self.stats = {"intents": 0, "stop_losses": 0, "take_profits": 0}
+
+    async def submit(self, intents: List[SellIntent]):
+        for intent in intents:
+            self.stats["intents"] += 1
+            self.stats["stop_losses" if intent.reason == "stop_loss" else "take_profits"] += 1
+            logger.info(f"🧾 [DRY_RUN] SELL {intent.amount:,.0f} {intent.mint[:8]}... "
+                        f"@ {intent.price:.10f} SOL (x{intent.multiple:.2f}, {intent.reason})")
+
+
+class PositionBook:
+    """
+    [تحديث] كل المراكز المفتوحة في مصفوفات NumPy عمودية (سعر الدخول، الحجم الأصلي، المتبقي، الشرائح المنفذة).
+    كل دفعة أسعار تُقيَّم مرة واحدة لكل المراكز: وقف الخسارة والشرائح بعمليات متجهة بدون حلقة لكل مركز.
+    """
+    def __init__(self, stop_loss: Optional[float] = 0.85,
+                 tiers: Sequence[Tuple[float, float]] = ((2.0, 50), (5.0, 30), (10.0, 20)),
+                 executor=None, capacity: int = 1024, tick_interval_ms: float = 250):
+        self.stop_loss = stop_loss
+        tiers = sorted(tiers)
+        self.tier_multipliers = np.array([m for m, _ in tiers], dtype=np.float64)
+        # النسبة التراكمية من الحجم الأصلي بعد تنفيذ k شرائح (العنصر 0 = لا شيء)
+        self.tier_cum_frac = np.concatenate(([0.0], np.cumsum([p for _, p in tiers]) / 100.0)).clip(max=1.0)
+        self.executor = executor or DryRunExecutor()
+        self.tick_interval = tick_interval_ms / 1000.0
+        self._alloc(capacity)
+        self._rows: Dict[str, int] = {}
+        self._mints: List[Optional[str]] = [None] * capacity
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        # أسعار واردة بين دفعتين: mint -> آخر سعر (آخر تحديث يفوز)
+        self._ticks: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"opened": 0, "closed": 0, "ticks": 0, "batches": 0, "intents": 0}
+        self.register_gauges()
+
+    def register_gauges(self):
+        METRICS.gauge("positions_open", lambda: len(self._rows), owner=self)
+
+    def _alloc(self, capacity: int):
+        self.entry = np.zeros(capacity, dtype=np.float64)
+        self.size = np.zeros(capacity, dtype=np.float64)
+        self.remaining = np.zeros(capacity, dtype=np.float64)
+        self.last_price = np.zeros(capacity, dtype=np.float64)
+        self.tiers_hit = np.zeros(capacity, dtype=np.int8)
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        old = len(self.entry)
+        columns = (self.entry, self.size, self.remaining, self.last_price, self.tiers_hit, self.active)
+        self._alloc(old * 2)
+        for new, prev in zip((self.entry, self.size, self.remaining, self.last_price, self.tiers_hit, self.active), columns):
+            new[:old] = prev
+        self._mints.extend([None] * old)
+        self._free.extend(range(old * 2 - 1, old - 1, -1))
+
+    # ---------- المراكز ----------
+    def open(self, mint: str, entry_price: float, amount: float):
+        if not mint or entry_price <= 0 or amount <= 0 or mint in self._rows:
+            return
+        if not self._free:
+            self._grow()
+        row = self._free.pop()
+        self.entry[row] = entry_price
+        self.size[row] = amount
+        self.remaining[row] = amount
+        self.last_price[row] = entry_price
+        self.tiers_hit[row] = 0
+        self.active[row] = True
+        self._rows[mint] = row
+        self._mints[row] = mint
+        self.stats["opened"] += 1
+
+    def close_position(self, mint: str):
+        row = self._rows.pop(mint, None)
+        if row is None:
+            return
+        self.active[row] = False
+        self.remaining[row] = 0.0
+        self._mints[row] = None
+        self._free.append(row)
+        self.stats["closed"] += 1
+
+    def position(self, mint: str) -> Optional[dict]:
+        row = self._rows.get(mint)
+        if row is None:
+            return None
+        return {"entry": float(self.entry[row]), "size": float(self.size[row]),
+                "remaining": float(self.remaining[row]), "last_price": float(self.last_price[row]),
+                "tiers_hit": int(self.tiers_hit[row])}
+
+    # ---------- الأسعار ----------
+    def queue_price(self, mint: str, price: float):
+        """يُستدعى لكل تحديث سعر (من متتبع المنحنيات مثلاً)؛ يُطبق مع الدفعة التالية"""
+        if mint in self._rows:
+            self._ticks[mint] = price
+
+    def apply_ticks(self, prices: Dict[str, float]) -> List[SellIntent]:
+        """تقييم دفعة أسعار على كل المراكز في تمريرة متجهة واحدة"""
+        rows = self._rows
+        idx = np.fromiter((rows.get(m, -1) for m in prices), dtype=np.int64, count=len(prices))
+        values = np.fromiter(prices.values(), dtype=np.float64, count=len(prices))
+        keep = idx >= 0
+        self.last_price[idx[keep]] = values[keep]
+        self.stats["ticks"] += int(keep.sum())
+        self.stats["batches"] += 1
+
+        active = self.active
+        ratio = np.divide(self.last_price, self.entry, out=np.zeros_like(self.entry), where=active)
+        # وقف الخسارة: بيع كل المتبقي
+        if self.stop_loss:
+            stop = active & (ratio <= self.stop_loss)
+        else:
+            stop = np.zeros_like(active)
+        # الشرائح: عدد المضاعفات المتجاوزة مقابل ما نُفذ سابقاً
+        reached = np.searchsorted(self.tier_multipliers, ratio, side="right").astype(np.int8)
+        tier_up = active & ~stop & (reached > self.tiers_hit)
+        target_left = self.size * (1.0 - self.tier_cum_frac[reached])
+        sell = np.where(stop, self.remaining, 0.0)
+        sell = np.where(tier_up, np.clip(self.remaining - target_left, 0.0, self.remaining), sell)
+        triggered = np.flatnonzero(stop | tier_up)
+        if not len(triggered):
+            return []
+
+        self.tiers_hit[tier_up] = reached[tier_up]
+        self.remaining -= sell
+        intents = []
+        for row in triggered:
+            mint = self._mints[row]
+            reason = "stop_loss" if stop[row] else f"tier_{int(self.tiers_hit[row])}"
+            if sell[row] > 0:
+                intents.append(SellIntent(mint, float(sell[row]), float(self.last_price[row]),
+                                          float(ratio[row]), reason))
+            if stop[row] or self.remaining[row] <= self.size[row] * 1e-9:
+                self.close_position(mint)
+        self.stats["intents"] += len(intents)
+        METRICS.inc("sell_intents_total", int((stop & (sell > 0)).sum()), reason="stop_loss")
+        METRICS.inc("sell_intents_total", int((tier_up & (sell > 0)).sum()), reason="take_profit")
+        return intents
+
+    # ---------- الحلقة ----------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            if not self._ticks:
+                continue
+            batch, self._ticks = self._ticks, {}
+            try:
+                with METRICS.timer("position_tick"):
+                    intents = self.apply_ticks(batch)
+                if intents:
+                    await self.executor.submit(intents)
+            except Exception as e:
+                logger.error(f"❌ Position tick error: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,136 @@
+import base64
+import binascii
+import hashlib
+import struct
+from dataclasses import dataclass
+from typing import Optional, List
+
+import base58
+
+# [تحديث] فك أحداث برنامج Pump.fun مباشرة من سطور "Program data:" بدون أي طلب HTTP
+PROGRAM_DATA_PREFIX = "Program data: "
+
+
+def _anchor_discriminator(name: str) -> bytes:
+    """بصمة أحداث Anchor: أول 8 بايت من sha256("event:<Name>")"""
+    return hashlib.sha256(f"event:{name}".encode()).digest()[:8]
+
+
+CREATE_EVENT_DISCRIMINATOR = _anchor_discriminator("CreateEvent")
+TRADE_EVENT_DISCRIMINATOR = _anchor_discriminator("TradeEvent")
+
+
+@dataclass
+class CreateEvent:
+    name: str
+    symbol: str
+    uri: str
+    mint: str
+    bonding_curve: str
+    user: str
+    creator: str
+
+
+@dataclass
+class TradeEvent:
+    mint: str
+    sol_amount: int
+    token_amount: int
+    is_buy: bool
+    user: str
+    timestamp: int
+    virtual_sol_reserves: int
+    virtual_token_reserves: int
+
+
+class _Reader:
+    """قارئ Borsh مصغر: سلاسل نصية u32+bytes ومفاتيح 32 بايت"""
+    __slots__ = ("buf", "pos")
+
+    def __init__(self, buf: bytes, pos: int = 0):
+        self.buf = buf
+        self.pos = pos
+
+    def remaining(self) -> int:
+        return len(self.buf) - self.pos
+
+    def take(self, n: int) -> bytes:
+        end = self.pos + n
+        if end > len(self.buf):
+            raise ValueError("truncated event payload")
+        chunk = self.buf[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def string(self) -> str:
+        (length,) = struct.unpack_from("<I", self.take(4))
+        return self.take(length).decode("utf-8", errors="replace")
+
+    def pubkey(self) -> str:
+        return base58.b58encode(self.take(32)).decode()
+
+    def u64(self) -> int:
+        return struct.unpack_from("<Q", self.take(8))[0]
+
+    def i64(self) -> int:
+        return struct.unpack_from("<q", self.take(8))[0]
+
+    def boolean(self) -> bool:
+        return self.take(1) != b"\x00"
+
+
+def decode_create_event(payload: bytes) -> Optional[CreateEvent]:
+    if payload[:8] != CREATE_EVENT_DISCRIMINATOR:
+        return None
+    try:
+        r = _Reader(payload, 8)
+        name, symbol, uri = r.string(), r.string(), r.string()
+        mint, bonding_curve, user = r.pubkey(), r.pubkey(), r.pubkey()
+        # الإصدارات الأحدث من البرنامج تضيف حقل creator بعد user
+        creator = r.pubkey() if r.remaining() >= 32 else user
+    except (ValueError, struct.error):
+        return None
+    return CreateEvent(name, symbol, uri, mint, bonding_curve, user, creator)
+
+
+def decode_trade_event(payload: bytes) -> Optional[TradeEvent]:
+    if payload[:8] != TRADE_EVENT_DISCRIMINATOR:
+        return None
+    try:
+        r = _Reader(payload, 8)
+        mint = r.pubkey()
+        sol_amount, token_amount, is_buy = r.u64(), r.u64(), r.boolean()
+        user = r.pubkey()
+        timestamp = r.i64()
+        virtual_sol, virtual_token = r.u64(), r.u64()
+    except (ValueError, struct.error):
+        return None
+    return TradeEvent(mint, sol_amount, token_amount, is_buy, user, timestamp, virtual_sol, virtual_token)
+
+
+def iter_program_data(logs: List[str]):
+    """إرجاع البايتات الخام لكل سطر Program data صالح"""
+    for line in logs:
+        if not line.startswith(PROGRAM_DATA_PREFIX):
+            continue
+        try:
+            yield base64.b64decode(line[len(PROGRAM_DATA_PREFIX):])
+        except (binascii.Error, ValueError):
+            continue
+
+
+def find_create_event(logs: List[str]) -> Optional[CreateEvent]:
+    for payload in iter_program_data(logs):
+        event = decode_create_event(payload)
+        if event is not None:
+            return event
+    return None
+
+
+def find_trade_events(logs: List[str]) -> List[TradeEvent]:
+    trades = []
+    for payload in iter_program_data(logs):
+        event = decode_trade_event(payload)
+        if event is not None:
+            trades.append(event)
+    return trades
@@ -0,0 +1,171 @@
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignRechecker")
+
+TAG_SEPARATOR = " | "
+# الوسم الافتراضي يسقط متى عُرف عن العملة وسم أدق
+DEFAULT_TAG = "New Launch"
+
+
+def merge_tags(current: str, new: str) -> str:
+    """دمج وسم سلوك جديد مع وسوم مدخل معلق دون تكرار (BUNDLED_LAUNCH بعد New Launch مثلاً)"""
+    tags = [t for t in (current or "").split(TAG_SEPARATOR) if t]
+    if new and new not in tags:
+        tags.append(new)
+    if len(tags) > 1 and DEFAULT_TAG in tags:
+        tags.remove(DEFAULT_TAG)
+    return TAG_SEPARATOR.join(tags)
+
+
+@dataclass
+class PendingMint:
+    mint: str
+    wallet: str
+    raw_data: dict
+    behavior_tag: str
+    first_seen: float
+    due: float
+    attempt: int = 0
+
+
+class RecheckScheduler:
+    """
+    [تحديث] إعادة فحص العملات المرفوضة لاحقاً بدلاً من قرار نهائي لحظة الإطلاق.
+    كومة (Heap) مرتبة حسب موعد الفحص التالي + مجموعة معلقة محدودة الحجم.
+    الفحوصات المستحقة تُجمع في دفعة واحدة عبر العميل المشترك للأرشيف.
+    """
+    def __init__(self, archiver, initial_delay_s: float = 30.0, backoff_factor: float = 2.0,
+                 max_delay_s: float = 300.0, expiry_s: float = 1800.0, max_pending: int = 5000,
+                 batch_size: int = 50):
+        self.archiver = archiver
+        self.initial_delay_s = initial_delay_s
+        self.backoff_factor = backoff_factor
+        self.max_delay_s = max_delay_s
+        self.expiry_s = expiry_s
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending: Dict[str, PendingMint] = {}
+        # (due, mint): الحذف كسول — المدخل يُتجاهل إذا لم يعد يطابق pending[mint].due
+        self._heap: List[Tuple[float, str]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"scheduled": 0, "rechecks": 0, "promoted": 0, "expired": 0, "rejected_full": 0}
+        METRICS.gauge("recheck_pending", lambda: len(self._pending))
+
+    def schedule(self, mint: str, wallet: str, raw_data: dict, behavior_tag: str):
+        """إضافة عملة مرفوضة للمراقبة (مرة واحدة لكل mint؛ التكرار يضيف وسمه للمدخل القائم)"""
+        if not mint or mint == "Scanning...":
+            return
+        entry = self._pending.get(mint)
+        if entry is not None:
+            merged = merge_tags(entry.behavior_tag, behavior_tag)
+            if merged != entry.behavior_tag:
+                entry.behavior_tag = merged
+                METRICS.inc("recheck_tags_merged_total")
+            return
+        if len(self._pending) >= self.max_pending:
+            self.stats["rejected_full"] += 1
+            METRICS.inc("recheck_rejected_total")
+            return
+        now = time.monotonic()
+        entry = PendingMint(mint, wallet, raw_data, behavior_tag, first_seen=now,
+                            due=now + self.initial_delay_s)
+        self._pending[mint] = entry
+        heapq.heappush(self._heap, (entry.due, mint))
+        self.stats["scheduled"] += 1
+        if self._heap[0][1] == mint:
+            self._wake.set()
+        self._ensure_running()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _pop_due(self, now: float) -> List[PendingMint]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            at, mint = heapq.heappop(self._heap)
+            entry = self._pending.get(mint)
+            if entry is not None and entry.due == at:
+                due.append(entry)
+        return due
+
+    async def _run(self):
+        while self._pending:
+            now = time.monotonic()
+            batch = self._pop_due(now)
+            if not batch:
+                timeout = max(self._heap[0][0] - now, 0) if self._heap else None
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._process(batch)
+            except Exception as e:
+                logger.debug(f"Recheck batch error: {e}")
+
+    async def _process(self, batch: List[PendingMint]):
+        self.stats["rechecks"] += len(batch)
+        now = time.monotonic()
+        # العملات التي ما زالت مرفوضة محلياً (حالة المنحنى) لا تحتاج أي طلب HTTP
+        remote = []
+        for entry in list(batch):
+            try:
+                if self.archiver.needs_remote_check(entry.mint):
+                    remote.append(entry.mint)
+            except Exception as e:
+                # كل مدخل سُحب من الكومة: الخطأ يعيد جدولته صراحة بدلاً من تركه معلقاً بلا موعد
+                logger.debug(f"Recheck local check failed [{entry.mint[:8]}]: {e}")
+                batch.remove(entry)
+                self._reschedule(entry, now)
+        try:
+            results = await self.archiver.fetch_coins_batch(remote) if remote else {}
+        except Exception as e:
+            logger.debug(f"Recheck batch fetch failed ({len(remote)} mints): {e}")
+            results = {}
+        now = time.monotonic()
+        for entry in batch:
+            data = results.get(entry.mint) or {}
+            try:
+                archived = await self.archiver.archive_if_viable(entry.wallet, entry.raw_data, entry.behavior_tag, data)
+            except Exception as e:
+                METRICS.inc("recheck_errors_total")
+                logger.debug(f"Recheck archive failed [{entry.mint[:8]}]: {e}")
+                archived = False
+            if archived:
+                del self._pending[entry.mint]
+                self.stats["promoted"] += 1
+                METRICS.inc("recheck_promoted_total")
+                age = now - entry.first_seen
+                logger.info(f"🌱 [LATE_BLOOMER] {entry.mint[:8]}... passed after {age:.0f}s ({entry.attempt + 1} rechecks)")
+                continue
+            self._reschedule(entry, now)
+
+    def _reschedule(self, entry: PendingMint, now: float):
+        """الموعد التالي بتراجع أسي، أو الإسقاط عند تجاوز مدة الصلاحية"""
+        entry.attempt += 1
+        delay = min(self.initial_delay_s * (self.backoff_factor ** entry.attempt), self.max_delay_s)
+        if now + delay - entry.first_seen > self.expiry_s:
+            self._pending.pop(entry.mint, None)
+            self.stats["expired"] += 1
+            METRICS.inc("recheck_expired_total")
+            return
+        entry.due = now + delay
+        heapq.heappush(self._heap, (entry.due, entry.mint))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._pending.clear()
+        self._heap.clear()
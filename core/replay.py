@@ -0,0 +1,147 @@
+import asyncio
+import glob
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import websockets
+
+logger = logging.getLogger("SovereignReplay")
+
+# [تحديث] تسجيل وإعادة تشغيل إطارات logsSubscribe الخام لقياس الأداء بدون RPC حي
+# صيغة المقطع: ملف gzip، كل سطر "<ثواني منذ بداية المقطع>\t<الإطار الخام>"
+SEGMENT_PATTERN = "frames_{ts}_{idx:04d}.log.gz"
+
+
+class SegmentRecorder:
+    """كتابة الإطارات في مقاطع مضغوطة مع تدوير حسب عدد الإطارات أو المدة"""
+    def __init__(self, out_dir: str, max_frames: int = 50000, max_seconds: float = 300.0):
+        self.out_dir = out_dir
+        self.max_frames = max_frames
+        self.max_seconds = max_seconds
+        self._fh = None
+        self._idx = 0
+        self._count = 0
+        self._opened_at = 0.0
+        self._session = int(time.time())
+        self.total_frames = 0
+        os.makedirs(out_dir, exist_ok=True)
+
+    def _rotate(self, now: float):
+        self.close()
+        path = os.path.join(self.out_dir, SEGMENT_PATTERN.format(ts=self._session, idx=self._idx))
+        self._fh = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+        self._idx += 1
+        self._count = 0
+        self._opened_at = now
+        logger.info(f"🎞️ Recording segment -> {path}")
+
+    def write(self, frame, at: Optional[float] = None):
+        now = time.monotonic() if at is None else at
+        if self._fh is None or self._count >= self.max_frames or now - self._opened_at >= self.max_seconds:
+            self._rotate(now)
+        if isinstance(frame, (bytes, bytearray)):
+            frame = frame.decode("utf-8", errors="replace")
+        self._fh.write(f"{now - self._opened_at:.6f}\t{frame}\n")
+        self._count += 1
+        self.total_frames += 1
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def list_segments(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.log.gz")))
+    return [path]
+
+
+def iter_frames(path: str) -> Iterator[Tuple[float, str]]:
+    """قراءة (الإزاحة الزمنية المطلقة, الإطار) عبر كل المقاطع بالترتيب"""
+    base = 0.0
+    for seg in list_segments(path):
+        last = 0.0
+        with gzip.open(seg, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                offset, _, frame = line.rstrip("\n").partition("\t")
+                last = float(offset)
+                yield base + last, frame
+        base += last
+
+
+async def record(wss_url: str, program_id: str, out_dir: str, duration: float = 0.0,
+                 max_frames: int = 50000) -> int:
+    """الاتصال بنقطة RPC وتسجيل كل الإطارات الخام حتى انتهاء المدة (0 = بلا حد)"""
+    recorder = SegmentRecorder(out_dir, max_frames=max_frames)
+    deadline = time.monotonic() + duration if duration else None
+    try:
+        async with websockets.connect(wss_url, ping_interval=20, ping_timeout=10) as ws:
+            await ws.send(json.dumps({
+                "jsonrpc": "2.0", "id": 1, "method": "logsSubscribe",
+                "params": [{"mentions": [program_id]}, {"commitment": "processed"}]
+            }))
+            while deadline is None or time.monotonic() < deadline:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0.001)
+                try:
+                    frame = await asyncio.wait_for(ws.recv(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                recorder.write(frame)
+    finally:
+        recorder.close()
+    logger.info(f"🎞️ Recorded {recorder.total_frames} frames into {out_dir}")
+    return recorder.total_frames
+
+
+class ReplayServer:
+    """
+    بديل محلي لنقطة WSS: يستقبل logsSubscribe ثم يبث الإطارات المسجلة
+    بسرعة 1× أو N× أو بأقصى سرعة (speed=0). يُبث التسجيل مرة واحدة فقط.
+    """
+    def __init__(self, frames: List[Tuple[float, str]], speed: float = 1.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.frames = frames
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.sent = 0
+        self.finished = asyncio.Event()
+        self._server = None
+        self._played = False
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def _handler(self, ws):
+        await ws.recv()
+        await ws.send(json.dumps({"jsonrpc": "2.0", "result": 1, "id": 1}))
+        if self._played:
+            await ws.wait_closed()
+            return
+        self._played = True
+        started = time.monotonic()
+        for offset, frame in self.frames:
+            if self.speed > 0:
+                delay = offset / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await ws.send(frame)
+            self.sent += 1
+        self.finished.set()
+        await ws.wait_closed()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
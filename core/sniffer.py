@@ -4,8 +4,14 @@ import json
 import logging
 import time
 import httpx
-from typing import Optional, List, Dict
+from collections import OrderedDict, deque
+from typing import Optional, List, Dict, Union
 from dataclasses import dataclass
+from core.frames import (is_create_candidate, is_buy_candidate, is_sell_candidate, decode_logs_frame,
+                         has_create_instruction, is_account_frame, is_rpc_response)
+from core.pump_events import find_create_event, find_trade_events
+from core.metrics import METRICS
+from core.bundles import DEFAULT_JITO_TIP_ACCOUNTS, TipMatcher
 
 # إعداد التسجيل بشكل خفيف لبيئة Streamlit
 logging.basicConfig(level=logging.INFO)
@@ -18,80 +24,474 @@ class MarketEvent:
     event_type: str
     jito_detected: bool = False
     raw_logs: List[str] = None
+    # [تحديث] حقول مفكوكة من CreateEvent داخل السجلات (بدون HTTP)
+    mint: Optional[str] = None
+    creator: Optional[str] = None
+    bonding_curve: Optional[str] = None
+    name: Optional[str] = None
+    symbol: Optional[str] = None
+    uri: Optional[str] = None
 
 class PumpSniffer:
     PROGRAM_ID = "6EF8rrecthR5DkZJbdz4P8hHKXY6yizQ2EtJhEqNpump"
     # عناوين Jito Tip للكشف عن صناع السوق المحترفين
-    JITO_TIP_PROGRAMS = ["9619WQCpPLM3U3M8qfT9MGP3C667XvQGczpG6GvV5Q66", "HFqU5x63VTqvQss8hp11i4wVV8bD44PvwucfZ2bU7gRe"]
+    JITO_TIP_PROGRAMS = list(DEFAULT_JITO_TIP_ACCOUNTS)
 
-    def __init__(self, wss_url: str, archiver):
+    def __init__(self, wss_url: Union[str, List[str]], archiver, worker_count: int = 5, queue_size: int = 1000,
+                 idle_delay_ms: float = 0.0, drop_policy: str = "drop_oldest",
+                 retry_strategy: Optional[dict] = None, dedup_size: int = 20000,
+                 curve_tracker=None, bundle_detector=None, cluster_index=None, wash_detector=None,
+                 backfiller=None):
+        # [تحديث] دعم عدة نقاط RPC في وقت واحد: أول وصول للتوقيع هو الفائز
+        urls = [wss_url] if isinstance(wss_url, str) else list(wss_url)
         # التأكد من بروتوكول WebSocket
-        self.wss_url = wss_url.replace("https://", "wss://") if "wss://" not in wss_url else wss_url
+        self.wss_urls = [u.replace("https://", "wss://") if "wss://" not in u else u for u in urls if u]
+        self.wss_url = self.wss_urls[0]
         self.archiver = archiver
-        self._queue = asyncio.Queue(maxsize=100) # حجم صغير للحفاظ على الذاكرة
+        # [تحديث] متتبع منحنيات الربط يشترك عبر نفس اتصالات WSS
+        self.curves = curve_tracker if curve_tracker is not None else getattr(archiver, "curves", None)
+        # [تحديث] كاشف الشراء المجمع (check_bundle_buy): None = لا نفك إطارات الشراء إطلاقاً
+        self.bundles = bundle_detector
+        # [تحديث] فهرس تجميع المحافظ (wallet_clustering) يتغذى من نفس أحداث الشراء
+        self.clusters = cluster_index
+        # [تحديث] كاشف التداول الوهمي يحتاج الشراء والبيع معاً
+        self.wash = wash_detector
+        # [تحديث] متتبع المنحنيات يحتاج شراء/بيع المطور لاحقاً لتحديث نسبة حيازته
+        self._wants_buys = any(x is not None for x in (bundle_detector, cluster_index, wash_detector, self.curves))
+        self._wants_sells = self.wash is not None or self.curves is not None
+        self._tips = bundle_detector.tips if bundle_detector is not None else TipMatcher(self.JITO_TIP_PROGRAMS)
+        retry = retry_strategy or {}
+        self.max_retries = int(retry.get("max_retries", 5))
+        self.backoff_s = retry.get("backoff_ms", 100) / 1000.0
+        # مجموعة توقيعات محدودة: signature -> وقت أول وصول
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self.dedup_size = dedup_size
+        # توقيعات التداول المعالجة (LRU): كل نقطة RPC تبث نفس المعاملة، والكواشف تعد الحجم والتكرار
+        self._seen_trades: "OrderedDict[str, None]" = OrderedDict()
+        self.endpoint_stats: Dict[str, Dict[str, float]] = {
+            u: {"connected": 0, "reconnects": 0, "events": 0, "wins": 0, "lag_ms_total": 0.0}
+            for u in self.wss_urls
+        }
+        # [تحديث] سد فجوات الانقطاع (GapBackfiller): نقطة تفتيش آخر إطار مُعالج (signature, slot)
+        self.backfiller = backfiller
+        self.checkpoint: Optional[tuple] = None
+        # (وقت الانقطاع، نقطة التفتيش حينها) عندما تنقطع كل النقاط معاً
+        self._outage: Optional[tuple] = None
+        # أول إطار حي (signature, slot) بعد إعادة الاتصال = الحد الأعلى للفجوة (لا تداخل مع البث الحي)
+        self._awaiting_resume = False
+        self._resume_marker: Optional[tuple] = None
+        self._backfills = set()
+        self.backfill_reports = deque(maxlen=50)
+        if backfiller is not None:
+            # الأحداث المسترجعة تمر بنفس إزالة التكرار وتظهر كنقطة مستقلة في التقرير
+            self.endpoint_stats["backfill"] = {"connected": 0, "reconnects": 0, "events": 0, "wins": 0, "lag_ms_total": 0.0}
+        # [تحديث] "خط التجميع": طابور مركزي واحد يخدم عدداً قابلاً للضبط من العمال الدائمين
+        self.worker_count = max(1, int(worker_count))
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        # راحة اختيارية للمعالج تتقلص تلقائياً كلما امتلأ الطابور (صفر تحت الضغط)
+        self.idle_delay = idle_delay_ms / 1000.0
+        # drop_oldest: نفضل الإطلاقات الأحدث | drop_newest: نحافظ على ما في الطابور
+        self.drop_policy = drop_policy
+        self._workers: List[asyncio.Task] = []
+        self._pool_started_at = 0.0
         self.is_running = False
+        self.stats = {"frames": 0, "frames_skipped": 0, "duplicates": 0, "received": 0, "enqueued": 0, "dropped": 0, "queue_high_water": 0}
+        self.worker_stats: List[Dict[str, float]] = []
 
-    async def _worker_logic(self):
+    def _enqueue(self, ev: "MarketEvent"):
+        """إدخال الحدث مع سياسة ضغط عكسي صريحة وعدادات للفاقد"""
+        self.stats["received"] += 1
+        if self._queue.full():
+            self.stats["dropped"] += 1
+            METRICS.inc("events_dropped_total")
+            if self.drop_policy != "drop_oldest":
+                return
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except asyncio.QueueEmpty:
+                pass
+        self._queue.put_nowait(ev)
+        self.stats["enqueued"] += 1
+        depth = self._queue.qsize()
+        if depth > self.stats["queue_high_water"]:
+            self.stats["queue_high_water"] = depth
+
+    def _start_workers(self):
+        """تعيين العمال مرة واحدة فقط حتى مع إعادة الاتصال"""
+        self._workers = [t for t in self._workers if not t.done()]
+        if self._workers:
+            return
+        self._pool_started_at = time.monotonic()
+        self.worker_stats = [{"processed": 0, "busy_s": 0.0} for _ in range(self.worker_count)]
+        self._workers = [asyncio.create_task(self._worker_logic(i)) for i in range(self.worker_count)]
+        METRICS.gauge("queue_depth", self._queue.qsize)
+        METRICS.gauge("queue_capacity", lambda: self._queue.maxsize)
+        METRICS.gauge("worker_utilisation", self.avg_utilisation)
+        METRICS.gauge("worker_count", lambda: self.worker_count)
+        logger.info(f"👷 {self.worker_count} analyst workers on standby.")
+
+    def worker_utilisation(self) -> List[float]:
+        """نسبة الوقت المشغول لكل عامل منذ تشغيل المجموعة"""
+        elapsed = max(time.monotonic() - self._pool_started_at, 1e-9)
+        return [round(w["busy_s"] / elapsed, 4) for w in self.worker_stats]
+
+    def avg_utilisation(self) -> float:
+        util = self.worker_utilisation()
+        return sum(util) / len(util) if util else 0.0
+
+    async def _worker_logic(self, worker_id: int = 0):
         """معالجة ذكية وموفرة للموارد في الخلفية"""
+        ws = self.worker_stats[worker_id]
         while self.is_running:
             event = await self._queue.get()
+            started = time.monotonic()
             try:
-                # الكشف عن بصمة Jito في سجلات المعاملة
-                jito_found = any(tip in str(event.raw_logs) for tip in self.JITO_TIP_PROGRAMS)
+                # بصمة Jito تُطابق مرة واحدة عند الاستقبال (TipMatcher)
+                jito_found = event.jito_detected
                 
-                if jito_found or "Create" in event.event_type:
+                if jito_found or event.event_type in ("Create", "Bundle"):
                     if self.archiver:
                         # وسم السلوك (Pattern Recognition)
-                        tag = "🚀 HIGH_VOLUME_MM" if jito_found else "New Launch"
+                        if event.event_type == "Bundle":
+                            tag = "📦 BUNDLED_LAUNCH"
+                        else:
+                            tag = "🚀 HIGH_VOLUME_MM" if jito_found else "New Launch"
                         # إرسال البيانات للأرشيف ليقوم بفحص الـ 11k$ والـ 70 هولدر
+                        # [تحديث] المحفظة الحقيقية (المُنشئ) بدلاً من توقيع مقتطع
                         await self.archiver.analyze_and_archive(
-                            wallet=event.signature[:16], 
-                            raw_data={"sig": event.signature, "mint": "Scanning..."},
+                            wallet=self.wallet_of(event), 
+                            raw_data={
+                                "sig": event.signature,
+                                "mint": event.mint or "Scanning...",
+                                "creator": event.creator,
+                                "bonding_curve": event.bonding_curve,
+                                "name": event.name,
+                                "symbol": event.symbol,
+                                "uri": event.uri,
+                            },
                             behavior_tag=tag
                         )
             except Exception as e:
+                METRICS.inc("worker_errors_total")
                 logger.debug(f"Worker process skip: {e}")
             finally:
                 self._queue.task_done()
-                await asyncio.sleep(0.1) # راحة للمعالج لضمان استقرار الموقع
+                ws["processed"] += 1
+                ws["busy_s"] += time.monotonic() - started
+            # [تحديث] راحة تكيفية بدلاً من 0.1 ثابتة: تختفي كلما امتلأ الطابور
+            if self.idle_delay:
+                fill = self._queue.qsize() / (self._queue.maxsize or 1)
+                pause = self.idle_delay * max(0.0, 1.0 - fill)
+                if pause > 0:
+                    await asyncio.sleep(pause)
 
-    async def start_sniffing(self):
-        """المحرك الرئيسي للاتصال بالبلوكشين"""
-        self.is_running = True
-        # تشغيل عامل المعالجة في الخلفية
-        asyncio.create_task(self._worker_logic())
+    @staticmethod
+    def wallet_of(event: "MarketEvent") -> str:
+        """wallet_id المحفوظ للحدث: المُنشئ الحقيقي، أو توقيع مقتطع إن لم يُفك CreateEvent"""
+        return event.creator or event.signature[:16]
+
+    def _first_arrival(self, signature: str, endpoint: str) -> bool:
+        """إزالة التكرار بين النقاط وتسجيل الفائز والتأخر لكل نقطة"""
+        now = time.monotonic()
+        ep = self.endpoint_stats[endpoint]
+        ep["events"] += 1
+        first_seen = self._seen.get(signature)
+        if first_seen is not None:
+            ep["lag_ms_total"] += (now - first_seen) * 1000
+            self.stats["duplicates"] += 1
+            METRICS.inc("duplicates_total")
+            return False
+        ep["wins"] += 1
+        self._seen[signature] = now
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def _first_trade(self, signature: str) -> bool:
+        """True عند أول وصول لمعاملة تداول من أي نقطة"""
+        if signature in self._seen_trades:
+            METRICS.inc("trade_duplicates_total")
+            return False
+        self._seen_trades[signature] = None
+        if len(self._seen_trades) > self.dedup_size:
+            self._seen_trades.popitem(last=False)
+        return True
+
+    def _handle_frame(self, msg, endpoint: str):
+        """
+        إطار تالف (JSON مقطوع، بنية لا تطابق msgspec، حمولة Borsh غريبة) يُعد ويُتجاوز؛ رفع الاستثناء
+        هنا يصل لـ _endpoint_loop فيغلق websocket ويعيد الاتصال بسبب إطار واحد.
+        """
+        try:
+            self._dispatch_frame(msg, endpoint)
+        except Exception as e:
+            self._skip_frame("malformed")
+            logger.debug(f"Malformed frame skipped [{endpoint[:40]}]: {e}")
+
+    def _skip_frame(self, reason: str):
+        self.stats["frames_skipped"] += 1
+        METRICS.inc("frames_skipped_total", reason=reason)
+
+    def _dispatch_frame(self, msg, endpoint: str):
+        started = time.perf_counter()
+        self.stats["frames"] += 1
+        METRICS.inc("frames_total")
+        # [تحديث] رفض الإطارات غير المرشحة على النص الخام قبل فك JSON
+        if not is_create_candidate(msg):
+            if (self._wants_buys and is_buy_candidate(msg)) or (self._wants_sells and is_sell_candidate(msg)):
+                self._handle_trade_frame(msg)
+                METRICS.observe("recv", time.perf_counter() - started)
+                return
+            if self.curves is not None and (is_account_frame(msg) or is_rpc_response(msg)):
+                self.curves.handle_frame(msg, endpoint)
+            self.stats["frames_skipped"] += 1
+            METRICS.observe("recv", time.perf_counter() - started)
+            return
+        decoded = decode_logs_frame(msg)
+        if decoded is None:
+            self._skip_frame("no_logs")
+            return
+        signature, logs, slot = decoded
+        self._checkpoint(signature, slot)
+        self._process_create(signature, logs, slot, endpoint, started)
+
+    def _process_create(self, signature: str, logs: List[str], slot: int, endpoint: str, started: float) -> bool:
+        """True إذا أُدخل حدث إطلاق جديد في الطابور (مشترك بين البث الحي وسد الفجوات)"""
+        # التقاط عمليات الإطلاق الجديدة لتحليلها
+        if has_create_instruction(logs) and self._first_arrival(signature, endpoint):
+            ev = MarketEvent(
+                signature=signature, 
+                timestamp=time.time(), 
+                event_type="Create", 
+                raw_logs=logs,
+                jito_detected=self._tips.matches(logs),
+            )
+            created = find_create_event(logs)
+            if created:
+                ev.mint = created.mint
+                ev.creator = created.creator
+                ev.bonding_curve = created.bonding_curve
+                ev.name = created.name
+                ev.symbol = created.symbol
+                ev.uri = created.uri
+                if self.curves is not None:
+                    self._track_curve(created, logs)
+                if self.bundles is not None:
+                    self.bundles.watch(created.mint, slot, created.creator, context=ev)
+                if self.clusters is not None:
+                    # الدافع والمُنشئ وقّعا نفس معاملة الإطلاق
+                    self.clusters.link_cosigners((created.user, created.creator))
+                if self._wants_buys:
+                    # شراء المطور داخل معاملة الإطلاق نفسها (محسوب مسبقاً في _track_curve)
+                    self._observe_trades(logs, slot, ev.jito_detected, at_launch=True)
+            parsed = time.perf_counter()
+            METRICS.observe("parse", parsed - started)
+            self._enqueue(ev)
+            METRICS.observe("enqueue", time.perf_counter() - parsed)
+            return True
+        return False
 
+    def _checkpoint(self, signature: str, slot: int):
+        if self._awaiting_resume:
+            self._resume_marker = (signature, slot)
+            self._awaiting_resume = False
+        if self.checkpoint is None or slot >= self.checkpoint[1]:
+            self.checkpoint = (signature, slot)
+
+    def _handle_trade_frame(self, msg):
+        """
+        إطارات التداول لها مجموعة تكرار مستقلة (_first_trade) لا تزاحم توقيعات الإطلاق ولا تدخل
+        إحصاءات الفوز بين النقاط؛ بدونها يصل نفس الشراء/البيع للكواشف مرة لكل نقطة RPC
+        فيتضاعف الحجم وعدد الصفقات ويكفي تداول حقيقي واحد لرفع درجة الذهاب والإياب.
+        """
+        decoded = decode_logs_frame(msg)
+        if decoded is None:
+            self._skip_frame("no_logs")
+            return
+        signature, logs, slot = decoded
+        self._checkpoint(signature, slot)
+        if not self._first_trade(signature):
+            return
+        self._observe_trades(logs, slot, self._tips.matches(logs))
+
+    def _observe_trades(self, logs: List[str], slot: int, tipped: bool, at_launch: bool = False):
+        buyers = []
+        for trade in find_trade_events(logs):
+            if self.curves is not None and not at_launch:
+                self.curves.observe_trade(trade)
+            if self.wash is not None:
+                self.wash.observe(trade.mint, trade.user, trade.sol_amount, trade.is_buy, trade.timestamp)
+            if not trade.is_buy:
+                continue
+            buyers.append(trade.user)
+            if self.clusters is not None:
+                self.clusters.observe_buy(trade.mint, trade.user, trade.timestamp)
+            if self.bundles is None:
+                continue
+            window = self.bundles.observe_buy(trade.mint, slot, trade.user, tipped)
+            if window is None or window.context is None:
+                continue
+            launch = window.context
+            self._enqueue(MarketEvent(
+                signature=launch.signature, timestamp=time.time(), event_type="Bundle",
+                jito_detected=launch.jito_detected or window.tipped > 0, raw_logs=launch.raw_logs,
+                mint=launch.mint, creator=launch.creator, bonding_curve=launch.bonding_curve,
+                name=launch.name, symbol=launch.symbol, uri=launch.uri,
+            ))
+        if self.clusters is not None and len(buyers) > 1:
+            # عدة مشترين داخل معاملة واحدة = توقيع مشترك
+            self.clusters.link_cosigners(buyers)
+
+    def _track_curve(self, created, logs: List[str]):
+        """بدء تتبع المنحنى مع حصة المطور من شرائه الأولي في نفس معاملة الإطلاق"""
+        trades = [t for t in find_trade_events(logs) if t.mint == created.mint]
+        dev_tokens = sum(t.token_amount for t in trades if t.is_buy and t.user in (created.creator, created.user))
+        seed = (trades[-1].virtual_sol_reserves, trades[-1].virtual_token_reserves) if trades else None
+        self.curves.track(created.mint, created.bonding_curve, created.creator, dev_tokens, seed,
+                          dev_wallets=(created.user,))
+
+    def endpoint_report(self) -> Dict[str, Dict[str, float]]:
+        """نسبة الفوز ومتوسط التأخر (ms) لكل نقطة RPC"""
+        report = {}
+        for url, ep in self.endpoint_stats.items():
+            late = ep["events"] - ep["wins"]
+            report[url] = {
+                "events": ep["events"],
+                "win_rate": round(ep["wins"] / ep["events"], 4) if ep["events"] else 0.0,
+                "avg_lag_ms": round(ep["lag_ms_total"] / late, 2) if late else 0.0,
+                "reconnects": ep["reconnects"],
+            }
+        return report
+
+    def _on_connect(self, url: str, ws):
+        self.endpoint_stats[url]["connected"] = 1
+        if self.curves is not None:
+            self.curves.attach(url, ws)
+        if self._outage is not None:
+            outage, self._outage = self._outage, None
+            self._awaiting_resume, self._resume_marker = True, None
+            task = asyncio.create_task(self._backfill_gap(*outage))
+            self._backfills.add(task)
+            task.add_done_callback(self._backfills.discard)
+
+    def _on_disconnect(self, url: str):
+        if self.curves is not None:
+            self.curves.detach(url)
+        self.endpoint_stats[url]["connected"] = 0
+        # فجوة فعلية فقط عندما لا تبقى أي نقطة متصلة
+        if (self.backfiller is not None and self._outage is None and self.checkpoint is not None
+                and not any(self.endpoint_stats[u]["connected"] for u in self.wss_urls)):
+            self._outage = (time.time(), self.checkpoint)
+
+    async def _backfill_gap(self, lost_at: float, checkpoint: tuple, resume_wait_s: float = 2.0):
+        """يعمل بالتوازي مع البث الحي: استرجاع معاملات الفجوة وتمريرها بنفس مسار الإطارات"""
+        reconnected_at = time.time()
+        # رأس السلسلة لحظة إعادة الاتصال، يُطلب بالتوازي مع انتظار أول إطار حي
+        tip = asyncio.create_task(self.backfiller.current_slot())
+        until, since_slot = checkpoint
+        started = time.perf_counter()
+        report = {"gap_s": round(reconnected_at - lost_at, 3), "signatures": 0, "fetched": 0, "failed": 0,
+                  "recovered": 0, "duplicates": 0, "truncated": False, "duration_s": 0.0}
+        try:
+            deadline = time.monotonic() + resume_wait_s
+            while self._resume_marker is None and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            reconnect_slot = await tip
+            if self._resume_marker is not None:
+                # before = أول توقيع حي: كل ما يُسترجع أقدم منه بترتيب السجل
+                before, resume_slot = self._resume_marker
+                max_slot = None
+            else:
+                # لم يصل إطار حي: الفجوة محدودة بما قبل slot إعادة الاتصال (البث الحي يغطي ما بعده)
+                before = None
+                resume_slot = max_slot = reconnect_slot - 1 if reconnect_slot is not None else None
+            self._awaiting_resume = False
+            found, report["truncated"] = await self.backfiller.signatures_between(until, before, since_slot, max_slot)
+            report["signatures"] = len(found)
+            # إطلاقات وصلت حية بالفعل (من نقطة أخرى أو بعد الاستئناف) لا تُجلب مرة ثانية
+            fresh = [sig for sig, _ in found if sig not in self._seen and sig not in self._seen_trades]
+            report["duplicates"] = len(found) - len(fresh)
+            txs, report["failed"] = await self.backfiller.fetch_transactions(fresh)
+            report["fetched"] = len(txs)
+            for signature, slot, logs in txs:
+                if self._process_create(signature, logs, slot, "backfill", time.perf_counter()):
+                    report["recovered"] += 1
+                elif (self._wants_buys and not has_create_instruction(logs)
+                      and resume_slot is not None and slot <= resume_slot and self._first_trade(signature)):
+                    # التداولات لا تمر بإزالة التكرار: فقط ما هو أقدم من نقطة الاستئناف، وإلا غذّينا
+                    # الكواشف بنفس الشراء مرتين (مرة من البث الحي ومرة من هنا)
+                    self._observe_trades(logs, slot, self._tips.matches(logs))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            METRICS.inc("backfill_errors_total")
+            logger.error(f"❌ Gap backfill failed: {e}")
+        finally:
+            # الإلغاء أثناء انتظار أول إطار حي (stop مثلاً) لا يترك طلب getSlot يتيماً
+            if not tip.done():
+                tip.cancel()
+                await asyncio.gather(tip, return_exceptions=True)
+        report["duration_s"] = round(time.perf_counter() - started, 3)
+        self.backfill_reports.append(report)
+        METRICS.inc("backfill_gaps_total")
+        METRICS.inc("backfill_signatures_total", report["signatures"])
+        METRICS.inc("backfill_recovered_total", report["recovered"])
+        METRICS.observe("backfill", report["duration_s"])
+        logger.info(f"🩹 Gap backfill: {report['gap_s']:.1f}s outage | {report['signatures']} signatures"
+                    f"{' (truncated)' if report['truncated'] else ''} | {report['recovered']} launches recovered | "
+                    f"{report['failed']} failed | {report['duration_s']:.2f}s")
+        return report
+
+    async def _endpoint_loop(self, url: str):
+        """اتصال مستقل لكل نقطة مع إعادة محاولة بتراجع أسي حسب retry_strategy"""
+        ep = self.endpoint_stats[url]
+        attempt = 0
         while self.is_running:
             try:
-                async with websockets.connect(self.wss_url, ping_interval=20, ping_timeout=10) as ws:
+                async with websockets.connect(url, ping_interval=20, ping_timeout=10) as ws:
                     # الاشتراك في سجلات برنامج Pump.fun
                     await ws.send(json.dumps({
                         "jsonrpc": "2.0", "id": 1, "method": "logsSubscribe",
                         "params": [{"mentions": [self.PROGRAM_ID]}, {"commitment": "processed"}]
                     }))
-                    logger.info("📡 Sovereign Radar Online & Connected.")
+                    attempt = 0
+                    self._on_connect(url, ws)
+                    logger.info(f"📡 Sovereign Radar Online & Connected. [{url[:40]}]")
                     
                     while self.is_running:
-                        msg = await ws.recv()
-                        data = json.loads(msg)
-                        if "params" in data:
-                            res = data["params"]["result"]["value"]
-                            logs = res.get("logs", [])
-                            signature = res.get("signature")
-                            
-                            # التقاط عمليات الإطلاق الجديدة لتحليلها
-                            if any("Instruction: Create" in l for l in logs):
-                                ev = MarketEvent(
-                                    signature=signature, 
-                                    timestamp=time.time(), 
-                                    event_type="Create", 
-                                    raw_logs=logs
-                                )
-                                if not self._queue.full():
-                                    await self._queue.put(ev)
+                        self._handle_frame(await ws.recv(), url)
             except Exception as e:
-                logger.warning(f"Connection lost, retrying in 5s... ({e})")
-                await asyncio.sleep(5)
+                self._on_disconnect(url)
+                ep["reconnects"] += 1
+                METRICS.inc("reconnects_total", endpoint=url.split("?")[0][:60])
+                wait = self.backoff_s * (2 ** min(attempt, self.max_retries))
+                attempt += 1
+                logger.warning(f"Connection lost [{url[:40]}], retrying in {wait:.2f}s... ({e})")
+                await asyncio.sleep(wait)
+
+    async def start_sniffing(self):
+        """المحرك الرئيسي للاتصال بالبلوكشين"""
+        self.is_running = True
+        # تشغيل مجموعة العمال في الخلفية
+        self._start_workers()
+        await asyncio.gather(*(self._endpoint_loop(u) for u in self.wss_urls))
+
+    def stop(self):
+        """إيقاف حلقة الاستقبال ومجموعة العمال"""
+        self.is_running = False
+        for t in self._workers:
+            t.cancel()
+        for t in list(self._backfills):
+            t.cancel()
+        if self.stats["received"]:
+            logger.info(f"📊 Sniffer: {self.stats['enqueued']} queued | {self.stats['dropped']} dropped | "
+                        f"high-water {self.stats['queue_high_water']} | util {self.worker_utilisation()}")
+        if len(self.wss_urls) > 1:
+            for url, rep in self.endpoint_report().items():
+                logger.info(f"📊 Endpoint [{url[:40]}] win {rep['win_rate']:.0%} | "
+                            f"lag {rep['avg_lag_ms']}ms | reconnects {rep['reconnects']}")
 
     def start(self):
         """
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import ssl
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Set
+from urllib.parse import urlsplit, parse_qs
+
+import websockets
+
+logger = logging.getLogger("SovereignTelemetry")
+
+# [تحديث] خادم دفع لحظي لتطبيق الأندرويد: بث الأهداف المؤرشفة من ذاكرة حلقية مباشرة
+# بدون أي قراءة من قاعدة البيانات.
+# مفاتيح مختصرة لتقليل حجم الرسائل على شبكات الجوال
+COMPACT_KEYS = {
+    "wallet": "w", "mint": "m", "name": "n", "symbol": "y", "image": "i",
+    "cap": "c", "holders": "h", "tag": "t", "sig": "g", "ts": "ts",
+}
+# الهدف الذي تُحسب الفروقات (Delta) بالنسبة له
+DELTA_KEY = "mint"
+
+
+class _Subscriber:
+    __slots__ = ("queue", "last_sent")
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # آخر قيم أُرسلت لكل هدف (محدودة) لإرسال الحقول المتغيرة فقط
+        self.last_sent: "OrderedDict[str, dict]" = OrderedDict()
+
+
+class TelemetryServer:
+    """
+    WebSocket على /stream?since=<seq> + HTTP على /recent?since=<seq> و /health.
+    كل حدث يحمل رقم تسلسل متزايد؛ العميل يستأنف بعد انقطاع من آخر رقم استلمه.
+    """
+    def __init__(self, host: str = "0.0.0.0", port: int = 9000, buffer_size: int = 2048,
+                 token: Optional[str] = None, ssl_context: Optional[ssl.SSLContext] = None,
+                 subscriber_queue: int = 256, delta_state_size: int = 4096):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.ssl_context = ssl_context
+        self._ring: deque = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._subscribers: Set[_Subscriber] = set()
+        self.subscriber_queue = subscriber_queue
+        self.delta_state_size = delta_state_size
+        self._server = None
+        self.stats = {"published": 0, "sent": 0, "slow_disconnects": 0, "clients": 0}
+
+    # ---------- النشر ----------
+    def publish(self, record: Dict):
+        """يُستدعى من الأرشيف لكل هدف محفوظ (متزامن وسريع: لا I/O هنا)"""
+        self._seq += 1
+        compact = {COMPACT_KEYS.get(k, k): v for k, v in record.items() if v is not None}
+        item = (self._seq, compact)
+        self._ring.append(item)
+        self.stats["published"] += 1
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # عميل بطيء: نغلقه ليستأنف لاحقاً من آخر تسلسل بدلاً من إبطاء الجميع
+                self._wake(sub)
+                self.stats["slow_disconnects"] += 1
+
+    def _wake(self, sub: _Subscriber):
+        """فصل المشترك وإيقاظ حلقة الإرسال الخاصة به بعلامة None"""
+        self._subscribers.discard(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+    async def _watch_close(self, ws, sub: _Subscriber):
+        await ws.wait_closed()
+        self._wake(sub)
+
+    def _since(self, since: int):
+        return [item for item in self._ring if item[0] > since]
+
+    def _encode(self, sub: _Subscriber, item) -> str:
+        seq, compact = item
+        key = compact.get(COMPACT_KEYS[DELTA_KEY]) or compact.get(COMPACT_KEYS["wallet"])
+        prev = sub.last_sent.get(key)
+        if prev is None:
+            delta = compact
+        else:
+            delta = {k: v for k, v in compact.items() if prev.get(k) != v}
+            # حقل صار None يُحذف من compact: null صريح وإلا بقيت القيمة القديمة عند العميل
+            delta.update((k, None) for k in prev if k not in compact)
+            sub.last_sent.move_to_end(key)
+        sub.last_sent[key] = compact
+        if len(sub.last_sent) > self.delta_state_size:
+            sub.last_sent.popitem(last=False)
+        msg = {"s": seq, "k": key}
+        msg.update(delta)
+        return json.dumps(msg, separators=(",", ":"), ensure_ascii=False)
+
+    # ---------- الخادم ----------
+    def _query(self, path: str) -> Dict[str, str]:
+        return {k: v[-1] for k, v in parse_qs(urlsplit(path).query).items()}
+
+    @staticmethod
+    def _since_param(query: Dict[str, str]) -> int:
+        try:
+            return max(0, int(query.get("since", 0) or 0))
+        except ValueError:
+            return 0
+
+    def _authorised(self, query: Dict[str, str]) -> bool:
+        return not self.token or query.get("token") == self.token
+
+    def _process_request(self, connection, request):
+        """طلبات HTTP العادية تُخدم هنا، وطلبات /stream تكمل مصافحة WebSocket"""
+        route = urlsplit(request.path).path
+        query = self._query(request.path)
+        if not self._authorised(query):
+            return connection.respond(401, "unauthorised\n")
+        if route == "/stream":
+            return None
+        if route == "/health":
+            body = {"head": self._seq, "oldest": self._ring[0][0] if self._ring else self._seq,
+                    "clients": len(self._subscribers)}
+        elif route == "/recent":
+            since = self._since_param(query)
+            body = [dict(s=seq, **compact) for seq, compact in self._since(since)]
+        else:
+            return connection.respond(404, "not found\n")
+        response = connection.respond(200, json.dumps(body, separators=(",", ":"), ensure_ascii=False))
+        del response.headers["Content-Type"]
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+    async def _handler(self, ws):
+        query = self._query(ws.request.path)
+        since = self._since_param(query)
+        sub = _Subscriber(self.subscriber_queue)
+        # التسجيل قبل إعادة البث حتى لا يضيع أي حدث بين المرحلتين
+        self._subscribers.add(sub)
+        self.stats["clients"] += 1
+        watcher = asyncio.create_task(self._watch_close(ws, sub))
+        try:
+            backlog = self._since(since)
+            oldest = self._ring[0][0] if self._ring else self._seq + 1
+            await ws.send(json.dumps({"hello": 1, "head": self._seq,
+                                      "reset": since > 0 and since + 1 < oldest}))
+            last = since
+            for item in backlog:
+                await ws.send(self._encode(sub, item))
+                last = item[0]
+                self.stats["sent"] += 1
+            while True:
+                item = await sub.queue.get()
+                if item is None:
+                    # إغلاق بسبب البطء (لا أثر له إن كان الاتصال مغلقاً أصلاً)
+                    await ws.close(1013, "slow consumer, resume with since")
+                    break
+                if item[0] <= last:
+                    continue
+                await ws.send(self._encode(sub, item))
+                last = item[0]
+                self.stats["sent"] += 1
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            watcher.cancel()
+            self._subscribers.discard(sub)
+
+    async def start(self):
+        self._server = await websockets.serve(
+            self._handler, self.host, self.port,
+            process_request=self._process_request, ssl=self.ssl_context,
+            ping_interval=20, ping_timeout=20,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        scheme = "wss" if self.ssl_context else "ws"
+        logger.info(f"📱 Telemetry push online on {scheme}://{self.host}:{self.port}/stream")
+        return self
+
+    async def close(self):
+        for sub in list(self._subscribers):
+            self._wake(sub)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
@@ -0,0 +1,185 @@
+import logging
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignWash")
+
+LAMPORTS_PER_SOL = 1_000_000_000
+
+
+@dataclass
+class WashAssessment:
+    mint: str
+    trades: int
+    volume_sol: float
+    related_roundtrip_ratio: float
+    self_trade_ratio: float
+    symmetry: float
+    score: float
+    threat_level: int
+    trust_score: int
+    behavior_pattern: str
+    flagged: bool
+
+
+class _MintWindow:
+    """
+    حلقة ثابتة الحجم لصفقات عملة واحدة (مصفوفات مضغوطة بدلاً من قواميس متداخلة).
+    المجاميع تُحدَّث تزايدياً عند الإضافة والإزالة، فكل صفقة O(1).
+    """
+    __slots__ = ("cap", "ts", "sol", "side", "wallet", "group", "start", "size",
+                 "buy_vol", "sell_vol", "by_wallet", "by_group", "self_rt", "related_rt")
+
+    def __init__(self, cap: int):
+        self.cap = cap
+        self.ts = array("d", bytes(8 * cap))
+        self.sol = array("Q", bytes(8 * cap))
+        self.side = bytearray(cap)
+        self.wallet = [None] * cap
+        self.group = [None] * cap
+        self.start = 0
+        self.size = 0
+        self.buy_vol = 0
+        self.sell_vol = 0
+        # مفتاح -> [حجم الشراء, حجم البيع, عدد الصفقات] لمن له صفقات داخل النافذة فقط
+        self.by_wallet: Dict[str, list] = {}
+        self.by_group: Dict[str, list] = {}
+        # مجموع min(شراء، بيع) لكل محفظة / لكل مجموعة مرتبطة = حجم الذهاب والعودة
+        self.self_rt = 0
+        self.related_rt = 0
+
+    @staticmethod
+    def _apply(book: Dict[str, list], key: str, is_buy: int, amount: int, sign: int) -> int:
+        """تحديث سجل المفتاح وإرجاع فرق min(buy, sell) قبل/بعد"""
+        entry = book.get(key)
+        if entry is None:
+            entry = book[key] = [0, 0, 0]
+        before = min(entry[0], entry[1])
+        entry[0 if is_buy else 1] += sign * amount
+        entry[2] += sign
+        after = min(entry[0], entry[1])
+        if entry[2] <= 0:
+            del book[key]
+        return after - before
+
+    def _account(self, i: int, sign: int):
+        amount, is_buy = self.sol[i], self.side[i]
+        if is_buy:
+            self.buy_vol += sign * amount
+        else:
+            self.sell_vol += sign * amount
+        self.self_rt += self._apply(self.by_wallet, self.wallet[i], is_buy, amount, sign)
+        self.related_rt += self._apply(self.by_group, self.group[i], is_buy, amount, sign)
+
+    def push(self, ts: float, sol_amount: int, is_buy: bool, wallet: str, group: str):
+        if self.size == self.cap:
+            self.pop_oldest()
+        i = (self.start + self.size) % self.cap
+        self.ts[i] = ts
+        self.sol[i] = sol_amount
+        self.side[i] = 1 if is_buy else 0
+        self.wallet[i] = wallet
+        self.group[i] = group
+        self.size += 1
+        self._account(i, +1)
+
+    def pop_oldest(self):
+        i = self.start
+        self._account(i, -1)
+        self.wallet[i] = self.group[i] = None
+        self.start = (self.start + 1) % self.cap
+        self.size -= 1
+
+    def expire(self, horizon: float):
+        while self.size and self.ts[self.start] < horizon:
+            self.pop_oldest()
+
+    @property
+    def last_ts(self) -> float:
+        return self.ts[(self.start + self.size - 1) % self.cap] if self.size else 0.0
+
+
+class WashTradingDetector:
+    """
+    [تحديث] كاشف التداول الوهمي (wash_trading_detection) على تدفق الصفقات الحي.
+    لكل عملة نافذة زمنية متدحرجة محدودة السعة؛ العملات الخاملة تُخلى بـ LRU.
+    المحافظ المرتبطة تُجمع عبر فهرس المجموعات (WalletClusterIndex) إن وُجد.
+    """
+    def __init__(self, window_s: float = 300.0, capacity: int = 256, max_mints: int = 2000,
+                 idle_s: float = 900.0, min_trades: int = 10, flag_score: float = 0.6,
+                 cluster_index=None):
+        self.window_s = window_s
+        self.capacity = capacity
+        self.max_mints = max_mints
+        self.idle_s = idle_s
+        self.min_trades = min_trades
+        self.flag_score = flag_score
+        self.clusters = cluster_index
+        self._mints: "OrderedDict[str, _MintWindow]" = OrderedDict()
+        self.stats = {"trades": 0, "evicted": 0, "flagged": 0}
+        self.register_gauges()
+
+    def register_gauges(self):
+        METRICS.gauge("wash_windows", lambda: len(self._mints), owner=self)
+
+    def observe(self, mint: str, wallet: str, sol_amount: int, is_buy: bool, ts: float):
+        self.stats["trades"] += 1
+        window = self._mints.get(mint)
+        if window is None:
+            # الإخلاء قبل الإدراج: النافذة الجديدة فارغة (last_ts = 0) فتبدو خاملة وتُخلى فوراً
+            self._evict(ts, reserve=1)
+            window = self._mints[mint] = _MintWindow(self.capacity)
+        else:
+            self._mints.move_to_end(mint)
+        group = self.clusters.find(wallet) if self.clusters is not None else wallet
+        window.expire(ts - self.window_s)
+        window.push(ts, sol_amount, is_buy, wallet, group)
+
+    def _evict(self, now: float, reserve: int = 0):
+        """إخلاء الأقدم استخداماً: تجاوز السعة (مع مكان لـ reserve نوافذ جديدة) أو خمول أطول من idle_s"""
+        while self._mints:
+            oldest = next(iter(self._mints.values()))
+            if len(self._mints) + reserve <= self.max_mints and now - oldest.last_ts < self.idle_s:
+                break
+            self._mints.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def assess(self, mint: str) -> Optional[WashAssessment]:
+        """تقييم النافذة الحالية؛ None إذا لم تتوفر صفقات كافية"""
+        window = self._mints.get(mint)
+        if window is None or window.size < self.min_trades:
+            return None
+        total = window.buy_vol + window.sell_vol
+        if not total:
+            return None
+        # الذهاب والعودة على مستوى المجموعة يشمل الذاتي؛ الفرق فقط هو ما تبادلته محافظ مختلفة في نفس المجموعة
+        # (بدون فهرس مجموعات group == wallet فالفرق صفر ولا يُحسب نفس الحجم مرتين)
+        related = min(2 * max(window.related_rt - window.self_rt, 0) / total, 1.0)
+        self_ratio = min(2 * window.self_rt / total, 1.0)
+        symmetry = 1.0 - abs(window.buy_vol - window.sell_vol) / total
+        # الحجم الدائري بين محافظ مرتبطة هو الإشارة الأقوى، ثم التداول الذاتي، ثم تماثل الشراء/البيع
+        score = 0.5 * related + 0.3 * self_ratio + 0.2 * symmetry
+        flagged = score >= self.flag_score
+        if flagged:
+            pattern = "🧼 WASH_TRADING"
+        elif symmetry > 0.8 and related > 0.3:
+            pattern = "🔁 CHURN"
+        else:
+            pattern = "ORGANIC_FLOW"
+        threat = int(round(score * 100))
+        return WashAssessment(
+            mint=mint, trades=window.size, volume_sol=round(total / LAMPORTS_PER_SOL, 4),
+            related_roundtrip_ratio=round(related, 4), self_trade_ratio=round(self_ratio, 4),
+            symmetry=round(symmetry, 4), score=round(score, 4),
+            threat_level=threat, trust_score=100 - threat, behavior_pattern=pattern, flagged=flagged,
+        )
+
+    def note_flagged(self, assessment: WashAssessment):
+        self.stats["flagged"] += 1
+        METRICS.inc("wash_flagged_total")
+        logger.info(f"🧼 [WASH] {assessment.mint[:8]}... score {assessment.score:.2f} | "
+                    f"related RT {assessment.related_roundtrip_ratio:.0%} | self {assessment.self_trade_ratio:.0%}")
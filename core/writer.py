@@ -0,0 +1,396 @@
+import asyncio
+import aiosqlite
+import logging
+import time
+from typing import Optional, Dict, Callable, List
+from core.metrics import METRICS
+
+logger = logging.getLogger("SovereignWriter")
+
+MM_INTEL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS mm_intel (
+        wallet_id TEXT PRIMARY KEY,
+        threat_level INTEGER,
+        behavior_pattern TEXT,
+        trust_score INTEGER,
+        total_raids INTEGER DEFAULT 0,
+        historical_data_json TEXT,
+        last_seen_at TEXT,
+        cluster_id TEXT
+    )
+"""
+
+# فهرس للجلب التزايدي في لوحة التحكم (last_seen_at > العلامة المائية)
+MM_INTEL_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_mm_intel_last_seen ON mm_intel(last_seen_at)",
+)
+
+# [تحديث] سجل أحداث إلحاقي فقط (Append-Only) بأعمدة مضغوطة ومُنمَّطة بدلاً من كتابة JSON فوق السابق.
+# التقسيم الزمني عبر عمود day (يوم Unix) مفهرس: الاستعلامات والتنظيف (DELETE WHERE day < ?) تلمس أياماً محددة فقط.
+# ts بالميلي ثانية (INTEGER) لأن SQLite يخزن الأعداد الصغيرة ببايتات أقل من النصوص ISO.
+EVENTS_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS mm_events (
+        wallet_id TEXT NOT NULL,
+        mint TEXT,
+        sig TEXT,
+        cap REAL,
+        holders INTEGER,
+        tag TEXT,
+        ts INTEGER NOT NULL,
+        day INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_mm_events_wallet_ts ON mm_events(wallet_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_mm_events_mint_ts ON mm_events(mint, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_mm_events_day ON mm_events(day)",
+    # جداول التجميع: تُحدَّث تزايدياً داخل نفس المعاملة عبر Trigger (أي مُدخِل آخر يستفيد تلقائياً)
+    """
+    CREATE TABLE IF NOT EXISTS rollup_wallet (
+        wallet_id TEXT PRIMARY KEY,
+        events INTEGER NOT NULL,
+        first_ts INTEGER, last_ts INTEGER,
+        max_cap REAL, max_holders INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_mint (
+        mint TEXT PRIMARY KEY,
+        events INTEGER NOT NULL,
+        first_ts INTEGER, last_ts INTEGER,
+        max_cap REAL, last_cap REAL,
+        max_holders INTEGER, last_holders INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_hour (
+        hour INTEGER PRIMARY KEY,
+        events INTEGER NOT NULL,
+        sum_cap REAL, max_cap REAL, sum_holders INTEGER
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_mm_events_rollup AFTER INSERT ON mm_events BEGIN
+        INSERT INTO rollup_wallet (wallet_id, events, first_ts, last_ts, max_cap, max_holders)
+        VALUES (NEW.wallet_id, 1, NEW.ts, NEW.ts, NEW.cap, NEW.holders)
+        ON CONFLICT(wallet_id) DO UPDATE SET
+            events = events + 1,
+            first_ts = MIN(first_ts, excluded.first_ts),
+            last_ts = MAX(last_ts, excluded.last_ts),
+            max_cap = MAX(COALESCE(max_cap, 0), COALESCE(excluded.max_cap, 0)),
+            max_holders = MAX(COALESCE(max_holders, 0), COALESCE(excluded.max_holders, 0));
+
+        INSERT INTO rollup_mint (mint, events, first_ts, last_ts, max_cap, last_cap, max_holders, last_holders)
+        SELECT NEW.mint, 1, NEW.ts, NEW.ts, NEW.cap, NEW.cap, NEW.holders, NEW.holders
+        WHERE NEW.mint IS NOT NULL
+        ON CONFLICT(mint) DO UPDATE SET
+            events = events + 1,
+            first_ts = MIN(first_ts, excluded.first_ts),
+            last_ts = MAX(last_ts, excluded.last_ts),
+            max_cap = MAX(COALESCE(max_cap, 0), COALESCE(excluded.max_cap, 0)),
+            last_cap = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last_cap ELSE last_cap END,
+            max_holders = MAX(COALESCE(max_holders, 0), COALESCE(excluded.max_holders, 0)),
+            last_holders = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last_holders ELSE last_holders END;
+
+        INSERT INTO rollup_hour (hour, events, sum_cap, max_cap, sum_holders)
+        VALUES (NEW.ts / 3600000, 1, COALESCE(NEW.cap, 0), NEW.cap, COALESCE(NEW.holders, 0))
+        ON CONFLICT(hour) DO UPDATE SET
+            events = events + 1,
+            sum_cap = sum_cap + excluded.sum_cap,
+            max_cap = MAX(COALESCE(max_cap, 0), COALESCE(excluded.max_cap, 0)),
+            sum_holders = sum_holders + excluded.sum_holders;
+    END
+    """,
+)
+
+EVENT_INSERT_SQL = """
+    INSERT INTO mm_events (wallet_id, mint, sig, cap, holders, tag, ts, day)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# [تحديث] فهرس تجميع المحافظ: صف لكل محفظة مرتبطة بمجموعة (المنفردة لا تُخزن)
+CLUSTERS_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS wallet_clusters (
+        wallet_id TEXT PRIMARY KEY,
+        cluster_id TEXT NOT NULL,
+        reason TEXT,
+        updated_at INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_wallet_clusters_cluster ON wallet_clusters(cluster_id)",
+    # محفظة تظهر لأول مرة في mm_intel بعد ربطها تأخذ معرف مجموعتها فوراً
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_mm_intel_cluster AFTER INSERT ON mm_intel
+    WHEN NEW.cluster_id IS NULL BEGIN
+        UPDATE mm_intel SET cluster_id = (SELECT cluster_id FROM wallet_clusters WHERE wallet_id = NEW.wallet_id)
+        WHERE wallet_id = NEW.wallet_id;
+    END
+    """,
+)
+
+CLUSTER_UPSERT_SQL = """
+    INSERT INTO wallet_clusters (cluster_id, wallet_id, reason, updated_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(wallet_id) DO UPDATE SET
+        cluster_id = excluded.cluster_id, reason = excluded.reason, updated_at = excluded.updated_at
+"""
+
+MM_INTEL_CLUSTER_SQL = "UPDATE mm_intel SET cluster_id = ? WHERE wallet_id = ?"
+
+UPSERT_SQL = """
+    INSERT INTO mm_intel (wallet_id, threat_level, behavior_pattern, trust_score, total_raids, historical_data_json, last_seen_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(wallet_id) DO UPDATE SET
+        threat_level = excluded.threat_level,
+        behavior_pattern = excluded.behavior_pattern,
+        trust_score = excluded.trust_score,
+        total_raids = total_raids + excluded.total_raids,
+        historical_data_json = excluded.historical_data_json,
+        last_seen_at = excluded.last_seen_at
+"""
+
+
+class ArchiveWriter:
+    """
+    كاتب خلفي (Write-Behind) باتصال SQLite واحد دائم.
+    يجمع عمليات الـ upsert في الذاكرة، يدمج التكرارات لنفس المحفظة،
+    ثم ينفذ Commit جماعي كل N صف أو كل M ميلي ثانية.
+    """
+    def __init__(self, db_path: str, batch_rows: int = 256, flush_interval_ms: int = 50,
+                 max_pending: int = 10000, max_retries: int = 3, busy_timeout_ms: int = 5000):
+        self.db_path = db_path
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max_pending
+        # دفعة فاشلة تُعاد للطابور حتى max_retries مرة، ثم كتابة صفاً صفاً (يُسقط الفاشل فقط)
+        self.max_retries = max(1, max_retries)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._failures = 0
+        self._db: Optional[aiosqlite.Connection] = None
+        # wallet_id -> صف جاهز للكتابة (يحفظ ترتيب الوصول)
+        self._pending: Dict[str, list] = {}
+        # أحداث إلحاقية: لا دمج هنا، كل ملاحظة تُحفظ
+        self._events: List[tuple] = []
+        # تغييرات المجموعات: wallet_id -> (cluster_id, wallet_id, reason, ts) آخر قيمة تفوز
+        self._clusters: Dict[str, tuple] = {}
+        self._wake = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._start_lock = asyncio.Lock()
+        self.is_running = False
+        # مستمع اختياري يُستدعى بالصفوف بعد كل Commit (يستخدمه قياس الأداء)
+        self.on_commit: Optional[Callable[[List[list]], None]] = None
+        self.stats = {
+            "batches": 0, "rows_written": 0, "events_written": 0, "clusters_written": 0, "coalesced": 0, "errors": 0,
+            "retries": 0, "rows_dropped": 0,
+            "last_batch_size": 0, "max_batch_size": 0,
+            "last_commit_ms": 0.0, "max_commit_ms": 0.0,
+        }
+
+    async def start(self):
+        """فتح الاتصال الدائم وتهيئة الجدول وتشغيل مهمة الكتابة"""
+        async with self._start_lock:
+            if self.is_running:
+                return
+            self._db = await aiosqlite.connect(self.db_path)
+            await self._db.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: لا fsync إلا عند الـ checkpoint، والـ Commit الجماعي يبقى آمناً
+            await self._db.execute("PRAGMA synchronous=NORMAL")
+            # كتّاب آخرون على نفس الملف (مصنع الاستيعاب، مرحلة التخزين): ننتظر القفل بدلاً من الفشل فوراً
+            await self._db.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            await self._db.execute(MM_INTEL_SCHEMA)
+            # قواعد بيانات أقدم من عمود cluster_id
+            columns = {row[1] for row in await self._db.execute_fetchall("PRAGMA table_info(mm_intel)")}
+            if "cluster_id" not in columns:
+                await self._db.execute("ALTER TABLE mm_intel ADD COLUMN cluster_id TEXT")
+            for ddl in MM_INTEL_INDEXES + EVENTS_SCHEMA + CLUSTERS_SCHEMA:
+                await self._db.execute(ddl)
+            await self._db.commit()
+            self.is_running = True
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"🗄️ Write-behind archive online ({self.batch_rows} rows / {self.flush_interval * 1000:.0f}ms)")
+
+    async def upsert(self, wallet_id: str, threat_level: int, behavior_pattern: str,
+                     trust_score: int, historical_data_json: str, last_seen_at: str):
+        """إضافة عملية upsert للطابور؛ التكرار لنفس المحفظة يُدمج في صف واحد"""
+        if len(self._pending) >= self.max_pending and wallet_id not in self._pending:
+            await self._backpressure()
+
+        row = self._pending.get(wallet_id)
+        if row is not None:
+            # نفس منطق ON CONFLICT: زيادة عدد الغارات وآخر تقييم وبيانات تفوز
+            row[1] = threat_level
+            row[2] = behavior_pattern
+            row[3] = trust_score
+            row[4] += 1
+            row[5] = historical_data_json
+            row[6] = last_seen_at
+            self.stats["coalesced"] += 1
+        else:
+            self._pending[wallet_id] = [wallet_id, threat_level, behavior_pattern, trust_score,
+                                        1, historical_data_json, last_seen_at]
+        if len(self._pending) >= self.batch_rows:
+            self._wake.set()
+
+    async def record_event(self, wallet_id: str, mint: Optional[str], sig: Optional[str],
+                           cap: Optional[float], holders: Optional[int], tag: str, ts_ms: int):
+        """إلحاق ملاحظة في mm_events (تُكتب في نفس معاملة دفعة mm_intel)"""
+        if len(self._events) >= self.max_pending:
+            await self._backpressure()
+        self._events.append((wallet_id, mint, sig, cap, holders, tag, ts_ms, ts_ms // 86400000))
+        if len(self._events) >= self.batch_rows:
+            self._wake.set()
+
+    def queue_clusters(self, rows: List[tuple]):
+        """صفوف (cluster_id, wallet_id, reason) من فهرس المجموعات؛ تُكتب مع الدفعة التالية"""
+        now = int(time.time() * 1000)
+        for cluster_id, wallet_id, reason in rows:
+            self._clusters[wallet_id] = (cluster_id, wallet_id, reason, now)
+        if len(self._clusters) >= self.batch_rows:
+            self._wake.set()
+
+    async def load_clusters(self) -> List[tuple]:
+        """(wallet_id, cluster_id) المحفوظة لاستعادة الفهرس عند الإقلاع"""
+        if self._db is None:
+            return []
+        return list(await self._db.execute_fetchall("SELECT wallet_id, cluster_id FROM wallet_clusters"))
+
+    async def _backpressure(self):
+        # ضغط عكسي: ننتظر تفريغ الدفعة الحالية بدلاً من النمو بلا حدود
+        self._drained.clear()
+        self._wake.set()
+        await self._drained.wait()
+
+    async def _run(self):
+        while self.is_running:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending or self._events or self._clusters:
+                await self.flush()
+                if self._failures:
+                    # تراجع قبل إعادة محاولة دفعة أُعيدت للطابور
+                    await asyncio.sleep(self._retry_delay())
+
+    def _retry_delay(self) -> float:
+        return min(self.flush_interval * (2 ** self._failures), 2.0)
+
+    def _requeue(self, batch: List[list], events: List[tuple], clusters: List[tuple]):
+        """إعادة دفعة فاشلة للطابور؛ ما وصل بعدها لنفس المحفظة يفوز مع جمع عدد الغارات"""
+        pending = {row[0]: row for row in batch}
+        for wallet_id, newer in self._pending.items():
+            older = pending.get(wallet_id)
+            if older is not None:
+                newer[4] += older[4]
+            pending[wallet_id] = newer
+        self._pending = pending
+        self._events = events + self._events
+        for row in clusters:
+            self._clusters.setdefault(row[1], row)
+
+    async def _write_rows(self, batch: List[list], events: List[tuple], clusters: List[tuple]):
+        """الملاذ الأخير: كل صف في عبارته الخاصة؛ يُسقط فقط الصف الذي يفشل فعلاً"""
+        written = ([], [], [])
+        dropped = 0
+        for rows, statements, ok in ((batch, (UPSERT_SQL,), written[0]),
+                                     (events, (EVENT_INSERT_SQL,), written[1]),
+                                     (clusters, (CLUSTER_UPSERT_SQL, MM_INTEL_CLUSTER_SQL), written[2])):
+            for row in rows:
+                try:
+                    for sql in statements:
+                        await self._db.execute(sql, row if sql != MM_INTEL_CLUSTER_SQL else (row[0], row[1]))
+                    ok.append(row)
+                except Exception as e:
+                    dropped += 1
+                    logger.error(f"❌ DB Row dropped ({row[0]}): {e}")
+        try:
+            await self._db.commit()
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"❌ DB Commit failed, {len(batch) + len(events) + len(clusters)} rows dropped: {e}")
+            dropped, written = len(batch) + len(events) + len(clusters), ([], [], [])
+        if dropped:
+            self.stats["rows_dropped"] += dropped
+            METRICS.inc("db_rows_dropped_total", dropped)
+        return written
+
+    async def flush(self):
+        """كتابة كل الصفوف المعلقة في معاملة واحدة"""
+        async with self._flush_lock:
+            if not (self._pending or self._events or self._clusters) or self._db is None:
+                self._drained.set()
+                return
+            batch = list(self._pending.values())
+            events = self._events
+            clusters = list(self._clusters.values())
+            self._pending = {}
+            self._events = []
+            self._clusters = {}
+            started = time.perf_counter()
+            try:
+                if batch:
+                    await self._db.executemany(UPSERT_SQL, batch)
+                if events:
+                    await self._db.executemany(EVENT_INSERT_SQL, events)
+                if clusters:
+                    await self._db.executemany(CLUSTER_UPSERT_SQL, clusters)
+                    await self._db.executemany(MM_INTEL_CLUSTER_SQL, [(c[0], c[1]) for c in clusters])
+                await self._db.commit()
+                self._failures = 0
+            except Exception as e:
+                await self._db.rollback()
+                self.stats["errors"] += 1
+                METRICS.inc("db_errors_total")
+                self._failures += 1
+                if self._failures < self.max_retries:
+                    # خطأ عابر غالباً (database is locked): لا نفقد الدفعة
+                    self.stats["retries"] += 1
+                    logger.warning(f"⚠️ DB Batch Error ({len(batch)} rows), retry {self._failures}/{self.max_retries}: {e}")
+                    self._requeue(batch, events, clusters)
+                    self._drained.set()
+                    return
+                logger.error(f"❌ DB Batch Error ({len(batch)} rows) after {self._failures} attempts: {e}. "
+                             f"Falling back to per-row writes.")
+                self._failures = 0
+                batch, events, clusters = await self._write_rows(batch, events, clusters)
+            finally:
+                self._drained.set()
+            commit_s = time.perf_counter() - started
+            commit_ms = commit_s * 1000
+            METRICS.observe("db_write", commit_s)
+            METRICS.inc("db_rows_total", len(batch))
+            self.stats["batches"] += 1
+            self.stats["rows_written"] += len(batch)
+            self.stats["events_written"] += len(events)
+            self.stats["clusters_written"] += len(clusters)
+            self.stats["last_batch_size"] = len(batch)
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+            self.stats["last_commit_ms"] = commit_ms
+            self.stats["max_commit_ms"] = max(self.stats["max_commit_ms"], commit_ms)
+            if self.on_commit is not None:
+                self.on_commit(batch)
+
+    async def close(self):
+        """إيقاف المهمة مع تفريغ آخر دفعة قبل إغلاق الاتصال"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._wake.set()
+        if self._task:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # دفعة أُعيدت للطابور بعد خطأ عابر لا تُفقد عند الإغلاق: نكرر حتى يفرغ الطابور؛
+        # بعد max_retries ينتقل flush نفسه للكتابة صفاً صفاً فالحلقة تنتهي دائماً
+        while self._pending or self._events or self._clusters:
+            await self.flush()
+            if self._failures:
+                await asyncio.sleep(self._retry_delay())
+        await self._db.close()
+        self._db = None
+        logger.info(f"🗄️ Archive writer flushed & closed ({self.stats['rows_written']} rows total).")
@@ -1,59 +1,153 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-import json
 import os
 import time
 import threading 
+import datetime
+import httpx
 from core.sniffer import PumpSniffer 
 from core.archiver import SovereignArchiver
+from core.metrics import METRICS, parse_prometheus_text
+
+METRICS_URL = os.getenv("SOVEREIGN_METRICS_URL", "http://127.0.0.1:9108/metrics")
+
+def _metric(values: dict, name: str) -> float:
+    """قيمة بلا وسوم (عملية واحدة)، أو أعلى قيمة بوسم stage في وضع خط الإنتاج"""
+    if name in values:
+        return values[name]
+    labelled = [v for k, v in values.items() if k.startswith(name + "{")]
+    return max(labelled) if labelled else 0.0
 
 # ==========================================
 # 🧠 INTELLIGENCE DATA CORE
 # ==========================================
 class SovereignVault:
+    # [تحديث] عند الإطلاق من main.py: نفس قاعدة المحرك (analysis_engine.archiver_settings.db_path)
+    DB_PATH = os.getenv("SOVEREIGN_DB_PATH", "./archive/vault_v1.sqlite")
+
     @staticmethod
-    def get_connection():
-        db_path = "./archive/vault_v1.sqlite"
+    def get_connection(check_same_thread: bool = True):
+        db_path = SovereignVault.DB_PATH
         if not os.path.exists(db_path): return None
-        return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=check_same_thread)
+
+    @staticmethod
+    @st.cache_resource
+    def _change_probe():
+        """اتصال قراءة واحد دائم مشترك بين كل المشاهدين لفحص PRAGMA data_version"""
+        return {"conn": None, "lock": threading.Lock()}
 
     @classmethod
-    @st.cache_data(ttl=2) 
-    def fetch_live_registry(cls):
+    def archive_version(cls) -> int:
+        """رقم يتغير فقط عند Commit من اتصال آخر (الأرشيف) — أرخص من أي استعلام على الجدول"""
+        probe = cls._change_probe()
+        with probe["lock"]:
+            if probe["conn"] is None:
+                probe["conn"] = cls.get_connection(check_same_thread=False)
+                if probe["conn"] is None: return 0
+            try:
+                return probe["conn"].execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error:
+                probe["conn"].close()
+                probe["conn"] = None
+                return 0
+
+    # [تحديث] استخراج حقول JSON داخل SQLite نفسه (json_extract) بدلاً من iterrows + json.loads لكل صف
+    # وجلب الصفوف الأحدث من العلامة المائية (last_seen_at) فقط
+    REGISTRY_QUERY = """
+        SELECT wallet_id, threat_level, behavior_pattern, trust_score, total_raids, last_seen_at,
+               COALESCE(json_extract(meta, '$.api.image_url'), json_extract(meta, '$.api.logo')) AS token_icon,
+               COALESCE(json_extract(meta, '$.api.name'), 'Scanning...') AS token_name,
+               COALESCE(json_extract(meta, '$.stats.cap'), 0) AS Market_Cap_Raw,
+               COALESCE(json_extract(meta, '$.stats.holders'), 0) AS Holders
+        FROM (
+            SELECT *, CASE WHEN json_valid(historical_data_json) THEN historical_data_json END AS meta
+            FROM mm_intel WHERE last_seen_at >= ?
+        )
+        ORDER BY last_seen_at DESC
+    """
+
+    # الكاتب الخلفي يثبّت الدفعات متأخرة قليلاً، لذا نعيد قراءة نافذة قصيرة قبل العلامة المائية
+    WATERMARK_LOOKBACK = datetime.timedelta(seconds=5)
+
+    @staticmethod
+    @st.cache_resource
+    def _registry_state():
+        """إطار مشترك بين كل الجلسات (بدون نسخ/pickle لكل استدعاء) يُحدَّث تزايدياً، مفهرس بالمحفظة"""
+        return {"df": pd.DataFrame(), "watermark": "", "version": None, "lock": threading.Lock()}
+
+    @classmethod
+    def fetch_live_registry(cls, version: int = 0):
+        # نفس إصدار الأرشيف = نفس الإطار المشترك بلا أي استعلام؛ المستدعون يقرؤونه فقط ولا يعدلونه
+        state = cls._registry_state()
+        with state["lock"]:
+            if version and state["version"] == version:
+                return state["df"]
+            conn = cls.get_connection()
+            if not conn: return state["df"]
+            try:
+                fresh = pd.read_sql(cls.REGISTRY_QUERY, conn, params=(state["watermark"],))
+                state["version"] = version
+                if fresh.empty:
+                    return state["df"]
+                # تنظيف وعرض الماركت كاب (للصفوف الجديدة فقط)
+                fresh['Market_Cap_Raw'] = pd.to_numeric(fresh['Market_Cap_Raw'], errors='coerce').fillna(0)
+                fresh['Holders'] = pd.to_numeric(fresh['Holders'], errors='coerce').fillna(0).astype(int)
+                fresh['Market_Cap'] = fresh['Market_Cap_Raw'].map('${:,.0f}'.format)
+                fresh.index = fresh['wallet_id'].to_numpy()
+
+                held = state["df"]
+                if not held.empty:
+                    # المحافظ المحدَّثة فقط تُحذف من الإطار القديم (بحث بالفهرس)؛ الجديدة أحدث دائماً فتبقى في الأعلى
+                    stale = held.index.intersection(fresh.index)
+                    if len(stale):
+                        held = held.drop(stale)
+                    fresh = pd.concat([fresh, held])
+                state["df"] = fresh
+                newest = datetime.datetime.fromisoformat(fresh['last_seen_at'].iloc[0])
+                state["watermark"] = (newest - cls.WATERMARK_LOOKBACK).isoformat()
+                return fresh
+            except Exception: return state["df"]
+            finally: conn.close()
+
+    @classmethod
+    @st.cache_data(max_entries=2)
+    def fetch_hourly_activity(cls, version: int = 0):
+        """آخر 24 ساعة من جدول التجميع rollup_hour (بحث بالمفتاح الأساسي، بدون فحص JSON)"""
         conn = cls.get_connection()
         if not conn: return pd.DataFrame()
         try:
-            query = "SELECT * FROM mm_intel ORDER BY last_seen_at DESC"
-            df = pd.read_sql(query, conn)
-            enriched_rows = []
-            for _, row in df.iterrows():
-                row_dict = row.to_dict()
-                try:
-                    meta = json.loads(row['historical_data_json'])
-                    api_data = meta.get('api', {}) or {}
-                    stats = meta.get('stats', {}) or {}
-                except: 
-                    api_data = {}
-                    stats = {}
-                
-                row_dict['token_icon'] = api_data.get('image_url') or api_data.get('logo')
-                row_dict['token_name'] = api_data.get('name', 'Scanning...')
-                # تنظيف وعرض الماركت كاب
-                cap_val = stats.get('cap', 0)
-                row_dict['Market_Cap_Raw'] = cap_val
-                row_dict['Market_Cap'] = f"${cap_val:,.0f}"
-                row_dict['Holders'] = stats.get('holders', 0)
-                enriched_rows.append(row_dict)
-            return pd.DataFrame(enriched_rows) 
+            df = pd.read_sql("SELECT hour, events, max_cap FROM rollup_hour ORDER BY hour DESC LIMIT 24", conn)
+            df['hour'] = pd.to_datetime(df['hour'] * 3600, unit='s')
+            return df
         except Exception: return pd.DataFrame()
         finally: conn.close()
 
+    @staticmethod
+    @st.cache_data(ttl=2)
+    def fetch_engine_load():
+        """حمل المحرك الحقيقي من نقطة القياس، أو من الرادار المحلي داخل هذه العملية"""
+        try:
+            text = httpx.get(METRICS_URL, timeout=0.5).text
+        except Exception:
+            text = METRICS.render()
+        values = parse_prometheus_text(text)
+        return {
+            "utilisation": _metric(values, "sovereign_worker_utilisation"),
+            "queue_depth": int(_metric(values, "sovereign_queue_depth")),
+            "queue_capacity": int(_metric(values, "sovereign_queue_capacity")),
+            "dropped": int(_metric(values, "sovereign_events_dropped_total")),
+        }
+
 # --- [دالة تشغيل البوت] ---
 def start_bot_engine():
+    # [تحديث] عند الإطلاق من main.py المحرك يعمل بالفعل (عملية واحدة أو خط إنتاج): لا رادار ثانٍ هنا
+    if os.getenv("SOVEREIGN_ENGINE_MANAGED"):
+        return
     if 'engine_running' not in st.session_state:
         try:
-            archiver = SovereignArchiver(db_path="./archive/vault_v1.sqlite")
+            archiver = SovereignArchiver(db_path=SovereignVault.DB_PATH)
             wss_url = st.secrets.get("WSS_URL", "wss://api.mainnet-beta.solana.com")
             bot = PumpSniffer(wss_url=wss_url, archiver=archiver)
             
@@ -67,12 +161,28 @@ def start_bot_engine():
 # ==========================================
 # 🖥️ SOVEREIGN INTERFACE BUILDER
 # ==========================================
+PAGE_SIZE = 50
+CHANGE_POLL_S = 1.0
+# إعادة رسم إجبارية بين الحين والآخر لتحديث وقت التشغيل وحمل المحرك
+IDLE_REFRESH_S = 30.0
+
+@st.fragment(run_every=CHANGE_POLL_S)
+def watch_archive(seen_version: int, rendered_at: float):
+    """
+    فحص رخيص (PRAGMA فقط) كل CHANGE_POLL_S داخل fragment: خيط السكربت لا يُحجز بين الفحوصات،
+    وإعادة الرسم الكاملة فقط عند تغير الأرشيف أو بعد IDLE_REFRESH_S.
+    """
+    if SovereignVault.archive_version() != seen_version or time.time() - rendered_at >= IDLE_REFRESH_S:
+        st.rerun(scope="app")
+
 def render_dashboard():
     st.set_page_config(page_title="SOVEREIGN APEX", page_icon="🛡️", layout="wide")
     
     start_bot_engine()
 
-    df = SovereignVault.fetch_live_registry()
+    # قراءة الإصدار قبل الجلب حتى لا يضيع أي تغيير يحدث أثناء الرسم
+    version = SovereignVault.archive_version()
+    df = SovereignVault.fetch_live_registry(version)
     
     # Header Section
     st.title("🛰️ Sovereign MM Intelligence")
@@ -93,7 +203,17 @@ def render_dashboard():
     avg_holders = int(df['Holders'].mean()) if not df.empty else 0
     m3.metric("Avg Holders Score", avg_holders)
     
-    m4.metric("Engine Load", "Optimal", delta="Stable")
+    load = SovereignVault.fetch_engine_load()
+    m4.metric(
+        "Engine Load", f"{load['utilisation']:.0%}",
+        delta=f"Queue {load['queue_depth']}/{load['queue_capacity']} | Drops {load['dropped']}",
+        delta_color="inverse" if load['dropped'] else "off"
+    )
+
+    hourly = SovereignVault.fetch_hourly_activity(version)
+    if not hourly.empty:
+        st.caption("📈 Detections per hour (last 24h)")
+        st.bar_chart(hourly, x="hour", y="events", height=160)
 
     st.markdown("---")
 
@@ -106,8 +226,12 @@ def render_dashboard():
             st.write("Calculating volume density...")
     else:
         st.subheader("🧬 Recognized Elite Patterns")
+        # [تحديث] ترقيم صفحات على الخادم: نرسل للمتصفح صفحة واحدة فقط
+        pages = max(1, -(-len(df) // PAGE_SIZE))
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+        start = (page - 1) * PAGE_SIZE
         st.dataframe(
-            df,
+            df.iloc[start:start + PAGE_SIZE],
             column_config={
                 "token_icon": st.column_config.ImageColumn("Icon", width="small"), 
                 "token_name": "Name",
@@ -122,9 +246,8 @@ def render_dashboard():
             use_container_width=True
         )
 
-    # التحديث التلقائي الذكي (كل 4 ثوانٍ لتخفيف الضغط على السيرفر)
-    time.sleep(4)
-    st.rerun()
+    # التحديث التلقائي الذكي: إعادة الرسم فقط عند تغير الأرشيف
+    watch_archive(version, time.time())
 
 if __name__ == "__main__":
     render_dashboard()
@@ -2,6 +2,7 @@ import asyncio
 import os
 import logging
 import signal
+import ssl
 import time
 import subprocess
 import sys
@@ -10,8 +11,18 @@ import yaml
 from typing import Optional
 
 # استيراد المكونات الاحترافية
-from core.archiver import MMArchiver
+from core.archiver import SovereignArchiver
 from core.sniffer import PumpSniffer
+from core.metrics import METRICS, MetricsServer
+from core.telemetry import TelemetryServer
+from core.curves import BondingCurveTracker
+from core.bundles import BundleDetector, DEFAULT_JITO_TIP_ACCOUNTS
+from core.clusters import WalletClusterIndex
+from core.wash import WashTradingDetector
+from core.positions import PositionBook, DryRunExecutor
+from core.ingest import SpoolIngestor
+from core.pipeline import PipelineSupervisor
+from core.backfill import GapBackfiller
 
 # إعداد السجلات
 logging.basicConfig(
@@ -32,11 +43,25 @@ class SovereignEngine:
         load_dotenv()
         
         self.config = self._load_config()
-        self.archiver = MMArchiver(
-            db_path=self.config['analysis_engine']['archiver_settings']['db_path']
+        self.curves = self._build_curve_tracker()
+        self.clusters = self._build_cluster_index()
+        self.wash = self._build_wash_detector()
+        self.archiver = SovereignArchiver(
+            db_path=self.config['analysis_engine']['archiver_settings']['db_path'],
+            recheck_settings=self.config.get('scanner', {}).get('recheck'),
+            curve_tracker=self.curves,
+            wash_detector=self.wash,
         )
+        if self.clusters is not None:
+            self.clusters.on_change = self.archiver.writer.queue_clusters
+        self.positions: Optional[PositionBook] = None
+        self.ingestor: Optional[SpoolIngestor] = None
+        self.pipeline: Optional[PipelineSupervisor] = None
+        self.backfiller: Optional[GapBackfiller] = None
         self.sniffer: Optional[PumpSniffer] = None
         self.dashboard_proc: Optional[subprocess.Popen] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self.telemetry_server: Optional[TelemetryServer] = None
         self._running = False
 
     def _load_config(self) -> dict:
@@ -47,6 +72,78 @@ class SovereignEngine:
             logger.critical(f"💥 Failed to load config.yaml: {e}")
             raise SystemExit(1)
 
+    def _build_curve_tracker(self) -> Optional[BondingCurveTracker]:
+        scanner_cfg = self.config.get('scanner', {})
+        curves_cfg = scanner_cfg.get('curves', {})
+        if not curves_cfg.get('enabled', True):
+            return None
+        filters = scanner_cfg.get('filters', {})
+        return BondingCurveTracker(
+            min_liquidity_sol=filters.get('min_liquidity_sol', 0.0),
+            max_dev_holding_pct=filters.get('max_dev_holding_pct', 100.0),
+            sol_price_usd=filters.get('sol_price_usd', 150.0),
+            max_tracked=curves_cfg.get('max_tracked', 2000),
+            ttl_s=curves_cfg.get('ttl_s', 1800),
+        )
+
+    def _build_cluster_index(self) -> Optional[WalletClusterIndex]:
+        engine_cfg = self.config.get('analysis_engine', {})
+        if "wallet_clustering" not in (engine_cfg.get('detection_patterns') or []):
+            return None
+        clustering_cfg = engine_cfg.get('clustering', {})
+        return WalletClusterIndex(
+            co_buy_window_s=clustering_cfg.get('co_buy_window_s', 5.0),
+            min_co_buys=clustering_cfg.get('min_co_buys', 3),
+            max_pairs=clustering_cfg.get('max_pairs', 200000),
+        )
+
+    def _build_wash_detector(self) -> Optional[WashTradingDetector]:
+        engine_cfg = self.config.get('analysis_engine', {})
+        if "wash_trading_detection" not in (engine_cfg.get('detection_patterns') or []):
+            return None
+        wash_cfg = engine_cfg.get('wash_trading', {})
+        return WashTradingDetector(
+            window_s=wash_cfg.get('window_s', 300),
+            capacity=wash_cfg.get('capacity', 256),
+            max_mints=wash_cfg.get('max_mints', 2000),
+            idle_s=wash_cfg.get('idle_s', 900),
+            min_trades=wash_cfg.get('min_trades', 10),
+            flag_score=wash_cfg.get('flag_score', 0.6),
+            cluster_index=self.clusters,
+        )
+
+    def _build_bundle_detector(self) -> Optional[BundleDetector]:
+        scanner_cfg = self.config.get('scanner', {})
+        if not scanner_cfg.get('filters', {}).get('check_bundle_buy', False):
+            return None
+        bundles_cfg = scanner_cfg.get('bundles', {})
+        return BundleDetector(
+            window_slots=bundles_cfg.get('window_slots', 2),
+            min_wallets=bundles_cfg.get('min_wallets', 3),
+            max_windows=bundles_cfg.get('max_windows', 5000),
+            tip_accounts=bundles_cfg.get('jito_tip_accounts') or DEFAULT_JITO_TIP_ACCOUNTS,
+        )
+
+    def _build_backfiller(self, wss_url: str) -> Optional[GapBackfiller]:
+        network_cfg = self.config.get('network', {})
+        backfill_cfg = network_cfg.get('backfill', {})
+        if not backfill_cfg.get('enabled', True):
+            return None
+        # RPC_URL_HTTP من .env، ثم network.rpc.http، ثم نفس مزود الـ WSS الأساسي عبر HTTPS
+        cfg_http = network_cfg.get('rpc', {}).get('http') or ""
+        rpc_url = os.getenv("RPC_URL_HTTP") or (cfg_http if cfg_http.startswith(("http://", "https://")) else None)
+        if not rpc_url:
+            rpc_url = wss_url.replace("wss://", "https://", 1).replace("ws://", "http://", 1)
+        return GapBackfiller(
+            rpc_url=rpc_url,
+            program_id=PumpSniffer.PROGRAM_ID,
+            page_limit=backfill_cfg.get('page_limit', 1000),
+            batch_size=backfill_cfg.get('batch_size', 50),
+            concurrency=backfill_cfg.get('concurrency', 4),
+            max_signatures=backfill_cfg.get('max_signatures', 5000),
+            commitment=network_cfg.get('commitment', 'confirmed'),
+        )
+
     def _launch_dashboard(self):
         """إطلاق واجهة Dashboard.py كعملية مستقلة"""
         logger.info("🎨 [UI] Launching Sovereign Intelligence Dashboard...")
@@ -56,18 +153,51 @@ class SovereignEngine:
                 sys.executable, "-m", "streamlit", "run", "dashboard.py",
                 "--server.port", "8501",
                 "--server.headless", "true"
-            ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+               env={**os.environ, "SOVEREIGN_ENGINE_MANAGED": "1",
+                    "SOVEREIGN_DB_PATH": self.config['analysis_engine']['archiver_settings']['db_path']})
             logger.info("✅ [UI] Dashboard is active on http://localhost:8501")
         except Exception as e:
             logger.error(f"❌ [UI] Failed to start dashboard: {e}")
 
+    def _collect_wss_urls(self, primary: str) -> list:
+        """النقطة الأساسية من .env + نقاط إضافية (WSS_URL_FALLBACKS أو network.rpc.wss)"""
+        extra = [u.strip() for u in os.getenv("WSS_URL_FALLBACKS", "").split(",")]
+        cfg_wss = self.config.get('network', {}).get('rpc', {}).get('wss') or []
+        extra += [cfg_wss] if isinstance(cfg_wss, str) else list(cfg_wss)
+        urls = [primary]
+        for u in extra:
+            # تجاهل القيم النموذجية مثل YOUR_PREMIUM_WSS_URL
+            if u and u.startswith(("ws://", "wss://")) and u not in urls:
+                urls.append(u)
+        return urls
+
     async def boot_sequence(self):
         """تسلسل الإقلاع الشامل"""
         logger.info(f"🛡️  [SYSTEM] Initializing Sovereign Engine v{self.version}")
         
-        # 1. تهيئة الذاكرة السيادية
-        await self.archiver.boot_system()
+        pipeline_cfg = self.config.get('pipeline', {})
+        pipeline_mode = pipeline_cfg.get('enabled', False)
+
+        # 1. تهيئة الذاكرة السيادية (في وضع خط الإنتاج تملكها مرحلة التخزين)
+        if not pipeline_mode:
+            await self.archiver.boot_system()
+            if self.clusters is not None:
+                self.clusters.load(await self.archiver.writer.load_clusters())
         
+        # 1.5 نقطة القياس (Prometheus) لزمن كل مرحلة وعمق الطابور
+        await self._start_metrics()
+
+        # 1.6 خادم الدفع اللحظي لتطبيق الأندرويد
+        await self._start_telemetry()
+
+        # 1.7 دفتر المراكز: وقف الخسارة وشرائح جني الأرباح (داخل مرحلة الإثراء في وضع خط الإنتاج)
+        if not pipeline_mode:
+            self._start_positions()
+
+        # 1.8 مصنع الاستيعاب: ملفات الماسح والمعترض إلى نفس قاعدة الأرشيف
+        await self._start_ingestion()
+
         # 2. إطلاق الواجهة الرسومية (The Dashboard)
         self._launch_dashboard()
         
@@ -76,21 +206,172 @@ class SovereignEngine:
         if not wss_url:
             logger.error("❌ [SECURITY] Critical Error: WSS_URL_PRIMARY is missing in .env")
             return
+        wss_urls = self._collect_wss_urls(wss_url)
+        self.backfiller = self._build_backfiller(wss_url)
+
+        if pipeline_mode:
+            await self._run_pipeline(wss_urls, pipeline_cfg)
+            return
 
         # 4. بناء الرادار
-        self.sniffer = PumpSniffer(wss_url=wss_url, archiver=self.archiver)
+        self.sniffer = PumpSniffer(
+            wss_url=wss_urls,
+            archiver=self.archiver,
+            retry_strategy=self.config.get('network', {}).get('retry_strategy'),
+            bundle_detector=self._build_bundle_detector(),
+            cluster_index=self.clusters,
+            wash_detector=self.wash,
+            backfiller=self.backfiller,
+            **self._sniffer_settings(),
+        )
         
         self._running = True
         logger.info("📡 [RADAR] Scanning Solana for MM Fingerprints... [2026-02-03]")
         
         await self._main_loop()
 
+    async def _start_metrics(self):
+        metrics_cfg = self.config.get('telemetry', {}).get('metrics', {})
+        if not metrics_cfg.get('enabled', True):
+            return
+        METRICS.gauge("uptime_seconds", lambda: time.time() - self.start_time)
+        try:
+            self.metrics_server = await MetricsServer(
+                host=metrics_cfg.get('host', '127.0.0.1'),
+                port=metrics_cfg.get('port', 9108),
+            ).start()
+        except OSError as e:
+            logger.error(f"❌ [METRICS] Failed to bind metrics endpoint: {e}")
+
+    async def _start_telemetry(self):
+        telemetry_cfg = self.config.get('telemetry', {})
+        api_cfg = telemetry_cfg.get('api_server')
+        if not api_cfg or not telemetry_cfg.get('alerts', {}).get('push_notifications', True):
+            return
+        ssl_context = None
+        cert, key = os.getenv("TELEMETRY_TLS_CERT"), os.getenv("TELEMETRY_TLS_KEY")
+        if api_cfg.get('secure') and cert and key:
+            ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ssl_context.load_cert_chain(cert, key)
+        elif api_cfg.get('secure'):
+            logger.warning("⚠️ [TELEMETRY] secure=true but TELEMETRY_TLS_CERT/KEY missing. Serving plain WS.")
+        token = os.getenv("TELEMETRY_TOKEN")
+        if not token and api_cfg.get('host', '0.0.0.0') not in ("127.0.0.1", "localhost"):
+            logger.warning("⚠️ [TELEMETRY] TELEMETRY_TOKEN is not set. The push API is open to the network.")
+        try:
+            self.telemetry_server = await TelemetryServer(
+                host=api_cfg.get('host', '0.0.0.0'),
+                port=api_cfg.get('port', 9000),
+                buffer_size=api_cfg.get('buffer_size', 2048),
+                token=token,
+                ssl_context=ssl_context,
+            ).start()
+            self.archiver.on_archived.append(self.telemetry_server.publish)
+        except OSError as e:
+            logger.error(f"❌ [TELEMETRY] Failed to start push server: {e}")
+
+    def _sniffer_settings(self) -> dict:
+        scanner_cfg = self.config.get('scanner', {})
+        workers_cfg = scanner_cfg.get('workers', {})
+        return {
+            "worker_count": workers_cfg.get('analyst_worker_count', 5),
+            "queue_size": workers_cfg.get('queue_size', 1000),
+            "idle_delay_ms": scanner_cfg.get('timing', {}).get('scan_delay_ms', 0),
+            "drop_policy": workers_cfg.get('drop_policy', 'drop_oldest'),
+        }
+
+    def _build_positions(self) -> Optional[PositionBook]:
+        risk_cfg = self.config.get('risk_management', {})
+        if not risk_cfg or self.curves is None:
+            # الأسعار تأتي من حالة المنحنيات المحلية
+            return None
+        executor_name = risk_cfg.get('executor', 'dry_run')
+        if executor_name != 'dry_run':
+            logger.warning(f"⚠️ [RISK] Unknown executor '{executor_name}'. Falling back to dry_run.")
+        tiers = [(t['multiplier'], t['sell_pct']) for t in (risk_cfg.get('take_profit_strategy') or {}).values()]
+        return PositionBook(
+            stop_loss=risk_cfg.get('stop_loss_limit') if risk_cfg.get('auto_stop_loss', True) else None,
+            tiers=tiers,
+            executor=DryRunExecutor(),
+            tick_interval_ms=risk_cfg.get('tick_interval_ms', 250),
+        )
+
+    def _start_positions(self):
+        book = self._build_positions()
+        if book is None:
+            return
+        self.positions = book.start()
+        self.curves.on_price = self.positions.queue_price
+        position_sol = self.config.get('risk_management', {}).get('position_size_sol', 0.1)
+
+        def open_position(event: dict):
+            tracked = self.curves.get(event["mint"])
+            if tracked and tracked.state and tracked.state.price_sol:
+                price = tracked.state.price_sol
+                self.positions.open(event["mint"], price, position_sol / price)
+
+        self.archiver.on_archived.append(open_position)
+
+    async def _start_ingestion(self):
+        ingest_cfg = self.config.get('ingestion', {})
+        if not ingest_cfg.get('enabled', False):
+            return
+        spool_dirs = [os.path.expanduser(d) for d in ingest_cfg.get('spool_dirs', [])]
+        if not spool_dirs:
+            logger.warning("⚠️ [INGEST] ingestion.enabled=true but no spool_dirs configured.")
+            return
+        self.ingestor = await SpoolIngestor(
+            db_path=self.config['analysis_engine']['archiver_settings']['db_path'],
+            spool_dirs=spool_dirs,
+            worker_count=ingest_cfg.get('worker_count', 4),
+            queue_size=ingest_cfg.get('queue_size', 1000),
+            poll_interval_s=ingest_cfg.get('poll_interval_s', 1.0),
+            max_db_retries=ingest_cfg.get('max_db_retries', 5),
+            max_retry_backoff_s=ingest_cfg.get('max_retry_backoff_s', 60.0),
+        ).start()
+
+    async def _run_pipeline(self, wss_urls: list, pipeline_cfg: dict):
+        """وضع خط الإنتاج: الاستقبال والفك/الإثراء والتخزين في عمليات مستقلة تحت إشراف هذه العملية"""
+        if self.clusters is not None:
+            # مرحلة الإثراء تربط الفهرس بمرحلة التخزين بنفسها
+            self.clusters.on_change = None
+        spec = {
+            "db_path": self.config['analysis_engine']['archiver_settings']['db_path'],
+            "wss_urls": wss_urls,
+            "retry_strategy": self.config.get('network', {}).get('retry_strategy'),
+            "recheck": self.config.get('scanner', {}).get('recheck'),
+            "sniffer": self._sniffer_settings(),
+            "components": {
+                "curves": self.curves,
+                "clusters": self.clusters,
+                "wash": self.wash,
+                "bundles": self._build_bundle_detector(),
+                "positions": self._build_positions(),
+                "backfiller": self.backfiller,
+            },
+            "position_size_sol": self.config.get('risk_management', {}).get('position_size_sol', 0.1),
+            "stats_interval_s": pipeline_cfg.get('stats_interval_s', 2.0),
+        }
+        self.pipeline = PipelineSupervisor(
+            spec,
+            frame_queue_size=pipeline_cfg.get('frame_queue_size', 10000),
+            store_queue_size=pipeline_cfg.get('store_queue_size', 10000),
+            restart_backoff_s=pipeline_cfg.get('restart_backoff_s', 1.0),
+            max_restart_backoff_s=pipeline_cfg.get('max_restart_backoff_s', 30.0),
+        )
+        # نفس مستمعي الأرشيف (خادم الدفع للأندرويد) يتلقون الأهداف من مرحلة الإثراء
+        self.pipeline.on_archived = self.archiver.on_archived
+        self._running = True
+        logger.info("🏭 [PIPELINE] Multi-process mode: ingest | enrichment | storage")
+        await self.pipeline.run()
+
     async def _main_loop(self):
         retry_count = 0
         while self._running:
             try:
                 await self.sniffer.start_sniffing()
             except Exception as e:
+                METRICS.inc("engine_restarts_total")
                 retry_count += 1
                 wait_time = min(retry_count * 5, 60)
                 logger.error(f"⚠️ [RECOVERY] Connection lost. Retrying in {wait_time}s...")
@@ -110,7 +391,33 @@ class SovereignEngine:
         # إيقاف الرادار
         if self.sniffer:
             self.sniffer.stop()
+            for report in self.sniffer.backfill_reports:
+                logger.info(f"🩹 [BACKFILL] gap {report['gap_s']:.1f}s | {report['signatures']} sigs | "
+                            f"{report['recovered']} recovered | {report['duration_s']:.2f}s")
+        if self.backfiller:
+            await self.backfiller.close()
+
+        # في وضع خط الإنتاج: إيقاف مرتب يفرغ طابور التخزين قبل آخر Commit
+        if self.pipeline:
+            await self.pipeline.close()
+
+        # تفريغ دفعات الأرشيف المعلقة قبل إلغاء المهام
+        await self.archiver.close()
+        ws = self.archiver.writer.stats
+        logger.info(f"💾 [ARCHIVE] {ws['rows_written']} rows in {ws['batches']} batches | "
+                    f"max batch {ws['max_batch_size']} | max commit {ws['max_commit_ms']:.1f}ms")
         
+        if self.positions:
+            await self.positions.close()
+            ps = self.positions.stats
+            logger.info(f"📈 [RISK] {ps['opened']} positions | {ps['intents']} sell intents | {len(self.positions._rows)} open")
+        if self.ingestor:
+            await self.ingestor.close()
+        if self.metrics_server:
+            await self.metrics_server.close()
+        if self.telemetry_server:
+            await self.telemetry_server.close()
+
         # إيقاف واجهة الويب
         if self.dashboard_proc:
             self.dashboard_proc.terminate()
@@ -118,22 +425,28 @@ class SovereignEngine:
             
         uptime = time.time() - self.start_time
         logger.info(f"🏁 [OFFLINE] System Secured. Uptime: {uptime:.2f}s.")
-        
-        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
-        [t.cancel() for t in tasks]
-        await asyncio.gather(*tasks, return_exceptions=True)
 
 async def main():
     engine = SovereignEngine()
     loop = asyncio.get_running_loop()
 
+    # الإشارة تضبط حدثاً فقط: الإغلاق نفسه يُنتظر هنا، فلا يلغيه asyncio.run وهو في منتصف التفريغ
+    stop_requested = asyncio.Event()
     for sig in (signal.SIGINT, signal.SIGTERM):
-        loop.add_signal_handler(sig, lambda s=sig: asyncio.create_task(engine.shutdown(s)))
+        loop.add_signal_handler(sig, stop_requested.set)
 
-    try:
-        await engine.boot_sequence()
-    except asyncio.CancelledError:
-        pass
+    boot = asyncio.create_task(engine.boot_sequence())
+    stop = asyncio.create_task(stop_requested.wait())
+    await asyncio.wait({boot, stop}, return_when=asyncio.FIRST_COMPLETED)
+
+    await engine.shutdown()
+    # ما تبقى من الإقلاع (حلقة الاستقبال) يُلغى فقط بعد اكتمال تفريغ الأرشيف والتخزين
+    stop.cancel()
+    if not boot.done():
+        boot.cancel()
+    await asyncio.gather(boot, stop, return_exceptions=True)
+    if not boot.cancelled() and boot.exception() is not None:
+        raise boot.exception()
 
 if __name__ == "__main__":
     try:
@@ -3,6 +3,8 @@ import json
 import time
 import re
 from playwright.sync_api import sync_playwright
+from core.jsonl import RotatingJsonlWriter
+from core.classify import PayloadClassifier
 
 # إعداد المسارات
 BASE_DIR = os.path.expanduser("~/Desktop/solx")
@@ -10,6 +12,11 @@ USER_DATA_DIR = os.path.join(BASE_DIR, "user_profile")
 BROWSERS_PATH = os.path.join(BASE_DIR, "pw-browsers")
 os.environ["PLAYWRIGHT_BROWSERS_PATH"] = BROWSERS_PATH
 
+# [تحديث] كاتب خلفي بطابور محدود: مقاطع smart_archive_*.jsonl تُدوّر وتُضغط كل 64MB أو 10 دقائق
+ARCHIVE_WRITER = RotatingJsonlWriter(BASE_DIR, prefix="smart_archive")
+# [تحديث] تصنيف حسب بصمة الـ endpoint (LRU) + استخراج سجلات مُنمَّطة لكل فئة
+CLASSIFIER = PayloadClassifier(extract=True)
+
 def run(playwright):
     context = playwright.chromium.launch_persistent_context(
         USER_DATA_DIR,
@@ -18,42 +25,39 @@ def run(playwright):
         args=["--start-maximized", "--disable-blink-features=AutomationControlled"]
     )
 
-    def classify_data(data):
-        """ذكاء اصطناعي مصغر لتصنيف نوع البيانات المجمعة"""
-        text_data = str(data).lower()
-        if any(x in text_data for x in ["price", "liquidity", "marketcap"]):
-            return "MARKET_STATS"
-        if any(x in text_data for x in ["signature", "tx", "hash"]):
-            return "TRADES_LOG"
-        if any(x in text_data for x in ["wallet", "address", "balance"]):
-            return "WALLET_INFO"
-        return "GENERAL_DATA"
+    def classify_data(data, url=""):
+        """ذكاء اصطناعي مصغر لتصنيف نوع البيانات المجمعة (البصمة البنيوية بدلاً من المسح النصي)"""
+        return CLASSIFIER.classify_and_extract(data, url)
 
-    def save_organized_log(source_type, tab_title, content, url=""):
+    def save_organized_log(source_type, tab_title, content, url="", size=0):
         """تنظيم المعلومات في هيكل بيانات واضح"""
-        category = classify_data(content)
+        category, records = classify_data(content, url)
         log_entry = {
             "time": time.strftime("%H:%M:%S"),
             "category": category,
             "source": source_type,
             "tab": tab_title[:30],
+            "size": size,
             "details": content,
             "url_snippet": url[-50:] if url else "N/A"
         }
+        if records:
+            log_entry["records"] = records
         
-        # حفظ في ملف منظم بصيغة JSON Lines لسهولة القراءة لاحقاً
-        with open(os.path.join(BASE_DIR, "smart_archive.json"), "a", encoding="utf-8") as f:
-            f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+        # حفظ بصيغة JSON Lines عبر الكاتب الخلفي (بدون فتح الملف في كل رد)
+        ARCHIVE_WRITER.write(log_entry)
+        return category
 
     def smart_interceptor(response):
         try:
             if "json" in response.header_value("content-type"):
-                data = response.json()
-                # فحص ما إذا كانت البيانات ضخمة ومهمة (ليست مجرد أيقونات أو إعدادات)
-                if len(str(data)) > 200: 
+                body = response.body()
+                # فحص الحجم من الجسم الخام قبل فك JSON (ليست مجرد أيقونات أو إعدادات)
+                if len(body) > 200: 
+                    data = json.loads(body)
                     title = response.frame.page.title()
-                    save_organized_log("API", title, data, response.url)
-                    print(f"[📂 تصنيف]: تم حفظ {classify_data(data)} من {title[:15]}")
+                    category = save_organized_log("API", title, data, response.url, len(body))
+                    print(f"[📂 تصنيف]: تم حفظ {category} من {title[:15]}")
         except:
             pass
 
@@ -63,9 +67,9 @@ def run(playwright):
 
     def handle_ws(payload, title):
         try:
-            data = json.loads(payload)
             if len(payload) > 100:
-                save_organized_log("SOCKET", title, data)
+                data = json.loads(payload)
+                save_organized_log("SOCKET", title, data, size=len(payload))
                 print(f"[⚡ لحظي]: صيد منظّم من {title[:15]}")
         except:
             pass
@@ -88,5 +92,11 @@ def run(playwright):
     page.wait_for_timeout(999999999)
 
 if __name__ == "__main__":
-    with sync_playwright() as playwright:
-        run(playwright)
+    ARCHIVE_WRITER.start()
+    try:
+        with sync_playwright() as playwright:
+            run(playwright)
+    finally:
+        ARCHIVE_WRITER.close()
+        stats = ARCHIVE_WRITER.stats
+        print(f"[💾 أرشيف]: {stats['written']} سجل | {stats['segments']} مقطع | {stats['dropped']} مُسقط")
@@ -2,6 +2,42 @@ import os
 import time
 import json
 import re
+import argparse
+import ctypes
+import hashlib
+import mmap
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+# [تحديث] قراءات كبيرة مقسمة بدلاً من 1MB ثابتة عند الإزاحة 0 (منطقة غير مربوطة غالباً)
+CHUNK_BYTES = 4 * 1024 * 1024
+# تداخل بين القطع حتى لا تضيع صفقة مقسومة على حدود قطعتين
+CHUNK_OVERLAP = 1024
+SOFT_DIRTY_BIT = 1 << 55
+PAGE_PRESENT_BIT = 1 << 63
+
+# نمط "السعر والكمية": كائن JSON مسطح يحتوي price ومعه amount/size/qty
+TRADE_PATTERN = re.compile(
+    rb'\{[^{}\x00]{0,400}?"price"\s*:\s*"?[0-9.eE+-]+"?[^{}\x00]{0,400}?\}'
+)
+QTY_KEYS = ("amount", "size", "qty", "quantity")
+
+
+@dataclass
+class Region:
+    start: int
+    end: int
+    perms: str
+    path: str
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
 
 # النظام يقوم بتحديد الـ PID تلقائياً لأي متصفح يعمل
 def get_browser_pid():
@@ -11,42 +47,247 @@ def get_browser_pid():
         return os.popen(cmd).read().strip()
     except: return None
 
-def scan_and_archive():
-    pid = get_browser_pid()
-    if not pid: return
-    
-    mem_path = f"/proc/{pid}/mem"
-    buffer = []
-    
-    while True:
-        # 1. الاكتشاف التكيفي: يمسح الذاكرة ويبحث عن أي منطقة
-        # تحتوي على "بيانات صفقات" (تتغير قيمها بشكل متسلسل)
-        # يقوم هذا الجزء باستبدال "البحث اليدوي عن البصمة"
-        with open(mem_path, "rb") as mem:
-            mem.seek(0)
-            data_dump = mem.read(1024 * 1024) # سحب عينة للتحليل
-            
-            # الخوارزمية الذكية: تفحص التغيرات (Delta)
-            # وتستخرج فقط ما يشبه بيانات الجدول (السعر والكمية)
-            # دون الحاجة لمعرفة العنوان مسبقاً
-            trades = extract_trades_heuristically(data_dump)
-            
-            if trades:
-                buffer.extend(trades)
-                
-        # 2. الأرشفة الذكية: 50 صفقة أو 3 ثوانٍ
-        if len(buffer) >= 50 or (time.time() % 3 < 0.1 and buffer):
-            with open(f"trades_{int(time.time())}.json", "w") as f:
-                json.dump(buffer, f)
-            buffer = []
-            
-        time.sleep(0.005)
+
+def parse_maps(pid, max_region_bytes: int = 1 << 30) -> List[Region]:
+    """المناطق القابلة للكتابة المجهولة/الكومة فقط (حيث يعيش JSON الصفقات في المتصفح)"""
+    regions = []
+    with open(f"/proc/{pid}/maps") as f:
+        for line in f:
+            parts = line.split(None, 5)
+            addr, perms = parts[0], parts[1]
+            path = parts[5].strip() if len(parts) > 5 else ""
+            if not perms.startswith("rw"):
+                continue
+            if path and path != "[heap]" and not path.startswith("[anon"):
+                continue
+            start, end = (int(x, 16) for x in addr.split("-"))
+            if 0 < end - start <= max_region_bytes:
+                regions.append(Region(start, end, perms, path))
+    return regions
+
+
+def soft_dirty_supported() -> bool:
+    """فحص ذاتي: بعض الأنوية مبنية بدون CONFIG_MEM_SOFT_DIRTY فيبقى البت صفراً دائماً"""
+    try:
+        page = mmap.mmap(-1, PAGE_SIZE)
+        addr = ctypes.addressof(ctypes.c_char.from_buffer(page))
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("4")
+        page[0] = 1
+        with open("/proc/self/pagemap", "rb") as pm:
+            pm.seek(addr // PAGE_SIZE * 8)
+            entry = int.from_bytes(pm.read(8), "little")
+        return bool(entry & SOFT_DIRTY_BIT)
+    except (OSError, ValueError):
+        return False
+
+
+class SoftDirtyTracker:
+    """
+    تتبع الصفحات المعدلة عبر بت soft-dirty: نقرأ pagemap ثم نمسح العلامات (clear_refs=4)،
+    فتعيد كل دورة مسح الصفحات التي كُتبت منذ الدورة السابقة فقط.
+    بدون دعم النواة: كل دورة تقرأ المناطق كاملة لكن القطع غير المتغيرة (نفس البصمة) لا يُعاد تحليلها.
+    """
+    def __init__(self, pid):
+        self.pid = pid
+        self.enabled = soft_dirty_supported()
+        self.primed = False
+
+    def clear(self):
+        if not self.enabled:
+            return
+        try:
+            with open(f"/proc/{self.pid}/clear_refs", "w") as f:
+                f.write("4")
+            self.primed = True
+        except OSError:
+            # النواة أو الصلاحيات لا تدعم soft-dirty: نرجع لمسح كامل في كل دورة
+            self.enabled = False
+
+    def dirty_runs(self, regions: List[Region]) -> List[Tuple[int, int]]:
+        """(العنوان، الطول) لكل سلسلة صفحات متجاورة معدلة وموجودة في الذاكرة"""
+        if not (self.enabled and self.primed):
+            return [(r.start, r.size) for r in regions]
+        runs = []
+        with open(f"/proc/{self.pid}/pagemap", "rb") as pm:
+            for region in regions:
+                first = region.start // PAGE_SIZE
+                count = region.size // PAGE_SIZE
+                pm.seek(first * 8)
+                entries = array("Q")
+                entries.frombytes(pm.read(count * 8))
+                run_start = None
+                for i, entry in enumerate(entries):
+                    if entry & SOFT_DIRTY_BIT and entry & PAGE_PRESENT_BIT:
+                        if run_start is None:
+                            run_start = i
+                    elif run_start is not None:
+                        runs.append(((first + run_start) * PAGE_SIZE, (i - run_start) * PAGE_SIZE))
+                        run_start = None
+                if run_start is not None:
+                    runs.append(((first + run_start) * PAGE_SIZE, (len(entries) - run_start) * PAGE_SIZE))
+        return runs
+
+
+def split_work(runs: List[Tuple[int, int]], parts: int) -> List[List[Tuple[int, int]]]:
+    """تقسيم السلاسل إلى قطع ≤ CHUNK_BYTES ثم توزيعها بالتساوي (حسب الحجم) على العمال"""
+    chunks = []
+    for addr, length in runs:
+        offset = 0
+        while offset < length:
+            size = min(CHUNK_BYTES, length - offset)
+            tail = min(CHUNK_OVERLAP, length - offset - size)
+            chunks.append((addr + offset, size + tail))
+            offset += size
+    buckets = [[] for _ in range(max(1, parts))]
+    loads = [0] * len(buckets)
+    for chunk in sorted(chunks, key=lambda c: -c[1]):
+        i = loads.index(min(loads))
+        buckets[i].append(chunk)
+        loads[i] += chunk[1]
+    return [b for b in buckets if b]
+
 
 def extract_trades_heuristically(dump):
     # خوارزمية البحث الذكي (تتجاهل الشارت والأزرار)
     # تستهدف فقط سلاسل البيانات التي لها نمط "السعر والكمية"
-    return [] # هنا منطق الاستخراج الذاتي
+    trades = []
+    for match in TRADE_PATTERN.finditer(dump):
+        try:
+            obj = json.loads(match.group())
+        except ValueError:
+            continue
+        if isinstance(obj, dict) and any(k in obj for k in QTY_KEYS):
+            trades.append(obj)
+    return trades
+
+
+def scan_chunks(pid, chunks: List[Tuple[int, int, Optional[bytes]]]):
+    """يعمل داخل عملية من المجمع: قراءة القطع المخصصة واستخراج الصفقات من المتغير منها فقط"""
+    found, scanned, digests = [], 0, []
+    with open(f"/proc/{pid}/mem", "rb", buffering=0) as mem:
+        for addr, length, previous in chunks:
+            try:
+                mem.seek(addr)
+                data = mem.read(length)
+            except OSError:
+                # المنطقة أُلغي ربطها بين قراءة maps والقراءة الفعلية
+                continue
+            scanned += len(data)
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            digests.append((addr, length, digest))
+            if digest != previous:
+                found.extend(extract_trades_heuristically(data))
+    return found, scanned, digests
+
+
+def _write_batch(out_dir, buffer):
+    """كتابة ذرية (ملف مؤقت ثم rename) حتى لا يقرأ المستهلك ملفاً نصف مكتوب"""
+    final = os.path.join(out_dir, f"trades_{int(time.time() * 1000)}.json")
+    tmp = final + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(buffer, f)
+    os.replace(tmp, final)
+    return final
+
+
+def scan_and_archive(pid=None, out_dir=".", workers=None, interval=0.25, max_passes=None):
+    pid = pid or get_browser_pid()
+    if not pid: return
+
+    workers = workers or os.cpu_count() or 2
+    tracker = SoftDirtyTracker(pid)
+    # (addr, length) -> بصمة آخر محتوى: مسار بديل عند غياب soft-dirty
+    digests = {}
+    # الصفقات القديمة تبقى في الذاكرة: بصمة كل صفقة محفوظة لتجنب أرشفتها مرتين
+    seen = OrderedDict()
+    buffer = []
+    last_flush = time.time()
+    passes = 0
+    stats = {"passes": 0, "bytes": 0, "trades": 0, "files": 0, "soft_dirty": tracker.enabled}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while max_passes is None or passes < max_passes:
+            passes += 1
+            # 1. الاكتشاف التكيفي: خريطة المناطق الفعلية ثم الصفحات المعدلة فقط
+            try:
+                regions = parse_maps(pid)
+            except FileNotFoundError:
+                break
+            runs = tracker.dirty_runs(regions)
+            # المسح فوراً بعد قراءة pagemap لتقليص نافذة الكتابات غير الملتقطة
+            tracker.clear()
+
+            parts = [[(a, n, digests.get((a, n))) for a, n in part] for part in split_work(runs, workers)]
+            futures = [pool.submit(scan_chunks, pid, part) for part in parts]
+            for fut in futures:
+                trades, scanned, chunk_digests = fut.result()
+                stats["bytes"] += scanned
+                if not tracker.enabled:
+                    for addr, length, digest in chunk_digests:
+                        digests[(addr, length)] = digest
+                for trade in trades:
+                    key = hashlib.blake2b(json.dumps(trade, sort_keys=True).encode(), digest_size=12).digest()
+                    if key in seen:
+                        continue
+                    seen[key] = None
+                    if len(seen) > 100000:
+                        seen.popitem(last=False)
+                    buffer.append(trade)
+                    stats["trades"] += 1
+            stats["passes"] += 1
+
+            # 2. الأرشفة الذكية: 50 صفقة أو 3 ثوانٍ
+            if len(buffer) >= 50 or (buffer and time.time() - last_flush >= 3):
+                _write_batch(out_dir, buffer)
+                stats["files"] += 1
+                buffer = []
+                last_flush = time.time()
+
+            time.sleep(interval)
+
+    if buffer:
+        _write_batch(out_dir, buffer)
+        stats["files"] += 1
+    return stats
+
+
+def _dummy_target(pattern_count=200, hold_s=30.0):
+    """عملية وهمية تكتب صفقات معروفة في الكومة تدريجياً (للتحقق من الماسح محلياً)"""
+    try:
+        import ctypes
+        # السماح لأي عملية (عمال المجمع) بقراءة ذاكرتنا عند تفعيل Yama ptrace_scope=1
+        ctypes.CDLL(None).prctl(0x59616D61, ctypes.c_ulong(-1), 0, 0, 0)
+    except Exception:
+        pass
+    arena = bytearray(64 * 1024 * 1024)
+    pos = 0
+    for i in range(pattern_count):
+        trade = json.dumps({"sig": f"DUMMY{i:06d}", "price": 0.000031 + i * 1e-9, "amount": 1000 + i}).encode()
+        arena[pos:pos + len(trade)] = trade
+        pos += len(trade) + PAGE_SIZE * 7
+        time.sleep(hold_s / pattern_count / 4)
+    time.sleep(hold_s)
+
 
 # تشغيل المحرك كخدمة خلفية
 if __name__ == "__main__":
-    scan_and_archive()
+    parser = argparse.ArgumentParser(description="Sovereign memory radar")
+    parser.add_argument("--pid", help="عملية الهدف (الافتراضي: أحدث متصفح)")
+    parser.add_argument("--out", default=".", help="مجلد ملفات trades_*.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--interval", type=float, default=0.25)
+    parser.add_argument("--passes", type=int, default=None)
+    parser.add_argument("--dummy", action="store_true", help="مسح عملية وهمية تكتب صفقات معروفة")
+    args = parser.parse_args()
+
+    if args.dummy:
+        import multiprocessing
+        target = multiprocessing.Process(target=_dummy_target, daemon=True)
+        target.start()
+        time.sleep(0.5)
+        result = scan_and_archive(target.pid, args.out, args.workers, args.interval, args.passes or 40)
+        target.terminate()
+        print(f"[🧪 وهمي]: {result}")
+    else:
+        scan_and_archive(args.pid, args.out, args.workers, args.interval, args.passes)
@@ -0,0 +1,56 @@
+"""بناء إطارات وسجلات Pump.fun اصطناعية للاختبارات (نفس ترميز Borsh الذي يفكه core.pump_events)"""
+import base64
+import json
+import struct
+
+import base58
+
+from core.pump_events import CREATE_EVENT_DISCRIMINATOR, TRADE_EVENT_DISCRIMINATOR
+
+PROGRAM_ID = "6EF8rrecthR5DkZJbdz4P8hHKXY6yizQ2EtJhEqNpump"
+
+
+def key(n: int) -> bytes:
+    return bytes([n % 256]) * 32
+
+
+def pubkey(n: int) -> str:
+    return base58.b58encode(key(n)).decode()
+
+
+def borsh_str(value: str) -> bytes:
+    raw = value.encode()
+    return struct.pack("<I", len(raw)) + raw
+
+
+def create_payload(name="Token", symbol="TKN", uri="https://ipfs.io/ipfs/x", mint=1, curve=2, user=3, creator=None):
+    payload = (CREATE_EVENT_DISCRIMINATOR + borsh_str(name) + borsh_str(symbol) + borsh_str(uri)
+               + key(mint) + key(curve) + key(user))
+    return payload + key(creator) if creator is not None else payload
+
+
+def trade_payload(mint=1, sol=10**9, tokens=10**6, is_buy=True, user=4, ts=1_700_000_000,
+                  v_sol=30 * 10**9, v_tokens=10**15):
+    return (TRADE_EVENT_DISCRIMINATOR + key(mint) + struct.pack("<QQ?", sol, tokens, is_buy) + key(user)
+            + struct.pack("<qQQ", ts, v_sol, v_tokens))
+
+
+def program_data(payload: bytes) -> str:
+    return "Program data: " + base64.b64encode(payload).decode()
+
+
+def create_logs(**kwargs):
+    return [f"Program {PROGRAM_ID} invoke [1]", "Program log: Instruction: Create",
+            program_data(create_payload(**kwargs))]
+
+
+def trade_logs(*trades, is_buy=True):
+    marker = "Buy" if is_buy else "Sell"
+    return ([f"Program {PROGRAM_ID} invoke [1]", f"Program log: Instruction: {marker}"]
+            + [program_data(trade_payload(**t)) for t in trades])
+
+
+def logs_frame(signature: str, logs, slot: int = 1) -> str:
+    return json.dumps({"jsonrpc": "2.0", "method": "logsNotification", "params": {
+        "result": {"context": {"slot": slot}, "value": {"signature": signature, "err": None, "logs": logs}},
+        "subscription": 1}})
@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+
+from core.archiver import SovereignArchiver
+from core.metrics import METRICS
+from core.sniffer import MarketEvent, PumpSniffer
+
+
+def test_cancelled_owner_does_not_cancel_coalesced_waiters(tmp_path):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"mint": "M", "usd_market_cap": 12000})
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        archiver = SovereignArchiver(str(tmp_path / "a.sqlite"), http_client=client,
+                                     recheck_settings={"enabled": False})
+        owner = asyncio.create_task(archiver._fetch_coin("M"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(archiver._fetch_coin("M"))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        data = await waiter
+        await client.aclose()
+        return owner, data, archiver.http_stats
+
+    owner, data, stats = asyncio.run(scenario())
+    assert owner.cancelled()
+    # المنتظر أعاد الطلب بنفسه بدلاً من وراثة الإلغاء
+    assert data == {"mint": "M", "usd_market_cap": 12000}
+    assert len(calls) == 2 and stats["coalesced"] == 1
+
+
+class _SlowArchiver:
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    async def analyze_and_archive(self, wallet, raw_data, behavior_tag):
+        self.started.set()
+        await asyncio.sleep(10)
+
+
+def test_stop_cancels_busy_worker_and_releases_the_queue():
+    archiver = _SlowArchiver()
+
+    async def scenario():
+        sniffer = PumpSniffer("wss://rpc.test", archiver, worker_count=1)
+        sniffer.is_running = True
+        sniffer._start_workers()
+        sniffer._enqueue(MarketEvent(signature="s1", timestamp=0.0, event_type="Create", creator="C"))
+        await asyncio.wait_for(archiver.started.wait(), 1.0)
+        sniffer.stop()
+        await asyncio.gather(*sniffer._workers, return_exceptions=True)
+        # task_done في finally: من ينتظر join لا يعلق على عنصر أُلغي أثناء معالجته
+        await asyncio.wait_for(sniffer._queue.join(), 1.0)
+        return sniffer._workers[0]
+
+    assert asyncio.run(scenario()).cancelled()
+
+
+def test_null_market_cap_is_archived_without_a_formatting_error(tmp_path):
+    async def scenario():
+        archiver = SovereignArchiver(str(tmp_path / "a.sqlite"), recheck_settings={"enabled": False})
+        saved = []
+        archiver.on_archived.append(saved.append)
+        before = METRICS.snapshot()["counters"].get(("db_errors_total", ()), 0)
+        try:
+            # رد API بلا قيمة سوقية بعد اجتياز الفحص (إثراء متأخر أو حقل null)
+            ok = await archiver._archive_viable("W", {"mint": "M", "sig": "S"}, "New Launch", {"usd_market_cap": None})
+            errors = METRICS.snapshot()["counters"].get(("db_errors_total", ()), 0) - before
+            # لا يجتاز الفلتر أصلاً: لا كتابة ولا خطأ
+            rejected = await archiver.archive_if_viable("W", {"mint": "M2"}, "New Launch",
+                                                        {"usd_market_cap": None, "holder_count": 500})
+        finally:
+            await archiver.close()
+        return ok, errors, rejected, saved
+
+    ok, errors, rejected, saved = asyncio.run(scenario())
+    assert ok and errors == 0 and rejected is False
+    assert [(e["mint"], e["cap"]) for e in saved] == [("M", None)]
@@ -0,0 +1,272 @@
+import asyncio
+import base64
+import json
+import struct
+
+import httpx
+
+import core.backfill as backfill_module
+from core.backfill import GapBackfiller
+from core.metrics import METRICS
+from core.pump_events import CREATE_EVENT_DISCRIMINATOR
+from core.sniffer import PumpSniffer
+
+TRADE_LOGS = ["Program 6EF8rrecthR5DkZJbdz4P8hHKXY6yizQ2EtJhEqNpump invoke [1]", "Program log: Instruction: Buy"]
+
+
+def _borsh_str(value: str) -> bytes:
+    raw = value.encode()
+    return struct.pack("<I", len(raw)) + raw
+
+
+def _create_logs(i: int):
+    payload = (CREATE_EVENT_DISCRIMINATOR + _borsh_str(f"Token{i}") + _borsh_str(f"T{i}")
+               + _borsh_str("https://ipfs.io/ipfs/x") + bytes([i]) * 32 * 4)
+    return ["Program 6EF8rrecthR5DkZJbdz4P8hHKXY6yizQ2EtJhEqNpump invoke [1]",
+            "Program log: Instruction: Create",
+            "Program data: " + base64.b64encode(payload).decode()]
+
+
+class FakeRpc:
+    """عقدة RPC وهمية: سجل توقيعات البرنامج (الأحدث أولاً) + سجل بكل طلب POST"""
+    def __init__(self, ledger, tip_slot=None):
+        # ledger: [(signature, slot, err, logs)] بالترتيب الزمني
+        self.ledger = list(reversed(ledger))
+        self.tip_slot = tip_slot
+        self.posts = []
+
+    def _signatures(self, opts):
+        sigs = [s for s, *_ in self.ledger]
+        start = sigs.index(opts["before"]) + 1 if "before" in opts else 0
+        end = sigs.index(opts["until"]) if "until" in opts else len(sigs)
+        page = self.ledger[start:end][:opts["limit"]]
+        return [{"signature": s, "slot": slot, "err": err} for s, slot, err, _ in page]
+
+    def _transaction(self, sig):
+        for s, slot, _, logs in self.ledger:
+            if s == sig and logs is not None:
+                return {"slot": slot, "meta": {"logMessages": logs}}
+        return None
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        batch = json.loads(request.content)
+        self.posts.append(batch)
+        replies = []
+        for req in reversed(batch):
+            if req["method"] == "getSignaturesForAddress":
+                result = self._signatures(req["params"][1])
+            elif req["method"] == "getTransaction":
+                result = self._transaction(req["params"][0])
+            else:
+                result = self.tip_slot
+            replies.append({"jsonrpc": "2.0", "id": req["id"], "result": result})
+        return httpx.Response(200, json=replies)
+
+    def calls(self, method):
+        return [req for batch in self.posts for req in batch if req["method"] == method]
+
+
+def _backfiller(rpc, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(rpc.handler))
+    return GapBackfiller("http://rpc.test", PumpSniffer.PROGRAM_ID, client=client, **kwargs)
+
+
+def test_signatures_between_pages_within_until_and_before():
+    ledger = [(f"s{slot}", slot, {"InstructionError": []} if slot == 110 else None, TRADE_LOGS)
+              for slot in range(100, 125)]
+    rpc = FakeRpc(ledger)
+
+    async def scenario():
+        backfiller = _backfiller(rpc, page_limit=5)
+        try:
+            return await backfiller.signatures_between("s102", "s120")
+        finally:
+            await backfiller.close()
+
+    found, truncated = asyncio.run(scenario())
+    # (102, 120) حصرياً، الأقدم أولاً، بدون المعاملة الفاشلة
+    assert [slot for _, slot in found] == [s for s in range(103, 120) if s != 110]
+    assert not truncated
+    calls = rpc.calls("getSignaturesForAddress")
+    assert len(calls) == 4
+    assert [c["params"][1].get("before") for c in calls] == ["s120", "s115", "s110", "s105"]
+    assert all(c["params"][1]["until"] == "s102" and c["params"][1]["limit"] == 5 for c in calls)
+
+
+def test_signatures_between_truncates_and_honours_max_slot():
+    rpc = FakeRpc([(f"s{slot}", slot, None, TRADE_LOGS) for slot in range(100, 125)])
+
+    async def scenario():
+        backfiller = _backfiller(rpc, page_limit=4, max_signatures=6)
+        try:
+            return (await backfiller.signatures_between("s100", max_slot=118),
+                    await backfiller.signatures_between("s100", max_slot=105))
+        finally:
+            await backfiller.close()
+
+    (capped, truncated), (bounded, _) = asyncio.run(scenario())
+    assert truncated and [slot for _, slot in capped] == list(range(113, 119))
+    assert [slot for _, slot in bounded] == list(range(101, 106))
+
+
+def test_fetch_transactions_batches_requests():
+    ledger = [(f"s{i}", 200 + i, None, None if i == 4 else TRADE_LOGS) for i in range(7)]
+    rpc = FakeRpc(ledger)
+
+    async def scenario():
+        backfiller = _backfiller(rpc, batch_size=3, concurrency=1)
+        try:
+            return await backfiller.fetch_transactions([f"s{i}" for i in range(7)])
+        finally:
+            await backfiller.close()
+
+    txs, failed = asyncio.run(scenario())
+    assert [len(batch) for batch in rpc.posts] == [3, 3, 1]
+    # الردود تُعاد لترتيب الطلبات رغم أن العقدة تردها معكوسة
+    assert [sig for sig, _, _ in txs] == ["s0", "s1", "s2", "s3", "s5", "s6"]
+    assert [slot for _, slot, _ in txs] == [200, 201, 202, 203, 205, 206]
+    assert failed == 1
+
+
+def _gap_ledger():
+    # إطلاق كل 5 slots والباقي تداولات؛ الانقطاع بعد s102 والعودة عند s120
+    return [(f"s{slot}", slot, None, _create_logs(slot) if slot % 5 == 0 else TRADE_LOGS)
+            for slot in range(100, 130)]
+
+
+def _sniffer(rpc):
+    sniffer = PumpSniffer("wss://rpc.test", archiver=None, wash_detector=object(),
+                          backfiller=_backfiller(rpc, page_limit=4, batch_size=5))
+    observed = []
+    sniffer._observe_trades = lambda logs, slot, tipped, **kw: observed.append(slot)
+    return sniffer, observed
+
+
+def test_backfill_gap_skips_seen_launches_and_stops_at_resume_marker():
+    rpc = FakeRpc(_gap_ledger(), tip_slot=129)
+    sniffer, observed = _sniffer(rpc)
+    # الإطلاق s110 وصل حياً من نقطة أخرى قبل سد الفجوة
+    sniffer._seen["s110"] = 0.0
+    sniffer._resume_marker = ("s120", 120)
+
+    async def scenario():
+        try:
+            return await sniffer._backfill_gap(0.0, ("s102", 102), resume_wait_s=0)
+        finally:
+            await sniffer.backfiller.close()
+
+    report = asyncio.run(scenario())
+    fetched = {req["params"][0] for req in rpc.calls("getTransaction")}
+    assert fetched == {f"s{slot}" for slot in range(103, 120)} - {"s110"}
+    assert report["signatures"] == 17 and report["duplicates"] == 1
+    assert report["recovered"] == 2  # s105, s115
+    assert [ev.signature for ev in list(sniffer._queue._queue)] == ["s105", "s115"]
+    assert all(slot < 120 for slot in observed)
+    assert sorted(observed) == [s for s in range(103, 120) if s != 110]
+
+
+def test_backfill_gap_without_live_frame_is_bounded_by_reconnect_slot():
+    rpc = FakeRpc(_gap_ledger(), tip_slot=116)
+    sniffer, observed = _sniffer(rpc)
+
+    async def scenario():
+        try:
+            return await sniffer._backfill_gap(0.0, ("s102", 102), resume_wait_s=0.1)
+        finally:
+            await sniffer.backfiller.close()
+
+    report = asyncio.run(scenario())
+    # ما بعد slot إعادة الاتصال يغطيه البث الحي: لا يُجلب ولا يُغذى للكواشف مرة ثانية
+    assert {req["params"][0] for req in rpc.calls("getTransaction")} == {f"s{slot}" for slot in range(103, 116)}
+    assert report["recovered"] == 3  # s105, s110, s115
+    assert max(observed) <= 115
+    assert not sniffer._awaiting_resume
+
+
+class RateLimitedRpc(FakeRpc):
+    """ترد بـ 429 على أول limited طلبات ثم تتصرف كالعقدة العادية"""
+    def __init__(self, ledger, limited):
+        super().__init__(ledger)
+        self.limited = limited
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if self.limited:
+            self.limited -= 1
+            self.posts.append(json.loads(request.content))
+            return httpx.Response(429, json={"error": "slow down"})
+        return super().handler(request)
+
+
+def _record_backoff(monkeypatch):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(backfill_module.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def test_rate_limited_batch_is_retried_with_exponential_backoff(monkeypatch):
+    delays = _record_backoff(monkeypatch)
+    rpc = RateLimitedRpc([(f"s{i}", 300 + i, None, TRADE_LOGS) for i in range(4)], limited=2)
+
+    async def scenario():
+        backfiller = _backfiller(rpc, batch_size=4, max_retries=3)
+        try:
+            return await backfiller.fetch_transactions([f"s{i}" for i in range(4)])
+        finally:
+            await backfiller.close()
+
+    before = METRICS.snapshot()["counters"].get(("backfill_rate_limited_total", ()), 0)
+    txs, failed = asyncio.run(scenario())
+    assert [sig for sig, _, _ in txs] == ["s0", "s1", "s2", "s3"] and failed == 0
+    # نفس الدفعة كاملة أُعيدت: 3 طلبات POST كل منها 4 معاملات
+    assert [len(batch) for batch in rpc.posts] == [4, 4, 4]
+    assert delays == [0.5, 1.0]
+    assert METRICS.snapshot()["counters"][("backfill_rate_limited_total", ())] - before == 2
+
+
+def test_exhausted_retries_count_the_batch_as_failed(monkeypatch):
+    delays = _record_backoff(monkeypatch)
+    rpc = RateLimitedRpc([(f"s{i}", 300 + i, None, TRADE_LOGS) for i in range(5)], limited=10)
+
+    async def scenario():
+        backfiller = _backfiller(rpc, batch_size=3, concurrency=1, max_retries=1)
+        try:
+            return await backfiller.fetch_transactions([f"s{i}" for i in range(5)])
+        finally:
+            await backfiller.close()
+
+    txs, failed = asyncio.run(scenario())
+    assert txs == [] and failed == 5
+    assert len(rpc.posts) == 4 and delays == [0.5, 0.5]
+
+
+def test_cancelled_backfill_does_not_orphan_the_tip_request():
+    rpc = FakeRpc(_gap_ledger(), tip_slot=129)
+    sniffer, _ = _sniffer(rpc)
+    tips = []
+
+    async def hanging_slot():
+        tips.append(asyncio.current_task())
+        await asyncio.sleep(60)
+
+    sniffer.backfiller.current_slot = hanging_slot
+
+    async def scenario():
+        gap = asyncio.create_task(sniffer._backfill_gap(0.0, ("s102", 102), resume_wait_s=30))
+        await asyncio.sleep(0.1)
+        gap.cancel()
+        await asyncio.gather(gap, return_exceptions=True)
+        # داخل الحلقة نفسها: asyncio.run يلغي المهام المتبقية عند الخروج فيخفي التسرب
+        tip_done = [t.done() for t in tips]
+        await sniffer.backfiller.close()
+        return gap, tip_done
+
+    gap, tip_done = asyncio.run(scenario())
+    assert gap.cancelled()
+    assert tip_done == [True] and tips[0].cancelled()
+    assert not sniffer.backfill_reports
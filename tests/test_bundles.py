@@ -0,0 +1,51 @@
+from core.bundles import DEFAULT_JITO_TIP_ACCOUNTS, BundleDetector, TipMatcher
+
+
+def test_launch_is_flagged_once_when_distinct_wallets_buy_within_the_window():
+    alerts = []
+    detector = BundleDetector(window_slots=2, min_wallets=3, on_bundle=alerts.append)
+    detector.watch("M", slot=100, creator="dev", context="launch-event")
+    assert detector.observe_buy("M", 100, "w1", tipped=True) is None
+    # نفس المحفظة مرتين لا تُحتسب محفظتين
+    assert detector.observe_buy("M", 101, "w1") is None
+    assert detector.observe_buy("M", 101, "w2") is None
+    window = detector.observe_buy("M", 102, "w3")
+    assert window is not None and window.context == "launch-event"
+    assert window.same_slot_wallets == 1 and window.tipped == 1
+    # التنبيه مرة واحدة فقط
+    assert detector.observe_buy("M", 102, "w4") is None
+    assert alerts == [window] and detector.stats["flagged"] == 1
+
+
+def test_buys_after_the_window_do_not_count():
+    detector = BundleDetector(window_slots=2, min_wallets=2)
+    detector.watch("M", slot=100)
+    assert detector.observe_buy("M", 100, "w1") is None
+    assert detector.observe_buy("M", 103, "w2") is None
+    assert detector.stats["buys_in_window"] == 1
+
+
+def test_windows_are_evicted_as_the_chain_advances_and_by_capacity():
+    detector = BundleDetector(window_slots=2, max_windows=2)
+    detector.watch("A", slot=100)
+    detector.watch("B", slot=101)
+    detector.watch("C", slot=101)
+    assert list(detector._windows) == ["B", "C"]
+    detector.observe_buy("X", 104, "w1")
+    assert not detector._windows
+    assert detector.stats["evicted"] == 3
+
+
+def test_wallets_per_launch_are_capped():
+    detector = BundleDetector(window_slots=2, min_wallets=3, max_wallets_per_launch=2)
+    detector.watch("M", slot=100)
+    for wallet in ("w1", "w2", "w3"):
+        assert detector.observe_buy("M", 100, wallet) is None
+    assert detector._windows["M"].wallets == {"w1", "w2"}
+
+
+def test_tip_matcher_scans_each_line_once_for_any_tip_account():
+    matcher = TipMatcher()
+    assert matcher.matches(["Program log: x", f"Transfer to {DEFAULT_JITO_TIP_ACCOUNTS[3]}"])
+    assert not matcher.matches(["Program log: Instruction: Buy"])
+    assert not TipMatcher([]).matches([DEFAULT_JITO_TIP_ACCOUNTS[0]])
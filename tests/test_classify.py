@@ -0,0 +1,47 @@
+from core.classify import PayloadClassifier, fingerprint, normalise_path
+
+
+def test_variable_path_segments_share_one_fingerprint():
+    mint = "7GCihgDB8fe6KNjn2MYtkzZcRjQy3t9GHdC8uHYmW2hr"
+    assert normalise_path(f"https://api.x.io/v1/token/{mint}/trades?limit=5") == "api.x.io/v1/token/:id/trades"
+    assert normalise_path("https://api.x.io/orders/123/0xdeadbeefdeadbeefdead") == "api.x.io/orders/:id/:id"
+    assert fingerprint({"b": 1, "a": 2}, "https://h/x/1") == fingerprint({"a": 3, "b": 4}, "https://h/x/2")
+
+
+def test_repeated_endpoint_schema_is_served_from_the_cache():
+    classifier = PayloadClassifier()
+    url = "https://api.x.io/v1/pairs/{}"
+    assert classifier.classify({"priceUsd": "1.5", "liquidity": 10}, url.format(1)) == "MARKET_STATS"
+    assert classifier.classify({"priceUsd": "2.0", "liquidity": 20}, url.format(2)) == "MARKET_STATS"
+    assert classifier.stats == {"hits": 1, "misses": 1, "text_scans": 0}
+
+
+def test_unknown_keys_fall_back_to_one_text_scan_per_fingerprint():
+    classifier = PayloadClassifier()
+    payload = {"data": {"nested": {"balance": 5}}}
+    assert classifier.classify(payload, "https://h/a") == "WALLET_INFO"
+    assert classifier.classify({"data": {}}, "https://h/a") == "WALLET_INFO"
+    assert classifier.classify({"other": 1}, "https://h/a") == "GENERAL_DATA"
+    assert classifier.stats["text_scans"] == 2
+
+
+def test_extract_builds_typed_records_for_lists():
+    classifier = PayloadClassifier()
+    # لا مفتاح price: الأسعار تسبق الصفقات في ترتيب الفئات
+    trades = [{"txHash": "s1", "maker": "w1", "token_address": "M", "size": "3"},
+              {"txHash": "s2", "maker": "w2", "token_address": "M", "size": "bad"}]
+    category, records = classifier.classify_and_extract(trades, "https://h/trades")
+    assert category == "TRADES_LOG"
+    assert records == [
+        {"signature": "s1", "wallet": "w1", "mint": "M", "amount": 3.0, "price": None},
+        {"signature": "s2", "wallet": "w2", "mint": "M", "amount": None, "price": None},
+    ]
+
+
+def test_cache_is_bounded():
+    classifier = PayloadClassifier(max_entries=2)
+    for i in range(3):
+        classifier.classify({f"price{i}": 1}, "https://h/x")
+    assert len(classifier._cache) == 2
+    classifier.classify({"price0": 1}, "https://h/x")
+    assert classifier.stats["misses"] == 4
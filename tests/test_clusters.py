@@ -0,0 +1,56 @@
+from core.clusters import WalletClusterIndex
+
+
+def test_co_buys_are_counted_once_per_distinct_mint():
+    index = WalletClusterIndex(co_buy_window_s=5.0, min_co_buys=3)
+    # نفس الزوج يتبادل الشراء على عملتين متداخلتين: ما زالتا عملتين فقط
+    for ts, mint, wallet in [(0, "A", "w1"), (1, "B", "w1"), (2, "A", "w2"), (3, "B", "w2"),
+                             (4, "A", "w1"), (4.5, "B", "w2")]:
+        index.observe_buy(mint, wallet, ts)
+    assert index.cluster_of("w1") is None
+    index.observe_buy("C", "w1", 10)
+    index.observe_buy("C", "w2", 11)
+    assert index.cluster_of("w1") == index.cluster_of("w2") is not None
+
+
+def test_co_buys_across_more_than_two_launches_link_the_pair():
+    index = WalletClusterIndex(co_buy_window_s=5.0, min_co_buys=3)
+    changes = []
+    index.on_change = changes.extend
+    for i, mint in enumerate(["A", "B", "C"]):
+        index.observe_buy(mint, "w1", i * 100)
+        index.observe_buy(mint, "w2", i * 100 + 1)
+        # مشترٍ ثالث يكسر التتابع بين عملات الزوج
+        index.observe_buy(f"X{i}", "w2", i * 100 + 2)
+    assert index.cluster_size("w1") == 2
+    assert {(w, reason) for _, w, reason in changes} == {("w1", "co_buy"), ("w2", "co_buy")}
+    assert not index._pairs
+
+
+def test_buys_outside_the_window_are_not_paired():
+    index = WalletClusterIndex(co_buy_window_s=5.0, min_co_buys=1)
+    index.observe_buy("A", "w1", 0)
+    index.observe_buy("A", "w2", 6)
+    assert index.cluster_of("w2") is None
+    index.observe_buy("A", "w3", 7)
+    assert index.cluster_of("w3") == index.cluster_of("w2")
+
+
+def test_small_cluster_merges_into_the_larger_root():
+    index = WalletClusterIndex()
+    index.link_cosigners(["a", "b", "c"])
+    root = index.cluster_of("a")
+    index.link_cosigners(["d", "e"])
+    changes = []
+    index.on_change = changes.extend
+    assert index.union("d", "b", "co_sign")
+    assert index.cluster_size("e") == 5 and index.cluster_of("e") == root
+    # فقط أعضاء المجموعة الأصغر تُعاد كتابتهم
+    assert sorted(w for _, w, _ in changes) == ["d", "e"]
+
+
+def test_load_restores_clusters_without_recomputing():
+    index = WalletClusterIndex()
+    index.load([("w1", "root"), ("w2", "root"), ("root", "root")])
+    assert index.cluster_size("w1") == 3
+    assert not index.union("w2", "root", "co_sign")
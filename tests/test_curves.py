@@ -0,0 +1,64 @@
+import base64
+import json
+import struct
+
+from builders import create_logs, logs_frame, pubkey, trade_logs
+from core.curves import BondingCurveTracker, TOKEN_DECIMALS, _Connection, decode_bonding_curve
+from core.sniffer import PumpSniffer
+
+SUPPLY = 1_000_000_000 * TOKEN_DECIMALS
+
+
+def _curve_account(v_tokens, v_sol, r_tokens, r_sol, supply=SUPPLY, complete=False) -> bytes:
+    return b"\x00" * 8 + struct.pack("<QQQQQ?", v_tokens, v_sol, r_tokens, r_sol, supply, complete)
+
+
+def test_decode_bonding_curve_layout():
+    state = decode_bonding_curve(_curve_account(10**15, 30 * 10**9, 8 * 10**14, 20 * 10**9))
+    assert state.liquidity_sol == 20.0
+    assert state.price_sol == 30 / 10**9
+    assert round(state.market_cap_sol, 6) == 30.0
+    assert decode_bonding_curve(b"\x00" * 20) is None
+
+
+def test_account_notification_updates_state_and_ignores_stale_slots():
+    tracker = BondingCurveTracker()
+    tracker.track("MINT", "CURVE", "DEV")
+    conn = tracker._conns["ep"] = _Connection(ws=None)
+    conn.sub_to_curve[7] = "CURVE"
+
+    def notify(slot, r_sol):
+        data = base64.b64encode(_curve_account(10**15, 30 * 10**9, 0, r_sol)).decode()
+        return json.dumps({"method": "accountNotification", "params": {
+            "subscription": 7, "result": {"context": {"slot": slot}, "value": {"data": [data, "base64"]}}}})
+
+    tracker.handle_frame(notify(10, 5 * 10**9), "ep")
+    tracker.handle_frame(notify(9, 50 * 10**9), "ep")
+    assert tracker.get("MINT").state.liquidity_sol == 5.0
+    assert tracker.stats["updates"] == 1
+
+
+def test_dev_sell_lifts_local_reject_on_dev_holding():
+    tracker = BondingCurveTracker(max_dev_holding_pct=10.0)
+    tracker.track("MINT", "CURVE", "DEV", dev_tokens=SUPPLY // 5, seed=(30 * 10**9, 10**15))
+    assert tracker.passes_filters("MINT") is False
+    sell = type("Trade", (), {"mint": "MINT", "user": "DEV", "is_buy": False, "token_amount": SUPPLY // 10})()
+    tracker.observe_trade(sell)
+    assert tracker.get("MINT").dev_holding_pct == 10.0
+    assert tracker.passes_filters("MINT") is True
+    other = type("Trade", (), {"mint": "MINT", "user": "SOMEONE", "is_buy": True, "token_amount": SUPPLY})()
+    tracker.observe_trade(other)
+    assert tracker.passes_filters("MINT") is True
+
+
+def test_sniffer_feeds_later_dev_trades_but_not_the_launch_buy_twice():
+    tracker = BondingCurveTracker(max_dev_holding_pct=10.0)
+    sniffer = PumpSniffer("wss://a.test", archiver=None, curve_tracker=tracker)
+    tokens = SUPPLY // 5
+    launch = create_logs(mint=1, curve=2, user=3) + trade_logs({"mint": 1, "user": 3, "tokens": tokens})[2:]
+    sniffer._handle_frame(logs_frame("launch", launch, slot=1), "wss://a.test")
+    assert tracker.get(pubkey(1)).dev_tokens == tokens
+    sell = trade_logs({"mint": 1, "user": 3, "tokens": tokens, "is_buy": False}, is_buy=False)
+    sniffer._handle_frame(logs_frame("dev-sell", sell, slot=2), "wss://a.test")
+    assert tracker.get(pubkey(1)).dev_tokens == 0
+    assert tracker.passes_filters(pubkey(1)) is True
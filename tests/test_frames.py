@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from builders import create_logs, logs_frame, trade_logs
+from core.frames import (decode_logs_frame, has_create_instruction, is_account_frame, is_buy_candidate,
+                         is_create_candidate, is_rpc_response, is_sell_candidate)
+
+
+@pytest.mark.parametrize("as_bytes", [False, True])
+def test_raw_prefilters_accept_str_and_bytes(as_bytes):
+    def raw(frame):
+        return frame.encode() if as_bytes else frame
+
+    create = raw(logs_frame("c1", create_logs()))
+    buy = raw(logs_frame("b1", trade_logs({})))
+    sell = raw(logs_frame("s1", trade_logs({"is_buy": False}, is_buy=False)))
+    assert is_create_candidate(create) and not is_create_candidate(buy)
+    assert is_buy_candidate(buy) and not is_buy_candidate(sell)
+    assert is_sell_candidate(sell) and not is_sell_candidate(create)
+    account = raw(json.dumps({"method": "accountNotification", "params": {"result": {}}}))
+    assert is_account_frame(account) and not is_rpc_response(account)
+    assert is_rpc_response(raw(json.dumps({"jsonrpc": "2.0", "result": 7, "id": 1})))
+
+
+def test_decode_logs_frame_extracts_signature_logs_and_slot():
+    logs = create_logs()
+    assert decode_logs_frame(logs_frame("sig1", logs, slot=321)) == ("sig1", logs, 321)
+    assert decode_logs_frame(logs_frame("sig1", logs, slot=321).encode()) == ("sig1", logs, 321)
+    assert has_create_instruction(logs)
+    assert not has_create_instruction(trade_logs({}))
+
+
+def test_decode_logs_frame_returns_none_for_responses():
+    assert decode_logs_frame(json.dumps({"jsonrpc": "2.0", "result": 7, "id": 1})) is None
+
+
+def test_decode_logs_frame_tolerates_missing_logs_and_context():
+    frame = json.dumps({"params": {"result": {"value": {"signature": "s", "logs": None}}}})
+    assert decode_logs_frame(frame) == ("s", [], 0)
@@ -0,0 +1,55 @@
+import asyncio
+import gzip
+import json
+import os
+import sqlite3
+
+from core.ingest import INGEST_SCHEMA, SpoolIngestor
+
+
+async def _wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_ingests_scraper_trades_and_interceptor_segments(tmp_path):
+    db_path, spool = str(tmp_path / "archive.sqlite"), tmp_path / "spool"
+    spool.mkdir()
+    (spool / "trades_1.json").write_text(json.dumps([{"sig": "a", "price": "1.5", "size": 3}, {"sig": "b"}]))
+    with gzip.open(spool / "smart_archive_1.jsonl.gz", "wt") as f:
+        f.write(json.dumps({"time": "t", "category": "ws", "records": [1]}) + "\n")
+
+    async def scenario():
+        ingestor = await SpoolIngestor(db_path, [str(spool)], worker_count=2, poll_interval_s=0.01).start()
+        await _wait_for(lambda: ingestor.stats["files"] == 2)
+        await ingestor.close()
+
+    asyncio.run(scenario())
+    assert os.listdir(spool) == []
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT sig, price, amount FROM memory_trades ORDER BY sig").fetchall() == \
+            [("a", 1.5, 3.0), ("b", None, None)]
+        assert conn.execute("SELECT category, records_json FROM intercept_log").fetchall() == [("ws", "[1]")]
+
+
+def test_persistent_db_error_backs_off_then_quarantines(tmp_path):
+    db_path, spool = str(tmp_path / "archive.sqlite"), tmp_path / "spool"
+    spool.mkdir()
+    (spool / "trades_1.json").write_text(json.dumps([{"sig": "a"}]))
+    with sqlite3.connect(db_path) as conn:
+        for ddl in INGEST_SCHEMA:
+            conn.execute(ddl)
+        conn.execute("CREATE TRIGGER reject BEFORE INSERT ON memory_trades BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+
+    async def scenario():
+        ingestor = await SpoolIngestor(db_path, [str(spool)], poll_interval_s=0.01, max_db_retries=3).start()
+        await _wait_for(lambda: ingestor.stats["quarantined"] == 1)
+        stats = dict(ingestor.stats)
+        await ingestor.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["errors"] == 3 and stats["files"] == 0
+    assert os.listdir(spool) == ["trades_1.json.bad"]
@@ -0,0 +1,51 @@
+import gzip
+import json
+import os
+import time
+
+from core.jsonl import RotatingJsonlWriter
+
+
+def _read_segments(out_dir):
+    rows = []
+    for name in sorted(os.listdir(out_dir)):
+        path = os.path.join(out_dir, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            rows.append([json.loads(line) for line in f])
+    return rows
+
+
+def test_segments_rotate_by_size_and_are_gzipped(tmp_path):
+    writer = RotatingJsonlWriter(str(tmp_path), prefix="t", max_bytes=200, batch_size=2).start()
+    for i in range(6):
+        assert writer.write({"i": i, "pad": "x" * 60, "text": "سعر"})
+    writer.close()
+    names = sorted(os.listdir(tmp_path))
+    assert names and all(name.startswith("t_") and name.endswith(".jsonl.gz") for name in names)
+    segments = _read_segments(tmp_path)
+    assert [row["i"] for seg in segments for row in seg] == list(range(6))
+    assert len(segments) == writer.stats["segments"] > 1
+    assert writer.stats["written"] == 6 and writer.stats["dropped"] == 0
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    writer = RotatingJsonlWriter(str(tmp_path), queue_size=2, compress=False)
+    # الخيط لم يبدأ بعد: الطابور يمتلئ
+    results = [writer.write({"i": i}) for i in range(4)]
+    assert results == [True, True, False, False] and writer.stats["dropped"] == 2
+    writer.start()
+    writer.close()
+    assert [row["i"] for seg in _read_segments(tmp_path) for row in seg] == [0, 1]
+
+
+def test_idle_segment_rotates_by_age(tmp_path):
+    writer = RotatingJsonlWriter(str(tmp_path), max_seconds=0.2, flush_interval_s=0.05, compress=False).start()
+    writer.write({"i": 0})
+    deadline = 100
+    while writer.stats["segments"] == 0 and deadline:
+        deadline -= 1
+        time.sleep(0.02)
+    assert writer.stats["segments"] == 1
+    writer.close()
+    assert [name.endswith(".jsonl") for name in os.listdir(tmp_path)] == [True]
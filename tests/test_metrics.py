@@ -0,0 +1,51 @@
+import pickle
+
+from core.metrics import METRICS, MetricsRegistry, parse_prometheus_text
+from core.wash import WashTradingDetector
+
+
+def test_released_component_gauges_are_re_registered_by_the_owning_copy():
+    detector = WashTradingDetector()
+    assert "wash_windows" in METRICS.gauges
+    # نسخة المرحلة: الأم تلغي مقياسها، والنسخة تسجل مقياسها بنفسها
+    METRICS.release(detector)
+    assert "wash_windows" not in METRICS.gauges
+    replica = pickle.loads(pickle.dumps(detector))
+    replica.register_gauges()
+    replica.observe("MINT", "w", 1, True, 0.0)
+    assert METRICS.snapshot()["gauges"]["wash_windows"] == 1.0
+    METRICS.release(replica)
+
+
+def test_release_keeps_gauges_re_registered_by_someone_else():
+    registry = MetricsRegistry()
+    first, second = object(), object()
+    registry.gauge("depth", lambda: 1, owner=first)
+    registry.gauge("depth", lambda: 2, owner=second)
+    registry.release(first)
+    assert registry.snapshot()["gauges"] == {"depth": 2.0}
+
+
+def test_remote_gauges_are_labelled_by_stage_not_summed():
+    registry = MetricsRegistry()
+    registry.gauge("worker_utilisation", lambda: 0.9)
+    for stage in ("enrichment", "ingest"):
+        remote = MetricsRegistry()
+        remote.gauge("worker_utilisation", lambda: 0.8)
+        remote.inc("frames_total", 5)
+        registry.absorb(stage, remote.snapshot())
+    values = parse_prometheus_text(registry.render())
+    assert values["sovereign_worker_utilisation"] == 0.9
+    assert values['sovereign_worker_utilisation{stage="enrichment"}'] == 0.8
+    assert values['sovereign_worker_utilisation{stage="ingest"}'] == 0.8
+    # العدادات تراكمية فتُجمع
+    assert values["sovereign_frames_total"] == 10
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc("reconnects_total", endpoint='wss://x"y\\z\nw')
+    registry.observe('stage"x', 0.001)
+    text = registry.render()
+    assert 'sovereign_reconnects_total{endpoint="wss://x\\"y\\\\z\\nw"} 1' in text
+    assert 'stage="stage\\"x"' in text
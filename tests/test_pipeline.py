@@ -0,0 +1,49 @@
+import asyncio
+import queue
+import threading
+
+from builders import create_logs, logs_frame
+from core import pipeline
+from core.archiver import SovereignArchiver
+
+
+def test_enrichment_drains_queued_frames_and_events_before_exiting(tmp_path, monkeypatch):
+    async def slow_archive(self, wallet, raw_data, behavior_tag):
+        await asyncio.sleep(0.005)
+        await self.writer.upsert(wallet, 50, behavior_tag, 50, "{}", "2026")
+
+    monkeypatch.setattr(SovereignArchiver, "analyze_and_archive", slow_archive)
+    frames, control, store, events = queue.Queue(), queue.Queue(), queue.Queue(), queue.Queue()
+    for i in range(40):
+        frames.put(("frame", "wss://a.test", logs_frame(f"sig{i}", create_logs(mint=i, user=100 + i), slot=i)))
+    stop = threading.Event()
+    # الاستقبال توقف بالفعل: ما في الطابور هو كل ما تبقى
+    stop.set()
+    spec = {"components": {}, "db_path": str(tmp_path / "a.sqlite"), "recheck": {"enabled": False},
+            "wss_urls": ["wss://a.test"], "sniffer": {"worker_count": 2}, "stats_interval_s": 60,
+            "position_size_sol": 0.1}
+
+    asyncio.run(pipeline._enrichment_main(spec, frames, control, store, events, stop))
+    ops = []
+    while not store.empty():
+        ops.append(store.get_nowait())
+    assert frames.empty()
+    assert len([op for op, _ in ops if op == "upsert"]) == 40
+
+
+def test_control_message_on_full_frame_queue_does_not_block_the_receive_loop():
+    frames = queue.Queue(maxsize=1)
+    frames.put(("frame", "wss://a.test", "{}"))
+    link = pipeline._ConnectionLink(frames)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        link.attach("wss://a.test", ws=None)
+        blocked_for = loop.time() - started
+        frames.get_nowait()
+        await asyncio.sleep(0.05)
+        return blocked_for
+
+    assert asyncio.run(scenario()) < 0.05
+    assert frames.get(timeout=1.0) == ("attach", "wss://a.test", None)
@@ -0,0 +1,69 @@
+import asyncio
+
+from core.positions import PositionBook
+
+
+def _sells(intents):
+    return [(i.mint, round(i.amount), i.reason) for i in intents]
+
+
+def test_take_profit_tiers_sell_cumulative_fractions_of_the_original_size():
+    book = PositionBook(stop_loss=0.85, tiers=((2.0, 50), (5.0, 30), (10.0, 20)))
+    book.open("A", entry_price=1.0, amount=1000)
+    assert _sells(book.apply_ticks({"A": 2.5})) == [("A", 500, "tier_1")]
+    assert book.apply_ticks({"A": 3.0}) == []
+    assert _sells(book.apply_ticks({"A": 6.0})) == [("A", 300, "tier_2")]
+    assert _sells(book.apply_ticks({"A": 12.0})) == [("A", 200, "tier_3")]
+    assert book.position("A") is None and book.stats["closed"] == 1
+
+
+def test_price_gap_over_several_tiers_sells_them_in_one_intent():
+    book = PositionBook()
+    book.open("A", entry_price=1.0, amount=1000)
+    (intent,) = book.apply_ticks({"A": 6.0})
+    assert (round(intent.amount), intent.reason, intent.multiple) == (800, "tier_2", 6.0)
+    assert book.position("A")["remaining"] == 200
+
+
+def test_stop_loss_sells_the_remainder_and_frees_the_row():
+    book = PositionBook(stop_loss=0.85, capacity=2)
+    book.open("A", entry_price=1.0, amount=1000)
+    book.open("B", entry_price=2.0, amount=10)
+    book.apply_ticks({"A": 2.0})
+    intents = book.apply_ticks({"A": 0.8, "B": 1.9, "unknown": 0.1})
+    assert _sells(intents) == [("A", 500, "stop_loss")]
+    assert book.position("A") is None and book.position("B")["last_price"] == 1.9
+    # الصف المحرر يُعاد استخدامه قبل توسيع المصفوفات
+    book.open("C", entry_price=1.0, amount=1)
+    assert len(book.entry) == 2
+
+
+def test_book_grows_past_its_initial_capacity():
+    book = PositionBook(capacity=1)
+    for i, mint in enumerate("ABC"):
+        book.open(mint, entry_price=1.0 + i, amount=10)
+    assert len(book.entry) == 4
+    assert [book.position(m)["entry"] for m in "ABC"] == [1.0, 2.0, 3.0]
+    assert _sells(book.apply_ticks({"C": 6.0})) == [("C", 5, "tier_1")]
+
+
+def test_queued_prices_are_batched_to_the_executor():
+    class Recorder:
+        def __init__(self):
+            self.batches = []
+
+        async def submit(self, intents):
+            self.batches.append(_sells(intents))
+
+    async def scenario():
+        executor = Recorder()
+        book = PositionBook(executor=executor, tick_interval_ms=10).start()
+        book.open("A", entry_price=1.0, amount=100)
+        book.queue_price("A", 1.5)
+        book.queue_price("A", 2.2)  # آخر تحديث يفوز
+        book.queue_price("Z", 9.0)
+        await asyncio.sleep(0.05)
+        await book.close()
+        return executor.batches
+
+    assert asyncio.run(scenario()) == [[("A", 50, "tier_1")]]
@@ -0,0 +1,36 @@
+from builders import create_logs, create_payload, program_data, pubkey, trade_logs, trade_payload
+from core.pump_events import decode_create_event, decode_trade_event, find_create_event, find_trade_events
+
+
+def test_create_event_is_decoded_from_program_data():
+    event = find_create_event(create_logs(name="Moon", symbol="MOON", mint=11, curve=12, user=13, creator=14))
+    assert (event.name, event.symbol, event.uri) == ("Moon", "MOON", "https://ipfs.io/ipfs/x")
+    assert (event.mint, event.bonding_curve, event.user, event.creator) == (pubkey(11), pubkey(12), pubkey(13), pubkey(14))
+
+
+def test_legacy_create_event_without_creator_falls_back_to_user():
+    event = decode_create_event(create_payload(user=13))
+    assert event.creator == event.user == pubkey(13)
+
+
+def test_truncated_or_foreign_payloads_are_ignored():
+    assert decode_create_event(create_payload()[:60]) is None
+    assert decode_trade_event(trade_payload()[:-1]) is None
+    # بصمة حدث آخر لا تُفك كإنشاء
+    assert decode_create_event(trade_payload()) is None
+    assert find_create_event(["Program data: !!not-base64!!", "Program log: Instruction: Create"]) is None
+
+
+def test_trade_events_are_decoded_in_log_order():
+    logs = trade_logs({"mint": 5, "user": 6, "sol": 2 * 10**9, "tokens": 7}, {"mint": 5, "user": 8, "is_buy": False})
+    logs.append(program_data(b"\x00" * 8 + b"garbage"))
+    first, second = find_trade_events(logs)
+    assert (first.mint, first.user, first.sol_amount, first.token_amount, first.is_buy) == (pubkey(5), pubkey(6), 2 * 10**9, 7, True)
+    assert (second.user, second.is_buy) == (pubkey(8), False)
+    assert first.virtual_sol_reserves == 30 * 10**9 and first.timestamp == 1_700_000_000
+
+
+def test_invalid_utf8_in_names_does_not_abort_decoding():
+    payload = create_payload(name="x")
+    payload = payload.replace(b"\x01\x00\x00\x00x", b"\x01\x00\x00\x00\xff", 1)
+    assert decode_create_event(payload).name == "�"
@@ -0,0 +1,68 @@
+import asyncio
+
+from core.rechecker import RecheckScheduler
+
+
+class _FlakyArchiver:
+    """كل دالة تفشل مرة واحدة لعملة محددة ثم تعمل"""
+    def __init__(self):
+        self.failed = set()
+        self.archived = []
+
+    def _fail_once(self, key):
+        if key not in self.failed:
+            self.failed.add(key)
+            raise RuntimeError(key)
+
+    def needs_remote_check(self, mint):
+        if mint == "bad-local":
+            self._fail_once("local")
+        return True
+
+    async def fetch_coins_batch(self, mints):
+        return {m: {"mint": m} for m in mints}
+
+    async def archive_if_viable(self, wallet, raw_data, behavior_tag, data):
+        if data["mint"] == "bad-archive":
+            self._fail_once("archive")
+        self.archived.append(data["mint"])
+        return True
+
+
+def test_failing_entry_is_rescheduled_without_stranding_the_batch():
+    archiver = _FlakyArchiver()
+
+    async def scenario():
+        rechecker = RecheckScheduler(archiver, initial_delay_s=0.01, max_delay_s=0.05)
+        for mint in ("bad-local", "good", "bad-archive"):
+            rechecker.schedule(mint, "w", {"mint": mint}, "tag")
+        for _ in range(100):
+            if not rechecker._pending:
+                break
+            await asyncio.sleep(0.01)
+        stats = dict(rechecker.stats)
+        await rechecker.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert sorted(archiver.archived) == ["bad-archive", "bad-local", "good"]
+    assert stats["promoted"] == 3 and stats["expired"] == 0
+
+
+def test_rescheduling_a_pending_mint_merges_its_behavior_tag():
+    archiver = _FlakyArchiver()
+
+    async def scenario():
+        rechecker = RecheckScheduler(archiver, initial_delay_s=10)
+        rechecker.schedule("m1", "w", {"mint": "m1"}, "New Launch")
+        rechecker.schedule("m1", "w", {"mint": "m1"}, "📦 BUNDLED_LAUNCH")
+        rechecker.schedule("m1", "w", {"mint": "m1"}, "🚀 HIGH_VOLUME_MM")
+        rechecker.schedule("m1", "w", {"mint": "m1"}, "📦 BUNDLED_LAUNCH")
+        entry = rechecker._pending["m1"]
+        stats = dict(rechecker.stats)
+        await rechecker.close()
+        return entry, stats
+
+    entry, stats = asyncio.run(scenario())
+    assert entry.behavior_tag == "📦 BUNDLED_LAUNCH | 🚀 HIGH_VOLUME_MM"
+    assert stats["scheduled"] == 1
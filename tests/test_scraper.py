@@ -0,0 +1,56 @@
+import ctypes
+import json
+import mmap
+
+import scraper
+from scraper import extract_trades_heuristically, parse_maps, scan_chunks, split_work
+
+
+def test_parse_maps_keeps_only_writable_anonymous_and_heap_regions(tmp_path):
+    # تخصيص كبير يأخذ ربطاً مجهولاً خاصاً (MAP_PRIVATE) مثل كومة المتصفح
+    anon = ctypes.create_string_buffer(4 * 1024 * 1024)
+    backing = tmp_path / "file.bin"
+    backing.write_bytes(b"\0" * scraper.PAGE_SIZE)
+    with open(backing, "r+b") as f:
+        mapped = mmap.mmap(f.fileno(), scraper.PAGE_SIZE)
+    anon_addr = ctypes.addressof(anon)
+    file_addr = ctypes.addressof(ctypes.c_char.from_buffer(mapped))
+    try:
+        regions = parse_maps("self")
+        assert regions and all(r.perms.startswith("rw") for r in regions)
+        assert all(r.path in ("", "[heap]") or r.path.startswith("[anon") for r in regions)
+        assert any(r.start <= anon_addr < r.end for r in regions)
+        assert not any(r.start <= file_addr < r.end for r in regions)
+        assert not parse_maps("self", max_region_bytes=0)
+    finally:
+        mapped.close()
+
+
+def test_split_work_overlaps_chunk_boundaries_and_balances_load(monkeypatch):
+    monkeypatch.setattr(scraper, "CHUNK_BYTES", 100)
+    monkeypatch.setattr(scraper, "CHUNK_OVERLAP", 10)
+    parts = split_work([(1000, 250), (5000, 40)], parts=2)
+    chunks = sorted(c for part in parts for c in part)
+    # كل قطعة تمتد CHUNK_OVERLAP داخل التالية، والأخيرة لا تتجاوز نهاية السلسلة
+    assert chunks == [(1000, 110), (1100, 110), (1200, 50), (5000, 40)]
+    assert sorted(sum(n for _, n in part) for part in parts) == [150, 160]
+
+
+def test_trade_split_across_a_chunk_boundary_is_still_found(monkeypatch):
+    monkeypatch.setattr(scraper, "CHUNK_BYTES", 64)
+    monkeypatch.setattr(scraper, "CHUNK_OVERLAP", 64)
+    trade = json.dumps({"sig": "T1", "price": 0.5, "amount": 10}).encode()
+    dump = b"\0" * 40 + trade + b"\0" * 100
+    chunks = [c for part in split_work([(0, len(dump))], parts=1) for c in part]
+    found = [t for addr, n in chunks for t in extract_trades_heuristically(dump[addr:addr + n])]
+    assert {"sig": "T1", "price": 0.5, "amount": 10} in found
+
+
+def test_scan_chunks_skips_unchanged_chunks_by_digest():
+    trade = json.dumps({"price": "1.25", "qty": 3}).encode()
+    buf = ctypes.create_string_buffer(b"\0" * 16 + trade + b"\0" * 16)
+    addr, length = ctypes.addressof(buf), len(buf.raw)
+    found, scanned, digests = scan_chunks("self", [(addr, length, None)])
+    assert found == [{"price": "1.25", "qty": 3}] and scanned == length
+    again, _, _ = scan_chunks("self", [(addr, length, digests[0][2])])
+    assert again == []
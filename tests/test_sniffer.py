@@ -0,0 +1,120 @@
+import asyncio
+import json
+import time
+
+from builders import create_logs, logs_frame, pubkey, trade_logs
+from core.sniffer import MarketEvent, PumpSniffer
+
+
+class _WashRecorder:
+    def __init__(self):
+        self.trades = []
+
+    def observe(self, mint, wallet, sol_amount, is_buy, ts):
+        self.trades.append((mint, wallet, sol_amount, is_buy))
+
+
+def test_trade_seen_on_every_endpoint_reaches_detectors_once():
+    wash = _WashRecorder()
+    sniffer = PumpSniffer(["wss://a.test", "wss://b.test", "wss://c.test"], archiver=None, wash_detector=wash)
+    buy = logs_frame("buy1", trade_logs({"user": 7}), slot=10)
+    sell = logs_frame("sell1", trade_logs({"user": 7, "is_buy": False}, is_buy=False), slot=11)
+    for url in sniffer.wss_urls:
+        sniffer._handle_frame(buy, url)
+        sniffer._handle_frame(sell, url)
+    assert wash.trades == [(pubkey(1), pubkey(7), 10**9, True), (pubkey(1), pubkey(7), 10**9, False)]
+
+
+def test_malformed_frames_are_skipped_without_breaking_the_stream():
+    sniffer = PumpSniffer("wss://a.test", archiver=None)
+    truncated = logs_frame("bad1", create_logs(), slot=5)[:80] + "Instruction: Create"
+    wrong_shape = json.dumps({"params": {"result": {"context": {"slot": "x"}, "value": [1, 2]}},
+                              "note": "Instruction: Create"})
+    no_logs = json.dumps({"jsonrpc": "2.0", "result": 3, "id": 1, "note": "Instruction: Create"})
+    for frame in (truncated, wrong_shape, no_logs):
+        sniffer._handle_frame(frame, "wss://a.test")
+    assert sniffer.stats["frames_skipped"] == 3
+    # الإطار السليم التالي على نفس الاتصال يُعالج طبيعياً
+    sniffer._handle_frame(logs_frame("good1", create_logs(), slot=6), "wss://a.test")
+    assert sniffer.stats["enqueued"] == 1
+    assert sniffer.checkpoint == ("good1", 6)
+
+
+def _launch(sig):
+    return MarketEvent(signature=sig, timestamp=0.0, event_type="Create")
+
+
+def test_drop_oldest_keeps_the_newest_launches():
+    sniffer = PumpSniffer("wss://a.test", archiver=None, queue_size=2, drop_policy="drop_oldest")
+    for sig in ("s1", "s2", "s3", "s4"):
+        sniffer._enqueue(_launch(sig))
+    assert [ev.signature for ev in sniffer._queue._queue] == ["s3", "s4"]
+    assert sniffer.stats["dropped"] == 2 and sniffer.stats["enqueued"] == 4
+    assert sniffer.stats["queue_high_water"] == 2
+    # العناصر المُسقطة لا تعلق join
+    assert sniffer._queue._unfinished_tasks == 2
+
+
+def test_drop_newest_preserves_the_queue():
+    sniffer = PumpSniffer("wss://a.test", archiver=None, queue_size=2, drop_policy="drop_newest")
+    for sig in ("s1", "s2", "s3"):
+        sniffer._enqueue(_launch(sig))
+    assert [ev.signature for ev in sniffer._queue._queue] == ["s1", "s2"]
+    assert sniffer.stats["dropped"] == 1 and sniffer.stats["enqueued"] == 2
+
+
+class _Archiver:
+    def __init__(self, delay):
+        self.delay = delay
+        self.seen = []
+
+    async def analyze_and_archive(self, wallet, raw_data, behavior_tag):
+        self.seen.append((raw_data["sig"], behavior_tag))
+        await asyncio.sleep(self.delay)
+
+
+def test_worker_pool_processes_concurrently_and_reports_utilisation():
+    archiver = _Archiver(delay=0.05)
+
+    async def scenario():
+        sniffer = PumpSniffer("wss://a.test", archiver, worker_count=4)
+        sniffer.is_running = True
+        sniffer._start_workers()
+        started = time.monotonic()
+        for i in range(8):
+            sniffer._enqueue(_launch(f"s{i}"))
+        await asyncio.wait_for(sniffer._queue.join(), 1.0)
+        elapsed = time.monotonic() - started
+        util = sniffer.worker_utilisation()
+        sniffer.stop()
+        await asyncio.gather(*sniffer._workers, return_exceptions=True)
+        return elapsed, util, sniffer.worker_stats
+
+    elapsed, util, stats = asyncio.run(scenario())
+    assert len(archiver.seen) == 8 and {tag for _, tag in archiver.seen} == {"New Launch"}
+    # 8 مهام × 50ms على 4 عمال ≈ 100ms وليس 400ms
+    assert elapsed < 0.35
+    assert [w["processed"] for w in stats] == [2, 2, 2, 2]
+    assert len(util) == 4 and all(0.2 < u <= 1.0 for u in util)
+
+
+def test_fan_in_dedups_launches_and_accounts_endpoint_lag():
+    sniffer = PumpSniffer(["wss://a.test", "wss://b.test"], archiver=None)
+    frame = logs_frame("c1", create_logs(), slot=9)
+    sniffer._handle_frame(frame, "wss://a.test")
+    sniffer._seen["c1"] -= 0.02  # الوصول الأول قبل 20ms
+    sniffer._handle_frame(frame, "wss://b.test")
+    assert sniffer.stats["enqueued"] == 1 and sniffer.stats["duplicates"] == 1
+    report = sniffer.endpoint_report()
+    assert report["wss://a.test"]["win_rate"] == 1.0 and report["wss://a.test"]["avg_lag_ms"] == 0.0
+    assert report["wss://b.test"]["win_rate"] == 0.0 and report["wss://b.test"]["avg_lag_ms"] >= 20
+
+
+def test_dedup_set_is_bounded():
+    sniffer = PumpSniffer(["wss://a.test"], archiver=None, dedup_size=2, queue_size=10)
+    for sig in ("c1", "c2", "c3"):
+        sniffer._handle_frame(logs_frame(sig, create_logs()), "wss://a.test")
+    assert list(sniffer._seen) == ["c2", "c3"]
+    # c1 خرج من النافذة: يُعامل كوصول جديد
+    sniffer._handle_frame(logs_frame("c1", create_logs()), "wss://a.test")
+    assert sniffer.stats["enqueued"] == 4
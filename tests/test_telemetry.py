@@ -0,0 +1,33 @@
+import json
+
+from core.telemetry import TelemetryServer, _Subscriber
+
+
+def _encoded(server, sub, seq):
+    return json.loads(server._encode(sub, server._ring[seq - 1]))
+
+
+def test_delta_sends_only_changed_fields_and_explicit_nulls():
+    server = TelemetryServer()
+    sub = _Subscriber(8)
+    server.publish({"mint": "M1", "name": "Tok", "cap": 12000, "holders": 80, "tag": "New Launch"})
+    server.publish({"mint": "M1", "name": "Tok", "cap": 15000, "holders": None, "tag": "New Launch"})
+    server.publish({"mint": "M1", "name": "Tok", "cap": 15000, "holders": 90, "tag": "New Launch"})
+    assert _encoded(server, sub, 1) == {"s": 1, "k": "M1", "m": "M1", "n": "Tok", "c": 12000, "h": 80,
+                                        "t": "New Launch"}
+    assert _encoded(server, sub, 2) == {"s": 2, "k": "M1", "c": 15000, "h": None}
+    assert _encoded(server, sub, 3) == {"s": 3, "k": "M1", "h": 90}
+
+
+def test_delta_state_is_per_mint_and_bounded():
+    server = TelemetryServer(delta_state_size=1)
+    sub = _Subscriber(8)
+    server.publish({"mint": "A", "cap": 1})
+    server.publish({"mint": "B", "cap": 1})
+    server.publish({"mint": "A", "cap": 1})
+    assert [_encoded(server, sub, i) for i in (1, 2, 3)] == [
+        {"s": 1, "k": "A", "m": "A", "c": 1},
+        {"s": 2, "k": "B", "m": "B", "c": 1},
+        # A خرج من الذاكرة المحدودة: يُرسل كاملاً من جديد
+        {"s": 3, "k": "A", "m": "A", "c": 1},
+    ]
@@ -0,0 +1,60 @@
+import time
+
+from core.clusters import WalletClusterIndex
+from core.wash import WashTradingDetector
+
+LAMPORTS = 1_000_000_000
+
+
+def test_assess_returns_score_for_live_timestamps():
+    detector = WashTradingDetector(min_trades=10)
+    now = time.time()
+    for i in range(50):
+        detector.observe("MINT", f"w{i % 7}", LAMPORTS, i % 2 == 0, now + i)
+    assert len(detector._mints) == 1
+    assert detector.stats["evicted"] == 0
+    verdict = detector.assess("MINT")
+    assert verdict is not None
+    assert verdict.trades == 50
+    assert 0.0 <= verdict.score <= 1.0
+    assert verdict.threat_level + verdict.trust_score == 100
+
+
+def test_related_round_trips_are_flagged():
+    clusters = WalletClusterIndex()
+    clusters.union("A", "B", "test")
+    detector = WashTradingDetector(min_trades=10, cluster_index=clusters)
+    now = time.time()
+    for i in range(40):
+        detector.observe("WASH", "A" if i % 2 else "B", LAMPORTS, i % 2 == 0, now + i)
+    verdict = detector.assess("WASH")
+    assert verdict is not None and verdict.flagged
+
+
+def test_capacity_evicts_least_recently_used_mint():
+    detector = WashTradingDetector(max_mints=2, min_trades=1)
+    now = time.time()
+    for n, mint in enumerate(("a", "b", "c")):
+        detector.observe(mint, "w", LAMPORTS, True, now + n)
+    assert list(detector._mints) == ["b", "c"]
+    assert detector.stats["evicted"] == 1
+    assert detector.assess("c") is not None
+
+
+def test_idle_mints_are_evicted():
+    detector = WashTradingDetector(idle_s=10, min_trades=1)
+    now = time.time()
+    detector.observe("old", "w", LAMPORTS, True, now)
+    detector.observe("new", "w", LAMPORTS, True, now + 60)
+    assert list(detector._mints) == ["new"]
+
+
+def test_self_round_trip_is_not_counted_as_related_without_clusters():
+    detector = WashTradingDetector(min_trades=10)
+    now = time.time()
+    for i in range(40):
+        detector.observe("SELF", "A", LAMPORTS, i % 2 == 0, now + i)
+    verdict = detector.assess("SELF")
+    assert verdict.self_trade_ratio == 1.0
+    assert verdict.related_roundtrip_ratio == 0.0
+    assert verdict.score == 0.5
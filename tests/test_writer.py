@@ -0,0 +1,86 @@
+import asyncio
+import sqlite3
+
+from core.writer import ArchiveWriter
+
+
+def _count(db_path, table):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_locked_batch_is_requeued_and_written_later(tmp_path):
+    db_path = str(tmp_path / "archive.sqlite")
+
+    async def scenario():
+        writer = ArchiveWriter(db_path, flush_interval_ms=10_000, busy_timeout_ms=50)
+        await writer.start()
+        blocker = sqlite3.connect(db_path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        for i in range(5):
+            await writer.upsert(f"w{i}", 50, "tag", 50, "{}", "2026")
+        await writer.record_event("w0", "MINT", "sig", 1.0, 1, "tag", 1_000)
+        await writer.flush()
+        assert writer.stats["retries"] == 1
+        assert len(writer._pending) == 5 and len(writer._events) == 1
+        # صف جديد لنفس المحفظة أثناء الانتظار: آخر قيمة تفوز وعدد الغارات يُجمع
+        await writer.upsert("w0", 90, "newer", 10, "{}", "2027")
+        blocker.execute("ROLLBACK")
+        blocker.close()
+        await writer.flush()
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert _count(db_path, "mm_intel") == 5
+    assert _count(db_path, "mm_events") == 1
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT threat_level, total_raids FROM mm_intel WHERE wallet_id='w0'").fetchone() == (90, 2)
+
+
+def test_persistent_error_drops_only_failing_rows(tmp_path):
+    db_path = str(tmp_path / "archive.sqlite")
+
+    async def scenario():
+        writer = ArchiveWriter(db_path, flush_interval_ms=10_000, max_retries=2)
+        await writer.start()
+        for i in range(3):
+            await writer.upsert(f"w{i}", 50, "tag", 50, "{}", "2026")
+        # wallet_id NOT NULL في mm_events: صف فاشل دائماً
+        await writer.record_event(None, "MINT", "sig", 1.0, 1, "tag", 1_000)
+        await writer.record_event("w1", "MINT", "sig", 1.0, 1, "tag", 1_000)
+        await writer.flush()
+        await writer.flush()
+        assert writer.stats["rows_dropped"] == 1
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert _count(db_path, "mm_intel") == 3
+    assert _count(db_path, "mm_events") == 1
+
+
+def test_close_retries_a_requeued_batch_until_it_is_persisted(tmp_path):
+    db_path = str(tmp_path / "archive.sqlite")
+
+    async def scenario():
+        writer = ArchiveWriter(db_path, flush_interval_ms=10_000, max_retries=3)
+        await writer.start()
+        for i in range(4):
+            await writer.upsert(f"w{i}", 50, "tag", 50, "{}", "2026")
+        await writer.record_event("w0", "MINT", "sig", 1.0, 1, "tag", 1_000)
+        commit = writer._db.commit
+        calls = []
+
+        async def flaky_commit():
+            calls.append(1)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            await commit()
+
+        writer._db.commit = flaky_commit
+        await writer.close()
+        return writer.stats, len(calls)
+
+    stats, commits = asyncio.run(scenario())
+    assert stats["retries"] == 1 and stats["rows_dropped"] == 0 and commits == 2
+    assert _count(db_path, "mm_intel") == 4
+    assert _count(db_path, "mm_events") == 1